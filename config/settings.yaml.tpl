@@ -55,8 +55,24 @@ default:
     # http proxy settings
     http: http://tinyproxy-service.tiny-proxy.svc:8888
     https: http://tinyproxy-service.tiny-proxy.svc:8888
+  capabilities:
+    eager: false  # evaluate all capability providers concurrently at session start instead of on first lookup
+    workers: 8  # max number of providers evaluated at once
+    persist: false  # store evaluated capabilities to pytest cache and reuse them in following sessions
+    ttl: 3600  # seconds since the first evaluation, how long are the persisted capabilities valid (reuse doesn't extend it)
+  discovery:
+    workers: 16  # number of openshift probes of dynaconf loader running concurrently
+    timeout: 120  # seconds since start of each probe, discovery fails if a probe doesn't finish in time (optional probes use default, such result isn't cached)
+  discovery_cache:
+    enabled: true  # cache data discovered from openshift, following sessions and xdist workers start faster
+    ttl: 3600  # seconds, the cache is also invalidated by any change of APIManager
+    dir: ~/.cache/3scale-tests  # where the cache is stored ($XDG_CACHE_HOME/3scale-tests if empty), it contains credentials, it has to be private (0700)
+    refresh: false  # set to true to ignore the cache and discover the data again
   reporting:
     print_app_logs: true # whether to print application logs during testing
+    http_log: full  # logging of httpx clients: full (curl + response), compact (one line per request), off
+    http_log_body: 160  # max number of logged bytes of request/response body, longer body is cut and ends with ...
+    latency: false  # record latency of api client requests, summary per test in junit/html and table per session
     title: Brief Description # custom title used for junit/polarion reporting
     testsuite_properties:
       polarion_project_id: PROJECTID
@@ -64,6 +80,18 @@ default:
   fixtures:
     threescale:
       private_tenant: False  # if true standalone tenant is created to run all the tests
+    bulk:  # options of bulk creation, e.g. custom_service.bulk(500)
+      workers: 8  # max number of objects created concurrently
+      rate:  # max number of objects of same kind (services, backends, applications) created per second, unlimited if empty
+      rates:  # overrides of the rate for specific kind
+        services: 5
+    cleanup:
+      workers: 8  # max number of objects of same kind (applications, plans, services, ...) deleted concurrently
+      background: false  # delete objects in background thread while tests continue, `make clean-orphans` resumes after crash
+    webhooks:
+      receiver: false  # receive webhooks in the test process instead of mockserver, 3scale has to reach the runner
+      url: ""  # url of the runner as reachable from 3scale, defaults to http://<fqdn>, listening port is appended unless included
+      port: 0  # port to listen on, 0 picks a free one, xdist worker gwN listens on port + N (also port in url is + N)
     jaeger:
       url: "" # route to the jaeger-query service for the querying of traces
       config:
@@ -176,6 +204,8 @@ development:
     url: redis://apicast-testing-redis:6379/1
   prometheus:
     url: "{PROMETHEUS_URL}"
+    # record: "prometheus.jsonl"  # record all the responses of prometheus to the file
+    # offline: "prometheus.jsonl"  # use local stand-in fed by the recording (or true for empty one) instead of prometheus
   toolbox:
     # rpm/gem/podman; rpm = command from rpm package, gem = command from gem
     # 'ruby_version' should be defined for "gem" option
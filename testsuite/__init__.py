@@ -26,6 +26,11 @@ import importlib_resources as resources
 from packaging.version import Version
 from weakget import weakget
 
+from testsuite import backoff_telemetry
+
+# has to be done before any backoff decorated function is defined
+backoff_telemetry.install()
+
 from testsuite.config import settings  # noqa
 
 # To avoid indefinite waiting on socket issues default timeout is used.
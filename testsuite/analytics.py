@@ -0,0 +1,130 @@
+"""Verification of analytics of many services, applications and backends at once
+
+Analytics are updated asynchronously, so each value has to be polled until it
+reflects the traffic. Instead of polling every value in its own retry loop,
+all the expectations are polled together, pending ones concurrently, and the
+waiting ends as soon as all of them converge.
+
+Usage:
+
+    expectations = AnalyticsExpectations(threescale)
+    expectations.expect(service, 10).expect(application, 6).expect(application2, 4)
+    expectations.snapshot()
+    ...  # make the requests
+    values = expectations.wait()
+    assert values[0] == expectations[0].baseline + 10
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+from threescale_api.client import ThreeScaleClient
+from threescale_api.resources import Application, Backend, Service
+
+from testsuite import resilient
+
+log = logging.getLogger(__name__)
+
+# max number of concurrent requests to analytics
+WORKERS = 8
+
+_KINDS = {Service: "service", Application: "application", Backend: "backend"}
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclass
+class Expectation:
+    """Expected increase of metric of a service, application or backend"""
+
+    kind: str
+    resource_id: int
+    metric: str
+    delta: int
+    key: str = "total"
+    baseline: int = 0
+    value: Optional[int] = None
+    converged: Optional[float] = None
+
+    @property
+    def expected(self) -> int:
+        """Value expected once the analytics are updated"""
+        return self.baseline + self.delta
+
+    @property
+    def done(self) -> bool:
+        """True if the analytics reflect the expected increase"""
+        return self.value is not None and self.value >= self.expected
+
+    def __str__(self):
+        return f"{self.kind} {self.resource_id} {self.metric}: {self.value} (expected {self.expected})"
+
+
+class AnalyticsExpectations:
+    """Set of expectations on analytics polled together"""
+
+    def __init__(self, threescale: ThreeScaleClient, workers: int = WORKERS):
+        self.analytics = threescale.analytics
+        self.workers = workers
+        self.expectations: List[Expectation] = []
+
+    def expect(self, resource, delta: int, metric: str = "hits", kind: Optional[str] = None, key: str = "total"):
+        """Adds expectation, returns self to allow chaining
+
+        Args:
+            :param resource: Service, Application, Backend or id of them
+            :param delta: Expected increase of the metric
+            :param metric: Name of the metric
+            :param kind: One of service, application, backend; required if resource is an id
+            :param key: Key in the analytics response
+        """
+        if kind is None:
+            kind = next(v for k, v in _KINDS.items() if isinstance(resource, k))
+        resource_id = resource if isinstance(resource, int) else resource.entity_id
+        self.expectations.append(Expectation(kind, resource_id, metric, delta, key))
+        return self
+
+    def __getitem__(self, index: int) -> Expectation:
+        return self.expectations[index]
+
+    def _read(self, expectation: Expectation) -> int:
+        list_by = getattr(self.analytics, f"list_by_{expectation.kind}")
+        return list_by(expectation.resource_id, metric_name=expectation.metric)[expectation.key]
+
+    def _read_all(self, expectations: List[Expectation]) -> List[int]:
+        """Reads the values concurrently"""
+        if len(expectations) == 1:
+            return [self._read(expectations[0])]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(expectations))) as executor:
+            return list(executor.map(self._read, expectations))
+
+    def snapshot(self):
+        """Reads current values as baselines, call it before the traffic"""
+        for expectation, value in zip(self.expectations, self._read_all(self.expectations)):
+            expectation.baseline = value
+
+    def _check(self, start: float):
+        pending = [i for i in self.expectations if not i.done]
+        for expectation, value in zip(pending, self._read_all(pending)):
+            expectation.value = value
+            if expectation.done:
+                expectation.converged = time.monotonic() - start
+        pending = [i for i in pending if not i.done]
+        assert not pending, "Analytics not updated: " + ", ".join(str(i) for i in pending)
+
+    def wait(self, deadline: float = resilient.DEADLINE) -> List[int]:
+        """Polls the analytics until all the expectations are satisfied
+
+        Raises AssertionError listing the lagging expectations if the deadline passes.
+
+        Returns:
+            :returns: Current values in the order of the expectations
+        """
+        start = time.monotonic()
+        resilient.poll("analytics_expectations", self._check, start, exceptions=(AssertionError,), deadline=deadline)
+        lagged = sorted((i for i in self.expectations if i.converged), key=lambda x: -x.converged)
+        for expectation in lagged:
+            log.info("Analytics of %s converged after %.1fs", expectation, expectation.converged)
+        return [i.value for i in self.expectations]
@@ -0,0 +1,185 @@
+"""Telemetry of retries of all the backoff decorated functions
+
+backoff.on_exception and backoff.on_predicate are wrapped (see install) so every
+decorated function reports each invocation: number of tries, time spent
+sleeping between them and whether it succeeded or gave up. Therefore it is
+visible which polling loops cost the most session time.
+
+The wrapping has to happen before the decorated functions are defined, it is
+done when testsuite package is imported.
+"""
+
+import asyncio
+import functools
+import threading
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import backoff
+
+# number of the most expensive single invocations kept
+TOP_INVOCATIONS = 20
+
+_lock = threading.Lock()
+# time slept so far by the innermost running invocation in current thread/task
+_wait: ContextVar[Optional[List[float]]] = ContextVar("backoff_telemetry_wait", default=None)
+_functions: Dict[str, dict] = {}
+_invocations: List[dict] = []
+
+
+def _name(target) -> str:
+    return f"{target.__module__}.{target.__qualname__}"
+
+
+def _on_backoff(details: dict):
+    wait = _wait.get()
+    if wait is not None:
+        wait[0] += details["wait"]
+
+
+def record(name: str, tries: int, wait: float, outcome: str):
+    """Records finished invocation of retried function, usable also by retry loops not using backoff
+
+    Args:
+        :param name: Name of the function
+        :param tries: Number of tries
+        :param wait: Time in seconds slept between the tries
+        :param outcome: Either success or giveup
+    """
+    with _lock:
+        stats = _functions.setdefault(
+            name, {"calls": 0, "retried": 0, "tries": 0, "wait": 0.0, "max_wait": 0.0, "giveups": 0}
+        )
+        stats["calls"] += 1
+        stats["tries"] += tries
+        stats["wait"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+        if tries > 1:
+            stats["retried"] += 1
+        if outcome == "giveup":
+            stats["giveups"] += 1
+        if wait > 0:
+            _invocations.append({"function": name, "tries": tries, "wait": wait, "outcome": outcome})
+            _invocations.sort(key=lambda x: -x["wait"])
+            del _invocations[TOP_INVOCATIONS:]
+
+
+def _finish(details: dict, outcome: str):
+    wait = _wait.get()
+    record(_name(details["target"]), details["tries"], wait[0] if wait else 0.0, outcome)
+
+
+def _on_success(details: dict):
+    _finish(details, "success")
+
+
+def _on_giveup(details: dict):
+    _finish(details, "giveup")
+
+
+def _handlers(handlers, own) -> list:
+    """Adds own handler to the handlers given to the decorator (None, single handler or iterable)"""
+    if handlers is None:
+        return [own]
+    if hasattr(handlers, "__iter__"):
+        return [own, *handlers]
+    return [own, handlers]
+
+
+def _tracked(retrying):
+    """Each invocation counts its wait on its own, the counter is dropped however the invocation ends"""
+    if asyncio.iscoroutinefunction(retrying):
+
+        @functools.wraps(retrying)
+        async def _async_invocation(*args, **kwargs):
+            token = _wait.set([0.0])
+            try:
+                return await retrying(*args, **kwargs)
+            finally:
+                _wait.reset(token)
+
+        return _async_invocation
+
+    @functools.wraps(retrying)
+    def _invocation(*args, **kwargs):
+        token = _wait.set([0.0])
+        try:
+            return retrying(*args, **kwargs)
+        finally:
+            _wait.reset(token)
+
+    return _invocation
+
+
+def _with_telemetry(decorator):
+    @functools.wraps(decorator)
+    def _decorator(*args, on_success=None, on_backoff=None, on_giveup=None, **kwargs):
+        retry = decorator(
+            *args,
+            on_success=_handlers(on_success, _on_success),
+            on_backoff=_handlers(on_backoff, _on_backoff),
+            on_giveup=_handlers(on_giveup, _on_giveup),
+            **kwargs,
+        )
+        return lambda target: _tracked(retry(target))
+
+    _decorator.telemetry = True  # type: ignore
+    return _decorator
+
+
+def install():
+    """Makes all backoff decorators defined from now on report the telemetry"""
+    if not getattr(backoff.on_exception, "telemetry", False):
+        backoff.on_exception = _with_telemetry(backoff.on_exception)
+        backoff.on_predicate = _with_telemetry(backoff.on_predicate)
+
+
+def take() -> dict:
+    """Returns telemetry recorded since previous call and resets it"""
+    global _functions, _invocations  # pylint: disable=global-statement
+    with _lock:
+        data = {"functions": _functions, "invocations": _invocations}
+        _functions, _invocations = {}, []
+    return data
+
+
+class SessionReport:
+    """Telemetry of all the tests of the session"""
+
+    def __init__(self):
+        self.functions: Dict[str, dict] = {}
+        self.invocations: List[dict] = []
+
+    def add(self, data: dict, nodeid: str = ""):
+        """Adds telemetry returned by take"""
+        for name, stats in data["functions"].items():
+            if name not in self.functions:
+                self.functions[name] = dict(stats)
+                continue
+            total = self.functions[name]
+            for key, value in stats.items():
+                total[key] = max(total[key], value) if key == "max_wait" else total[key] + value
+        self.invocations.extend({**i, "test": nodeid} for i in data["invocations"])
+        self.invocations.sort(key=lambda x: -x["wait"])
+        del self.invocations[TOP_INVOCATIONS:]
+
+    @property
+    def wait(self) -> float:
+        """Total time slept in backoffs"""
+        return sum(i["wait"] for i in self.functions.values())
+
+    def table(self, limit: int = TOP_INVOCATIONS) -> List[str]:
+        """Lines of report of functions ranked by total wait and the most expensive single invocations"""
+        columns = ["wait", "max_wait", "calls", "retried", "tries", "giveups"]
+        lines = [" ".join(f"{i:>9}" for i in columns) + "  function"]
+        for name, stats in sorted(self.functions.items(), key=lambda x: -x[1]["wait"])[:limit]:
+            values = [f"{stats['wait']:.1f}", f"{stats['max_wait']:.1f}"] + [stats[i] for i in columns[2:]]
+            lines.append(" ".join(f"{i:>9}" for i in values) + f"  {name}")
+        lines.append("")
+        lines.append(f"{'wait':>9} {'tries':>9} {'outcome':>9}  function (test)")
+        for invocation in self.invocations[:limit]:
+            lines.append(
+                f"{invocation['wait']:>9.1f} {invocation['tries']:>9} {invocation['outcome']:>9}"
+                f"  {invocation['function']} ({invocation['test']})"
+            )
+        return lines
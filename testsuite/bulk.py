@@ -0,0 +1,182 @@
+"""Bulk creation of 3scale objects
+
+Fixture factories (custom_service, custom_backend, ...) create one object per
+call with a series of blocking api calls. Setups requiring hundreds of objects
+can fan the creation out to a bounded pool of threads with `factory.bulk()`.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from weakget import weakget
+
+from testsuite.config import settings
+
+log = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+
+
+# pylint: disable=too-few-public-methods
+class RateLimiter:
+    """Thread-safe limiter of calls per second, every endpoint has its own budget
+
+    Calls are spread evenly in time, no burst is allowed. Rate `None` (or 0)
+    means no limitation at all.
+    """
+
+    def __init__(self, rate: Optional[float] = None, rates: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            :param rate: Default number of calls per second allowed for any endpoint
+            :param rates: Endpoint specific overrides of the rate
+        """
+        self.rate = rate
+        self.rates = dict(rates or {})
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, endpoint: str):
+        """Blocks until next call to the endpoint is allowed"""
+        rate = self.rates.get(endpoint, self.rate)
+        if not rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(endpoint, now))
+            self._next_slot[endpoint] = slot + 1 / rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _rate_limiter():
+    """Creates limiter configured by fixtures.bulk settings"""
+    options = weakget(settings)["fixtures"]["bulk"] % {}
+    return RateLimiter(options.get("rate"), options.get("rates"))
+
+
+# limiter is shared by all the factories to have the budget per endpoint and not per fixture
+limiter = _rate_limiter()
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def create_many(
+    factory: Callable,
+    items: Iterable,
+    *args,
+    endpoint: str,
+    addfinalizer: Callable[[Callable], None],
+    workers: Optional[int] = None,
+    item_kwargs: Optional[Iterable[dict]] = None,
+    **kwargs,
+) -> list:
+    """Calls factory concurrently for every item and returns results in order of items
+
+    Finalizers registered by the factory calls are collected and passed to
+    `addfinalizer` all at once after all the calls are finished, even if some
+    of them failed. The first failure is re-raised afterwards.
+
+    Args:
+        :param factory: Function creating an object, has to accept `addfinalizer` argument
+        :param items: First positional argument of factory, one per object to be created
+        :param args: Rest of positional arguments shared by all the calls
+        :param endpoint: Name of the endpoint for rate limiting purposes
+        :param addfinalizer: Where the collected finalizers should be registered
+        :param workers: Max number of concurrent calls
+        :param item_kwargs: Keyword arguments specific for each call, one dict per item
+        :param kwargs: Keyword arguments shared by all the calls
+    """
+    items = list(items)
+    per_item = list(item_kwargs) if item_kwargs is not None else [{} for _ in items]
+    assert len(per_item) == len(items), "item_kwargs have to be given for every item"
+    workers = workers or weakget(settings)["fixtures"]["bulk"]["workers"] % DEFAULT_WORKERS
+    finalizers: List[List[Callable]] = [[] for _ in items]
+
+    def _create(index):
+        limiter.wait(endpoint)
+        return factory(items[index], *args, addfinalizer=finalizers[index].append, **{**kwargs, **per_item[index]})
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"bulk-{endpoint}") as executor:
+        futures = [executor.submit(_create, i) for i in range(len(items))]
+    log.info("Created %s %s in %.1fs", len(items), endpoint, time.monotonic() - start)
+
+    for item_finalizers in finalizers:
+        for finalizer in item_finalizers:
+            addfinalizer(finalizer)
+
+    return [future.result() for future in futures]
+
+
+class BulkFactory:
+    """Factory returned by fixtures that allows creation of many objects at once
+
+    Calling the instance is the same as calling the original factory.
+    """
+
+    def __init__(
+        self,
+        factory: Callable,
+        endpoint: str,
+        addfinalizer: Callable[[Callable], None],
+        default: Optional[Callable] = None,
+    ):
+        """
+        Args:
+            :param factory: Function creating an object, has to accept `addfinalizer` argument
+            :param endpoint: Name of the endpoint for rate limiting purposes
+            :param addfinalizer: Where the finalizers should be registered, usually request.addfinalizer
+            :param default: Returns value of the first positional argument when just number of objects is requested
+        """
+        self._factory = factory
+        self._endpoint = endpoint
+        self._addfinalizer = addfinalizer
+        self._default = default
+
+    def __call__(self, *args, **kwargs):
+        return self._factory(*args, **kwargs)
+
+    def _without_item(self, _, *args, **kwargs):
+        """Calls factory ignoring the item, suitable for factories without required positional argument"""
+        return self._factory(*args, **kwargs)
+
+    def bulk(
+        self,
+        items: Union[int, Iterable],
+        *args,
+        workers: Optional[int] = None,
+        item_kwargs: Optional[Iterable[dict]] = None,
+        **kwargs,
+    ) -> list:
+        """Creates many objects concurrently
+
+        Args:
+            :param items: Either number of objects or the first positional argument for each object
+            :param args: Rest of positional arguments shared by all the objects
+            :param workers: Max number of concurrent calls
+            :param item_kwargs: Keyword arguments specific for each object, e.g. [{"service": svc}, ...]
+            :param kwargs: Keyword arguments shared by all the objects
+
+        Returns:
+            :returns: List of created objects in the order of items
+        """
+        factory = self._factory
+        if isinstance(items, int):
+            if self._default is None:
+                items = [None] * items
+                factory = self._without_item
+            else:
+                items = [self._default() for _ in range(items)]
+        return create_many(
+            factory,
+            items,
+            *args,
+            endpoint=self._endpoint,
+            addfinalizer=self._addfinalizer,
+            workers=workers,
+            item_kwargs=item_kwargs,
+            **kwargs,
+        )
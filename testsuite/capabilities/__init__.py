@@ -7,11 +7,19 @@ Capabilities are provider by a functions annotated with @capability_provider and
 """
 
 import enum
-from typing import Any, Callable, List, Set, Tuple
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from testsuite import shared
 
 # Users should have access only to these public methods/decorators
 __all__ = ["CapabilityRegistry", "Capability"]
 
+log = logging.getLogger(__name__)
+
 
 class Capability(enum.Enum):
     """Enum containing all known environment capabilities"""
@@ -52,28 +60,75 @@ Provider = Callable[[], Set[Any]]
 
 
 class CapabilityRegistry(metaclass=Singleton):
-    """Registry for all the capabilities testsuite has"""
+    """Registry for all the capabilities testsuite has
+
+    Providers are evaluated lazily on the first lookup of capability they provide,
+    optionally all of them can be evaluated concurrently in advance by evaluate_all().
+    """
 
     def __init__(self) -> None:
         super().__init__()
         self.providers: List[Tuple[Set[Any], Provider]] = []
         self.discovered: Set[Any] = set()
         self.capabilities: Set[Any] = set()
+        self.results: Dict[str, List[Any]] = {}
+        self.timings: Dict[str, float] = {}
+        self._index: Dict[Any, Tuple[Set[Any], Provider]] = {}
+        self._lock = threading.Lock()
 
     def register_provider(self, provider: Provider, provides: Set[Any]):
         """Register new capability provider"""
         self.providers.append((provides, provider))
+        for capability in provides:
+            self._index.setdefault(capability, (provides, provider))
 
     def _find_provider(self, capability):
+        """Returns provider and all capabilities it can provide based on the capability requested"""
+        return self._index.get(capability, (set(), None))
+
+    @staticmethod
+    def _key(provider: Provider) -> str:
+        """Unique name of the provider"""
+        return f"{provider.__module__}.{provider.__qualname__}"
+
+    def _evaluate(self, provides: Set[Any], provider: Provider):
+        """Runs the provider and records what it provides"""
+        key = self._key(provider)
+        start = time.monotonic()
+        # providers are evaluated just once per session, results are shared with xdist workers
+        result = shared.remember(f"capabilities:{key}", lambda: [i.value for i in provider()])
+        with self._lock:
+            self.timings.setdefault(key, time.monotonic() - start)
+            self.results[key] = result
+            self.discovered.update(provides)
+            self.capabilities.update(Capability(i) for i in result)
+
+    def evaluate_all(self, workers: int = 8):
+        """Evaluates concurrently all the providers that haven't been evaluated yet
+
+        Providers that fail are left to be evaluated (and fail) on lookup.
         """
-        Returns provider and all capabilities it can provide based on the capability requested
-        Runs in O(n) due to discrepancy between discovered capabilities (=those whose providers have been run)
-        and actual capabilities (=those that are present). Still faster than if all providers were run at all times.
-        """
-        for capabilities, provider in self.providers:
-            if capability in capabilities:
-                return capabilities, provider
-        return None
+        pending = [
+            (provides, provider) for provides, provider in self.providers if self._key(provider) not in self.results
+        ]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="capabilities") as executor:
+            futures = {
+                self._key(provider): executor.submit(self._evaluate, provides, provider)
+                for provides, provider in pending
+            }
+        for key, future in futures.items():
+            if future.exception() is not None:
+                log.warning("Capability provider %s failed: %s", key, future.exception())
+
+    def load(self, results: Dict[str, List[Any]], timings: Optional[Dict[str, float]] = None):
+        """Uses results of providers stored by previous session, unknown providers are ignored"""
+        with self._lock:
+            self.timings.update(timings or {})
+        for provides, provider in self.providers:
+            key = self._key(provider)
+            if key in results and key not in self.results:
+                shared.remember(f"capabilities:{key}", lambda key=key: results[key])
+                self._evaluate(provides, provider)
 
     def __contains__(self, item):
         if item not in self.discovered:
@@ -81,7 +136,5 @@ class CapabilityRegistry(metaclass=Singleton):
             if provider is None:
                 # Capability is unknown and not provided by anyone
                 return False
-            new_capabilities = provider()
-            self.discovered.update(capabilities)
-            self.capabilities.update(new_capabilities)
+            self._evaluate(capabilities, provider)
         return item in self.capabilities
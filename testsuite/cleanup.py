@@ -0,0 +1,289 @@
+"""Parallel, dependency ordered deletion of 3scale objects created by fixtures
+
+Objects of the same kind don't depend on each other and can be deleted
+concurrently, however e.g. service can't be deleted before its applications.
+Therefore the deletion is done level by level as defined by LEVELS.
+
+Optionally the deletion can be deferred to a background thread, so the tests
+can continue meanwhile. Such deletions are journaled on the disk and if the
+session is killed before they are finished, they can be resumed by running
+this module: `python -m testsuite.cleanup [journal ...]` (`make clean-orphans`)
+"""
+
+import argparse
+import functools
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from threescale_api import client
+from threescale_api.errors import ApiClientError
+from weakget import weakget
+
+from testsuite import resilient
+from testsuite.config import settings
+from testsuite.utils import get_results_dir_path
+
+log = logging.getLogger(__name__)
+
+# order in which the objects are deleted, unknown kinds are deleted at the very end
+LEVELS = ("applications", "plans", "services", "backends", "accounts")
+
+DEFAULT_WORKERS = 8
+
+
+def _level(kind: str) -> int:
+    """Position of the kind in the deletion order"""
+    try:
+        return LEVELS.index(kind)
+    except ValueError:
+        return len(LEVELS)
+
+
+class CleanupRegistry:
+    """Collects finalizers by kind of deleted object and runs them level by level
+
+    Within a level the finalizers run concurrently in a thread pool. All the
+    finalizers are executed even if some of them fail, the first failure is
+    re-raised at the end.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Args:
+            :param workers: Max number of concurrent deletions within a level
+        """
+        self.workers = workers or weakget(settings)["fixtures"]["cleanup"]["workers"] % DEFAULT_WORKERS
+        self._lock = threading.Lock()
+        self._finalizers: Dict[str, List[Callable]] = {}
+
+    def add(self, kind: str, finalizer: Callable):
+        """Registers finalizer deleting object of given kind"""
+        with self._lock:
+            self._finalizers.setdefault(kind, []).append(finalizer)
+
+    def addfinalizer(self, kind: str) -> Callable[[Callable], None]:
+        """Returns function registering finalizers of given kind, interface is same as request.addfinalizer"""
+        return functools.partial(self.add, kind)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(i) for i in self._finalizers.values())
+
+    def run(self) -> Dict[str, float]:
+        """Executes all the registered finalizers
+
+        Returns:
+            :returns: Time in seconds spent on deletion of every kind
+        """
+        with self._lock:
+            finalizers, self._finalizers = self._finalizers, {}
+
+        errors = []
+        timing = {}
+        for kind in sorted(finalizers, key=_level):
+            start = time.monotonic()
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"cleanup-{kind}") as executor:
+                # reversed to keep the order of ordinary pytest finalizers
+                futures = [executor.submit(i) for i in reversed(finalizers[kind])]
+            for future in futures:
+                if future.exception() is not None:
+                    log.warning("Deletion of %s failed: %s", kind, future.exception())
+                    errors.append(future.exception())
+            timing[kind] = time.monotonic() - start
+            log.info("Deleted %s %s in %.1fs", len(finalizers[kind]), kind, timing[kind])
+
+        if errors:
+            raise errors[0]
+        return timing
+
+
+class Journal:
+    """Append-only on-disk record of deletions, one json per line
+
+    Every deletion is recorded twice, when it is requested and when it is done.
+    Each line is flushed to the disk immediately to survive crash of the process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seq = len(self._read())
+
+    def _read(self) -> List[dict]:
+        """Returns all the records"""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as journal:
+            # last line may be incomplete if the process was killed while writing
+            return [json.loads(line) for line in journal if line.endswith("\n")]
+
+    def _write(self, record: dict):
+        with open(self.path, "a", encoding="utf-8") as journal:
+            journal.write(json.dumps(record) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def append(self, record: dict) -> int:
+        """Records requested deletion, returns sequence number of the record"""
+        with self._lock:
+            self._seq += 1
+            self._write({**record, "seq": self._seq})
+            return self._seq
+
+    def done(self, seq: int):
+        """Records finished deletion"""
+        with self._lock:
+            self._write({"done": seq})
+
+    def pending(self) -> List[dict]:
+        """Returns requested deletions that haven't been finished"""
+        with self._lock:
+            records = self._read()
+        done = {i["done"] for i in records if "done" in i}
+        return [i for i in records if "seq" in i and i["seq"] not in done]
+
+    def remove(self):
+        """Deletes the journal if there is nothing pending"""
+        if not self.pending() and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def journal_path() -> str:
+    """Path of the journal for current process, xdist workers have their own"""
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    return str(get_results_dir_path() / f"cleanup-journal-{worker}.jsonl")
+
+
+class Deleter:
+    """Deletes objects immediately, this is default behavior"""
+
+    # pylint: disable=unused-argument,no-self-use
+    def delete(self, kind: str, delete: Callable, **record):
+        """Deletes the object
+
+        Args:
+            :param kind: Kind of the object, one of LEVELS or 'tenants'
+            :param delete: Function deleting the object
+            :param record: Identification of the object sufficient to delete it without the object itself
+        """
+        delete()
+
+    def drain(self):
+        """Waits until all the deletions are finished"""
+
+
+class DeferredDeleter(Deleter):
+    """Journals the deletions and executes them one by one in a background thread
+
+    Single thread keeps the order in which the deletions were requested,
+    therefore dependency order kept by CleanupRegistry is preserved.
+    """
+
+    def __init__(self, journal: Journal):
+        self.journal = journal
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name="deferred-cleanup", daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            seq, kind, delete = item
+            try:
+                delete()
+                self.journal.done(seq)
+            except Exception as err:  # pylint: disable=broad-except
+                self.failed += 1
+                log.warning("Deferred deletion of %s failed: %s", kind, err)
+
+    def delete(self, kind: str, delete: Callable, **record):
+        seq = self.journal.append({"kind": kind, **record})
+        self._queue.put((seq, kind, delete))
+
+    def drain(self):
+        start = time.monotonic()
+        log.info("Waiting for %s deferred deletions", self._queue.qsize())
+        self._queue.put(None)
+        self._thread.join()
+        log.info("Deferred deletions finished in %.1fs", time.monotonic() - start)
+        if self.failed:
+            log.warning("%s deferred deletions failed, they are kept in %s", self.failed, self.journal.path)
+        self.journal.remove()
+
+
+def _resume_delete(admin, master, record: dict):
+    """Deletes object described by journal record"""
+    kind = record["kind"]
+    if kind == "applications":
+        admin.accounts.read(record["account_id"]).applications.delete(record["id"])
+    elif kind == "plans":
+        admin.services.read(record["service_id"]).app_plans.delete(record["id"])
+    elif kind == "services":
+        admin.services.delete(record["id"])
+    elif kind == "backends":
+        resilient.backend_delete(admin.backends.read(record["id"]))
+    elif kind == "accounts":
+        admin.accounts.delete(record["id"])
+    elif kind == "tenants":
+        master.tenants.delete(record["id"])
+    else:
+        raise ValueError(f"Unknown kind '{kind}' in the journal")
+
+
+def resume(paths: List[str]):
+    """Finishes deletions recorded in given journals"""
+    admin = client.ThreeScaleClient(
+        settings["threescale"]["admin"]["url"],
+        settings["threescale"]["admin"]["token"],
+        ssl_verify=settings["ssl_verify"],
+    )
+    master = client.ThreeScaleClient(
+        settings["threescale"]["master"]["url"],
+        settings["threescale"]["master"]["token"],
+        ssl_verify=settings["ssl_verify"],
+    )
+
+    for path in paths:
+        journal = Journal(path)
+        pending = sorted(journal.pending(), key=lambda x: _level(x["kind"]))
+        log.info("Resuming %s deletions from %s", len(pending), path)
+        failed = 0
+        for record in pending:
+            try:
+                _resume_delete(admin, master, record)
+            except ApiClientError as err:
+                if err.code != 404:
+                    failed += 1
+                    log.warning("Deletion of %s failed: %s", record, err)
+                    continue
+            except Exception as err:  # pylint: disable=broad-except
+                failed += 1
+                log.warning("Deletion of %s failed: %s", record, err)
+                continue
+            journal.done(record["seq"])
+        if failed:
+            log.warning("%s deletions failed, they are kept in %s", failed, path)
+        journal.remove()
+
+
+def main():
+    """Resumes deletions of interrupted session"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Finish deletion of 3scale objects journaled by interrupted session")
+    parser.add_argument("journal", nargs="*", help="journal file(s), default: all journals in resultsdir")
+    args = parser.parse_args()
+    resume(args.journal or glob.glob(str(get_results_dir_path() / "cleanup-journal-*.jsonl")))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,13 +16,25 @@ openshift deployment. That's true for both files and env loader (order of env
 loader is defined in config/.env file). At same moment this has to be
 overwritten by values from config and env. Therefore the update at the end of
 load() is doubled.
+
+The discovery takes tens of seconds, therefore the gathered data are cached on
+the disk (see discovery_cache in settings) and reused by following sessions and
+xdist workers as long as the cache is fresh and 3scale wasn't redeployed.
 """
 
+import base64
+import hashlib
+import json
 import logging
 import os
 import os.path
+import queue
 import re
+import stat
+import threading
+import time
 from pathlib import Path
+from typing import Dict, Set, Tuple
 
 from openshift_client import OpenShiftPythonException
 from packaging.version import InvalidVersion, Version
@@ -32,6 +44,10 @@ from testsuite.openshift.client import OpenShiftClient
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# discovery probes run concurrently, each of them has to finish within the timeout (seconds) since its start
+PROBE_WORKERS = 16
+PROBE_TIMEOUT = 120
+
 
 def _route2url(route):
     """Convert host from openshift route to https:// url"""
@@ -253,6 +269,102 @@ def get_routes(ocp):
     return mapping
 
 
+def _encode(value):
+    """Converts discovered data to json serializable form"""
+    if isinstance(value, OpenShiftClient):
+        return {"__openshift__": [value.project_name, value.server_url, value.token]}
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value):
+    """Inverse to _encode()"""
+    if isinstance(value, dict):
+        if "__openshift__" in value:
+            return OpenShiftClient(*value["__openshift__"])
+        if "__bytes__" in value:
+            return base64.b64decode(value["__bytes__"])
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _api_manager_version(ocp):
+    """Returns resourceVersion of APIManager, it changes whenever 3scale is redeployed or reconfigured"""
+    try:
+        managers = ocp.transport.get("apimanager")["items"]
+        return managers[0]["metadata"]["resourceVersion"] if managers else ""
+    except (OpenShiftPythonException, KeyError, TypeError):
+        return ""
+
+
+def _cache_dir() -> str:
+    """Default per-user cache directory"""
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join("~", ".cache"), "3scale-tests")
+
+
+def _private(path, directory=False) -> bool:
+    """True if the path is own file (or directory) of the current user not accessible by others, symlinks are refused"""
+    try:
+        path_stat = os.lstat(path)
+    except OSError:
+        return False
+    kind = stat.S_ISDIR if directory else stat.S_ISREG
+    return kind(path_stat.st_mode) and path_stat.st_uid == os.getuid() and path_stat.st_mode & 0o077 == 0
+
+
+def _cache_path(obj, ocp, *setup):
+    """Path of the cache file for the deployment and the config affecting the discovery"""
+    cache_dir = obj.get("discovery_cache", {}).get("dir") or _cache_dir()
+    key = [ocp.server_url or ocp.api_url, ocp.project_name, _api_manager_version(ocp), *setup]
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(os.path.expanduser(cache_dir), f"discovery-{digest}.json")
+
+
+def _cache_load(obj, path):
+    """Returns cached data, None if there are no fresh data"""
+    options = obj.get("discovery_cache", {})
+    if not options.get("enabled", True) or options.get("refresh", False) or not os.path.exists(path):
+        return None
+    # the cache contains credentials and endpoints, a file others could read or plant is never trusted
+    if not _private(os.path.dirname(path), directory=True) or not _private(path):
+        log.warning("dynamic dynaconf loader ignores cache %s, it is not private to the user (mode 0700/0600)", path)
+        return None
+    try:
+        with open(os.open(path, os.O_RDONLY | os.O_NOFOLLOW), encoding="utf-8") as cache:
+            cached = json.load(cache)
+    except (OSError, ValueError):
+        return None
+    if time.time() - cached["created"] > options.get("ttl", 3600):
+        return None
+    log.info("dynamic dynaconf loader uses data cached in %s", path)
+    return _decode(cached["data"])
+
+
+def _cache_store(obj, path, data):
+    """Writes the data to the cache, the file is readable just by the user as it contains credentials"""
+    if not obj.get("discovery_cache", {}).get("enabled", True):
+        return
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        if not _private(os.path.dirname(path), directory=True):
+            log.warning("dynamic dynaconf loader doesn't write cache, %s is not private to the user", path)
+            return
+        # written to other file and renamed to not expose incomplete file to concurrent xdist workers
+        tmp_path = f"{path}.{os.getpid()}"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as cache:
+            json.dump({"created": time.time(), "data": _encode(data)}, cache)
+        os.replace(tmp_path, path)
+    except OSError as err:
+        log.warning("dynamic dynaconf loader can't write cache %s: %s", path, err)
+
+
 def _is_rhoam(client):
     """Returns True, if the current instance is RHOAM. Detects RHOAM by annotations on APIManager object"""
     if client.is_operator_deployment:
@@ -299,43 +411,29 @@ def load(obj, env=None, silent=None, key=None):
             ocp_tools_setup = ocp_setup
 
         rhsso_setup = obj.get("rhsso", {})
-        rhsso_username, rhsso_password = _rhsso_credentials(ocp_tools_setup, rhsso_setup)
-
         shared_certs_setup = obj.get("shared_certs", {})
 
         ocp = OpenShiftClient(
             project_name=project, server_url=ocp_setup.get("server_url"), token=ocp_setup.get("token")
         )
 
-        apicast_ocp = _apicast_ocp(ocp, obj)
-        apicast_operator_ocp = _apicast_operator_ocp(apicast_ocp)
-        threescale_operator_ocp = _threescale_operator_ocp(ocp)
-
-        routes = get_routes(ocp)
-
-        system_seed = ocp.secrets["system-seed"]
-        backend_internal_api = ocp.secrets["backend-internal-api"]
-
-        admin_url = _route2url(routes["system-provider"][0])
-        admin_token = system_seed["ADMIN_ACCESS_TOKEN"].decode("utf-8")
-        master_url = _route2url(routes["system-master"][0])
-        master_token = system_seed["MASTER_ACCESS_TOKEN"].decode("utf-8")
-        devel_url = _route2url(routes["system-developer"][0])
-        superdomain = ocp.config_maps["system-environment"]["THREESCALE_SUPERDOMAIN"]
-        try:
-            backend_route = routes["backend-listener"][0]
-        except (IndexError, KeyError):
-            # RHOAM changed service name owning the route
-            backend_route = routes["backend-listener-proxy"][0]
-        catalogsource = "UNKNOWN"
-        try:
-            catalogsource = ocp.do_action("get", ["catalogsource", "-o=jsonpath={.items[0].spec.image}"]).out().strip()
-        except OpenShiftPythonException:
-            pass
-
-        # all this or nothing
-        if None in (project, admin_url, admin_token, master_url, master_token, devel_url):
-            return
+        cache_path = _cache_path(
+            obj,
+            ocp,
+            ocp_tools_setup,
+            rhsso_setup.get("kind"),
+            shared_certs_setup,
+            weakget(obj)["threescale"]["gateway"]["OperatorApicast"]["openshift"] % {},
+        )
+        data = _cache_load(obj, cache_path)
+        if data is None:
+            data, degraded = _discover(obj, project, ocp, ocp_tools_setup, rhsso_setup, shared_certs_setup)
+            if data is None:
+                return
+            if degraded:
+                log.warning("dynamic dynaconf loader doesn't cache data discovered with defaults of timed out probes")
+            else:
+                _cache_store(obj, cache_path, data)
 
         # Values gathered in this loader are just fallback defaults, current
         # settings needs to be dumped and written again, because a) it doesn't seem
@@ -343,58 +441,6 @@ def load(obj, env=None, silent=None, key=None):
         # b) values from file(s) are needed here anyway. Therefore dump & update
         settings = obj.to_dict()
 
-        data = {
-            "openshift": {
-                "version": ocp.version,
-                "projects": {"threescale": {"name": project}},
-                "servers": {"default": {"server_url": ocp.api_url}},
-            },
-            "threescale": {
-                "version": _guess_version(ocp, project),
-                "apicast_operator_version": _guess_apicast_operator_version(apicast_ocp, obj),
-                "superdomain": superdomain,
-                "catalogsource": catalogsource,
-                "admin": {
-                    "url": admin_url,
-                    "username": system_seed["ADMIN_USER"].decode("utf-8"),
-                    "password": system_seed["ADMIN_PASSWORD"].decode("utf-8"),
-                    "token": admin_token,
-                },
-                "master": {
-                    "url": master_url,
-                    "username": system_seed["MASTER_USER"].decode("utf-8"),
-                    "password": system_seed["MASTER_PASSWORD"].decode("utf-8"),
-                    "token": master_token,
-                },
-                "devel": {"url": devel_url},
-                "deployment_type": _deployment_type(ocp),
-                "gateway": {
-                    "default": {
-                        "portal_endpoint": f"https://{admin_token}@3scale-admin.{superdomain}",
-                        "openshift": ocp,
-                    },
-                    "TemplateApicast": {
-                        "image": _apicast_image(ocp),
-                    },
-                    "OperatorApicast": {
-                        "openshift": {"kind": "OpenShiftClient", "project_name": apicast_ocp.project_name}
-                    },
-                    "WASMGateway": {"backend_host": backend_route["spec"]["host"]},
-                },
-                "backend_internal_api": {
-                    "route": backend_route,
-                    "username": backend_internal_api["username"],
-                    "password": backend_internal_api["password"],
-                },
-            },
-            "operators": {
-                "threescale": {"openshift": threescale_operator_ocp},
-                "apicast": {"openshift": apicast_operator_ocp},
-            },
-            "rhsso": {"password": rhsso_password, "username": rhsso_username},
-            "shared_certs": {"client_certs": _shared_tool_certs(ocp_tools_setup, shared_certs_setup)},
-        }
-
         # this overwrites what's already in settings to ensure NAMESPACE is propagated
         project_data = {"openshift": {"projects": {"threescale": {"name": project}}}}
 
@@ -407,3 +453,193 @@ def load(obj, env=None, silent=None, key=None):
             log.debug("'%s' appeared with message: %s", type(err).__name__, err, exc_info=True)
             return
         raise err
+
+
+def _catalogsource(ocp):
+    """Returns image of the catalogsource 3scale was installed from"""
+    try:
+        return ocp.do_action("get", ["catalogsource", "-o=jsonpath={.items[0].spec.image}"]).out().strip()
+    except OpenShiftPythonException:
+        return "UNKNOWN"
+
+
+def _apicast_discovery(ocp, obj):
+    """Probes dependent on location of apicast"""
+    apicast_ocp = _apicast_ocp(ocp, obj)
+    return apicast_ocp, _apicast_operator_ocp(apicast_ocp), _guess_apicast_operator_version(apicast_ocp, obj)
+
+
+def _timed(name, func, *args):
+    """Runs the probe and logs its duration"""
+    start = time.monotonic()
+    try:
+        return func(*args)
+    finally:
+        log.debug("discovery probe %s took %.2fs", name, time.monotonic() - start)
+
+
+_REQUIRED = object()
+
+
+def _probe(finished: queue.Queue, outcome: dict, name, func, *args):
+    """Body of probe thread, the outcome is passed to the discovering thread"""
+    try:
+        outcome["result"] = _timed(name, func, *args)
+    except Exception as error:  # pylint: disable=broad-except
+        outcome["error"] = error
+    finally:
+        finished.put(name)
+
+
+def _run_probes(probes: dict, workers: int, timeout: float) -> Tuple[dict, Set[str]]:
+    """Runs the probes concurrently, at most `workers` at once, each of them has `timeout` seconds since its start
+
+    Probes run in daemon threads, the timed out ones are left behind and they don't block exit of the interpreter.
+
+    Returns:
+        :returns: Tuple of results by name of finished probes and names of timed out probes
+    """
+    pending = list(probes.items())
+    finished: queue.Queue = queue.Queue()
+    running: Dict[str, Tuple[float, dict]] = {}
+    results: dict = {}
+    timed_out: Set[str] = set()
+    while pending or running:
+        while pending and len(running) < workers:
+            name, (func, args, _) = pending.pop(0)
+            outcome: dict = {}
+            threading.Thread(
+                target=_probe, args=(finished, outcome, name, func, *args), name=f"discovery-{name}", daemon=True
+            ).start()
+            running[name] = (time.monotonic(), outcome)
+        oldest = min(running, key=lambda i: running[i][0])
+        try:
+            name = finished.get(timeout=max(0, running[oldest][0] + timeout - time.monotonic()))
+        except queue.Empty:
+            running.pop(oldest)
+            timed_out.add(oldest)
+            continue
+        if name not in running:
+            # finished after its timeout
+            continue
+        _, outcome = running.pop(name)
+        if "error" in outcome:
+            raise outcome["error"]
+        results[name] = outcome["result"]
+    return results, timed_out
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def _discover(obj, project, ocp, ocp_tools_setup, rhsso_setup, shared_certs_setup):
+    """Gathers the data from openshift
+
+    All the probes are independent and they run concurrently. Each probe has
+    the timeout counted from its own start, probe not finished by then either
+    fails the discovery or its default is used.
+
+    Returns:
+        :returns: Tuple of the data (None if essential data are missing) and flag
+            whether some default was used, such degraded data must not be cached
+    """
+    options = obj.get("discovery", {})
+    timeout = options.get("timeout", PROBE_TIMEOUT)
+    probes = {
+        # name: (function, args, default)
+        "rhsso": (_rhsso_credentials, (ocp_tools_setup, rhsso_setup), (None, None)),
+        "apicast": (_apicast_discovery, (ocp, obj), _REQUIRED),
+        "threescale_operator": (_threescale_operator_ocp, (ocp,), None),
+        "routes": (get_routes, (ocp,), _REQUIRED),
+        "system_seed": (ocp.secrets.__getitem__, ("system-seed",), _REQUIRED),
+        "backend_internal_api": (ocp.secrets.__getitem__, ("backend-internal-api",), _REQUIRED),
+        "system_environment": (ocp.config_maps.__getitem__, ("system-environment",), _REQUIRED),
+        "catalogsource": (_catalogsource, (ocp,), "UNKNOWN"),
+        "openshift_version": (lambda: ocp.version, (), _REQUIRED),
+        "api_url": (lambda: ocp.api_url, (), _REQUIRED),
+        "version": (_guess_version, (ocp, project), _REQUIRED),
+        "deployment_type": (_deployment_type, (ocp,), _REQUIRED),
+        "apicast_image": (_apicast_image, (ocp,), _REQUIRED),
+        "shared_certs": (_shared_tool_certs, (ocp_tools_setup, shared_certs_setup), {"valid": [], "invalid": []}),
+    }
+
+    start = time.monotonic()
+    results, timed_out = _run_probes(probes, options.get("workers", PROBE_WORKERS), timeout)
+    for name in timed_out:
+        if probes[name][2] is _REQUIRED:
+            raise TimeoutError(f"discovery probe {name} didn't finish in {timeout}s")
+        log.warning("discovery probe %s timed out, using default", name)
+        results[name] = probes[name][2]
+    degraded = bool(timed_out)
+    log.debug("discovery took %.2fs", time.monotonic() - start)
+
+    rhsso_username, rhsso_password = results["rhsso"]
+    apicast_ocp, apicast_operator_ocp, apicast_operator_version = results["apicast"]
+    routes = results["routes"]
+    system_seed = results["system_seed"]
+    backend_internal_api = results["backend_internal_api"]
+
+    admin_url = _route2url(routes["system-provider"][0])
+    admin_token = system_seed["ADMIN_ACCESS_TOKEN"].decode("utf-8")
+    master_url = _route2url(routes["system-master"][0])
+    master_token = system_seed["MASTER_ACCESS_TOKEN"].decode("utf-8")
+    devel_url = _route2url(routes["system-developer"][0])
+    superdomain = results["system_environment"]["THREESCALE_SUPERDOMAIN"]
+    try:
+        backend_route = routes["backend-listener"][0]
+    except (IndexError, KeyError):
+        # RHOAM changed service name owning the route
+        backend_route = routes["backend-listener-proxy"][0]
+
+    # all this or nothing
+    if None in (project, admin_url, admin_token, master_url, master_token, devel_url):
+        return None, degraded
+
+    data = {
+        "openshift": {
+            "version": results["openshift_version"],
+            "projects": {"threescale": {"name": project}},
+            "servers": {"default": {"server_url": results["api_url"]}},
+        },
+        "threescale": {
+            "version": results["version"],
+            "apicast_operator_version": apicast_operator_version,
+            "superdomain": superdomain,
+            "catalogsource": results["catalogsource"],
+            "admin": {
+                "url": admin_url,
+                "username": system_seed["ADMIN_USER"].decode("utf-8"),
+                "password": system_seed["ADMIN_PASSWORD"].decode("utf-8"),
+                "token": admin_token,
+            },
+            "master": {
+                "url": master_url,
+                "username": system_seed["MASTER_USER"].decode("utf-8"),
+                "password": system_seed["MASTER_PASSWORD"].decode("utf-8"),
+                "token": master_token,
+            },
+            "devel": {"url": devel_url},
+            "deployment_type": results["deployment_type"],
+            "gateway": {
+                "default": {
+                    "portal_endpoint": f"https://{admin_token}@3scale-admin.{superdomain}",
+                    "openshift": ocp,
+                },
+                "TemplateApicast": {
+                    "image": results["apicast_image"],
+                },
+                "OperatorApicast": {"openshift": {"kind": "OpenShiftClient", "project_name": apicast_ocp.project_name}},
+                "WASMGateway": {"backend_host": backend_route["spec"]["host"]},
+            },
+            "backend_internal_api": {
+                "route": backend_route,
+                "username": backend_internal_api["username"],
+                "password": backend_internal_api["password"],
+            },
+        },
+        "operators": {
+            "threescale": {"openshift": results["threescale_operator"]},
+            "apicast": {"openshift": apicast_operator_ocp},
+        },
+        "rhsso": {"password": rhsso_password, "username": rhsso_username},
+        "shared_certs": {"client_certs": results["shared_certs"]},
+    }
+    return data, degraded
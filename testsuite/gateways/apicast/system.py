@@ -8,6 +8,7 @@ from openshift_client import OpenShiftPythonException
 from testsuite.capabilities import Capability
 from testsuite.gateways.apicast import AbstractApicast
 from testsuite.openshift.env import Properties
+from testsuite.openshift.transport import UnsupportedOperation
 from testsuite.utils import randomize
 
 if TYPE_CHECKING:
@@ -101,8 +102,33 @@ class SystemApicast(AbstractApicast):
 
         return service_name
 
-    def _wait_for_apicasts(self):
-        """Waits until changes to APIcast have been applied"""
+    def _wait_for_apicasts(self, timeout: int = 90, starting_timeout: int = 20):
+        """Waits until changes to APIcast have been applied
+
+        The operator starts the rollout within seconds, if the Apicast isn't seen starting
+        in starting_timeout, the transition has been already missed and only readiness is awaited.
+        """
+
+        def _ready(manager, deployments):
+            status = manager.get("status") or {}
+            return deployments.issubset((status.get("deployments") or {}).get("ready") or [])
+
+        try:
+            try:
+                # wait until the Apicast is starting, the current state is checked first
+                self.openshift.transport.wait_for(
+                    "apimanager", None, lambda manager: not _ready(manager, {"apicast-staging"}), starting_timeout
+                )
+            except OpenShiftPythonException:
+                pass
+            # wait until the Apicast is ready
+            self.openshift.transport.wait_for(
+                "apimanager", None, lambda manager: _ready(manager, {"apicast-staging", "apicast-production"}), timeout
+            )
+            return
+        except UnsupportedOperation:
+            pass
+
         api_manager = self.openshift.api_manager
         wait_until = backoff.on_predicate(backoff.fibo, max_tries=10)
 
@@ -110,7 +136,9 @@ class SystemApicast(AbstractApicast):
         # before waiting for it to be ready, the operator needs time to reconcile
         # its state
         # wait until the Apicast is starting
-        wait_until(lambda: not api_manager.ready({"apicast-staging"}))()
+        backoff.on_predicate(backoff.fibo, max_time=starting_timeout)(
+            lambda: not api_manager.ready({"apicast-staging"})
+        )()
         # wait until the Apicast is ready
         wait_until(lambda: api_manager.ready({"apicast-staging", "apicast-production"}))()
 
@@ -0,0 +1,121 @@
+"""Latency histogram with bounded relative error and constant memory
+
+Values are counted in logarithmic buckets (similar to HDR histogram), each
+bucket is PRECISION wider than the previous one, therefore percentiles are
+accurate to PRECISION regardless of the number of recorded values and
+histograms from many clients can be cheaply merged.
+"""
+
+import math
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+# relative width of the buckets, i.e. max relative error of the percentiles
+PRECISION = 0.01
+# values below are counted in the first bucket
+MIN_VALUE = 0.001
+
+PERCENTILES = (50, 90, 99)
+
+_BASE = math.log1p(PRECISION)
+
+
+def _bucket(value: float) -> int:
+    return int(math.log(max(value, MIN_VALUE) / MIN_VALUE) / _BASE)
+
+
+def _value(bucket: int) -> float:
+    """Upper bound of the bucket"""
+    return MIN_VALUE * math.exp((bucket + 1) * _BASE)
+
+
+class Histogram:
+    """Thread safe histogram of values, typically latencies in ms"""
+
+    def __init__(self, values: Iterable[float] = ()):
+        self._lock = threading.Lock()
+        self._buckets: Counter = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        for value in values:
+            self.record(value)
+
+    def record(self, value: float):
+        """Counts the value"""
+        with self._lock:
+            self._buckets[_bucket(value)] += 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        """Adds all values of other histogram to this one"""
+        with other._lock:  # pylint: disable=protected-access
+            buckets = Counter(other._buckets)  # pylint: disable=protected-access
+            count, total, low, high = other.count, other.total, other.min, other.max
+        with self._lock:
+            self._buckets.update(buckets)
+            self.count += count
+            self.total += total
+            if low is not None:
+                self.min = low if self.min is None else min(self.min, low)
+                self.max = high if self.max is None else max(self.max, high)
+        return self
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Average of the values"""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Returns value below which is given percentage of recorded values"""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(1, math.ceil(self.count * percentile / 100))
+            seen = 0
+            for bucket in sorted(self._buckets):
+                seen += self._buckets[bucket]
+                if seen >= rank:
+                    return min(max(_value(bucket), self.min), self.max)
+            return self.max
+
+    def summary(self, percentiles: Iterable[float] = PERCENTILES) -> Dict[str, Optional[float]]:
+        """Returns count, mean, max and the percentiles e.g. {"count": 10, "p50": 1.5, ...}"""
+        values = {"mean": self.mean}
+        for percentile in percentiles:
+            values[f"p{percentile:g}"] = self.percentile(percentile)
+        values["max"] = self.max
+        return {"count": self.count, **{k: v if v is None else round(v, 2) for k, v in values.items()}}
+
+    def to_dict(self) -> dict:
+        """Serializable form of the histogram, e.g. to pass it from xdist worker"""
+        with self._lock:
+            return {
+                "buckets": dict(self._buckets),
+                "count": self.count,
+                "total": self.total,
+                "min": self.min,
+                "max": self.max,
+            }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Histogram":
+        """Restores histogram serialized by to_dict"""
+        histogram = cls()
+        histogram._buckets.update({int(k): v for k, v in data["buckets"].items()})
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return f"Histogram({', '.join(f'{k}={v}' for k, v in self.summary().items())})"
@@ -2,7 +2,13 @@
 
 import functools
 import logging
-from typing import Generator, Iterable
+import shlex
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Generator, Iterable, Optional, Tuple
+from urllib.request import getproxies
 
 import backoff
 import httpx
@@ -15,9 +21,12 @@ from httpx import (
     Response,
     create_ssl_context,
 )
+from threescale_api.client import ThreeScaleClient
 from threescale_api.resources import Application, Service
-from threescale_api.utils import request2curl, response2str
+from weakget import weakget
 
+from testsuite import latency
+from testsuite.config import settings
 from testsuite.lifecycle_hook import LifecycleHook
 
 # pylint: disable=too-few-public-methods
@@ -25,39 +34,206 @@ from testsuite.utils import basic_auth_string
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+_lock = threading.Lock()
+# endpoints of service proxies by (service, endpoint name)
+_base_urls: Dict[Tuple[str, str], str] = {}
+
+
+def resolve_base_url(service: Service, endpoint: str, refresh: bool = False) -> str:
+    """Returns url of the proxy endpoint, it is fetched from 3scale just once per service
+
+    Args:
+        :param service: Service whose proxy endpoint is requested
+        :param endpoint: Either 'sandbox_endpoint' or 'endpoint'
+        :param refresh: Fetch the url even if it is cached
+    """
+    key = (service.url, endpoint)
+    with _lock:
+        url = _base_urls.get(key)
+    if url is None or refresh:
+        url = service.proxy.fetch()[endpoint]
+        with _lock:
+            _base_urls[key] = url
+    return url
+
+
+def invalidate_base_url(service: Service):
+    """Forgets cached proxy endpoints of the service, use it whenever the endpoints are changed"""
+    _invalidate(service.url)
+
+
+def _invalidate(service_url: str):
+    with _lock:
+        for key in [i for i in _base_urls if i[0] == service_url]:
+            del _base_urls[key]
+
+
+def track_proxy_changes(threescale: ThreeScaleClient) -> ThreeScaleClient:
+    """Makes every change done by the client to a proxy (update, deploy, promote) or service deletion
+    forget cached endpoints of the service, proxies are often changed directly in tests without lifecycle hooks"""
+    rest = threescale.rest
+    request = rest.request
+
+    @functools.wraps(request)
+    def _request(*args, **kwargs):
+        response = request(*args, **kwargs)
+        method = kwargs.get("method", args[0] if args else "GET")
+        url = kwargs.get("url", args[1] if len(args) > 1 else None) or ""
+        if method != "GET" and "/services/" in url:
+            _invalidate(url.split("/proxy")[0])
+        return response
 
-def _log_request(request):
-    """log request details"""
+    rest.request = _request
+    return threescale
 
-    class Request:
-        """attribute body/url is needed"""
 
-        def __init__(self, request):
-            self.__request = request
-            self.body = "".join([i.decode("utf-8") for i in request.stream])
-            self.url = str(request.url)
+def _cert_key(cert):
+    """Certificate in hashable form, it may be given as a list of cert and key paths"""
+    return tuple(cert) if isinstance(cert, list) else cert
 
-        def __getattr__(self, name):
-            return getattr(self.__request, name)
 
-    log.info("[CLIENT]: %s", request2curl(Request(request)))
+def _ssl_context(verify, cert):
+    """SSL context is expensive to create (CA bundle is loaded), it is created just once per configuration"""
+    return _cached_ssl_context(verify, _cert_key(cert))
 
 
-def _log_response(response):
-    """log response details"""
+@functools.lru_cache(maxsize=None)
+def _cached_ssl_context(verify, cert):
+    return create_ssl_context(cert=cert, verify=verify, trust_env=True)
+
+
+class _SharedTransport(httpx.HTTPTransport):
+    """Transport with connection pool shared by many clients, closing the client doesn't close it"""
+
+    def close(self):
+        pass
+
+    def close_shared(self):
+        """Closes the connection pool, the transport must not be used anymore"""
+        super().close()
+
+
+_transports: Dict[tuple, _SharedTransport] = {}
+# clients created in `shared_transport(False)` block get their own connection pool
+_sharing: ContextVar[bool] = ContextVar("sharing", default=True)
+
+
+@contextmanager
+def shared_transport(enabled: bool):
+    """Enables/disables connection pool sharing for clients created within the block,
+    disable it when the identity of connection matters (connection counting, restarted gateways)"""
+    token = _sharing.set(enabled)
+    try:
+        yield
+    finally:
+        _sharing.reset(token)
+
+
+def close_shared_transports():
+    """Closes connection pools of all shared transports, new ones are created if needed afterwards"""
+    with _lock:
+        transports = list(_transports.values())
+        _transports.clear()
+    for transport in transports:
+        transport.close_shared()
+
+
+def _transport(verify, cert, http2) -> _SharedTransport:
+    """Returns transport shared by clients with the same configuration to reuse TCP/TLS connections"""
+    key = (verify, _cert_key(cert), http2)
+    with _lock:
+        if key not in _transports:
+            _transports[key] = _SharedTransport(verify=_ssl_context(verify, cert), http2=http2)
+        return _transports[key]
+
+
+def _client_kwargs(verify, cert, http2) -> dict:
+    """Shared transport is used unless sharing is disabled or a proxy is set in environment,
+    httpx ignores environment proxies of clients with custom transport"""
+    kwargs = {"verify": _ssl_context(verify, cert), "http2": http2}
+    if _sharing.get() and not any(i in getproxies() for i in ("http", "https", "all")):
+        kwargs["transport"] = _transport(verify, cert, http2)
+    return kwargs
+
+
+def _refresh_base_url(details):
+    """Unexpected response may be caused by changed endpoint, it is fetched again before retry"""
+    # pylint: disable=protected-access
+    details["args"][0]._refresh_base_url()
+
+
+# full: curl-like request and whole response, compact: single line per request, off: nothing
+LOG_MODE = weakget(settings)["reporting"]["http_log"] % "full"
+# max number of logged bytes of request and response body
+LOG_BODY = weakget(settings)["reporting"]["http_log_body"] % 160
 
-    class Response:
-        """attr reason is needed"""
 
-        def __init__(self, response):
-            response.read()
-            self.__response = response
-            self.reason = response.reason_phrase
+def _truncated(chunks: Iterable[bytes]) -> str:
+    """Joins just the beginning of the body, rest is not copied"""
+    body = b""
+    for chunk in chunks:
+        body += chunk[: LOG_BODY + 1 - len(body)]
+        if len(body) > LOG_BODY:
+            return body[:LOG_BODY].decode("utf-8", errors="replace") + "..."
+    return body.decode("utf-8", errors="replace")
 
-        def __getattr__(self, name):
-            return getattr(self.__response, name)
 
-    log.info("\n".join(["[CLIENT]:", response2str(Response(response))]))
+def _request2curl(request: Request) -> str:
+    """Curl command corresponding to the request, body is truncated to LOG_BODY bytes"""
+    cmd = ["curl", f"-X {shlex.quote(request.method)}"]
+    cmd.extend(f"-H {shlex.quote(f'{key}: {value}')}" for key, value in request.headers.items())
+    body = _truncated(request.stream)
+    if body:
+        cmd.append(f"-d {shlex.quote(body)}")
+    cmd.append(shlex.quote(str(request.url)))
+    return " ".join(cmd)
+
+
+def _response2str(response: Response) -> str:
+    """String representation of the response, body is truncated to LOG_BODY bytes"""
+    msg = [f"{response.http_version} {response.status_code} {response.reason_phrase}"]
+    msg.extend(f"{key}: {value}" for key, value in response.headers.items())
+    msg.append("")
+    msg.append(_truncated([response.content]))
+    return "\n".join(msg)
+
+
+def _log_enabled() -> bool:
+    return LOG_MODE != "off" and log.isEnabledFor(logging.INFO)
+
+
+def _log_request(request):
+    """log request details"""
+    request.extensions["testsuite_start"] = time.monotonic()
+    if LOG_MODE != "full" or not _log_enabled():
+        return
+    log.info("[CLIENT]: %s", _request2curl(request))
+
+
+def _log_compact(response):
+    """log single line with the most important details"""
+    start = response.request.extensions.get("testsuite_start")
+    latency = (time.monotonic() - start) * 1000 if start is not None else float("nan")
+    size = response.headers.get("content-length", "?")
+    log.info(
+        "[CLIENT]: %s %s -> %s (%.1fms, %sB)",
+        response.request.method,
+        response.request.url.raw_path.decode("ascii"),
+        response.status_code,
+        latency,
+        size,
+    )
+
+
+def _log_response(response):
+    """log response details"""
+    if not _log_enabled():
+        return
+    if LOG_MODE == "compact":
+        _log_compact(response)
+        return
+    response.read()
+    log.info("\n".join(["[CLIENT]:", _response2str(response)]))
 
 
 class UnexpectedResponse(Exception):
@@ -80,6 +256,12 @@ class HttpxHook(LifecycleHook):
         application.register_auth(Service.AUTH_USER_KEY, HttpxUserKeyAuth)
         application.register_auth(Service.AUTH_APP_ID_KEY, HttpxAppIdKeyAuth)
 
+    def on_proxy_promote(self, service: Service):
+        invalidate_base_url(service)
+
+    def on_service_delete(self, service: Service):
+        invalidate_base_url(service)
+
 
 # pylint: disable=too-many-arguments, too-many-instance-attributes
 class HttpxClient:
@@ -106,7 +288,7 @@ class HttpxClient:
         self._cert = cert
         self.auth = app.authobj()
         self.http2 = http2
-        self._client = Client(base_url=self._base_url, verify=self._ssl_context(), http2=http2)
+        self._client = Client(base_url=self._base_url, **_client_kwargs(verify, cert, http2))
         self._client.event_hooks["request"] = [_log_request]
         self._client.event_hooks["response"] = [_log_response]
 
@@ -117,11 +299,14 @@ class HttpxClient:
     @property
     def _base_url(self) -> str:
         """Determine right url at runtime"""
-        return self._app.service.proxy.fetch()[self._endpoint]
+        return resolve_base_url(self._app.service, self._endpoint)
+
+    def _refresh_base_url(self):
+        self._client.base_url = resolve_base_url(self._app.service, self._endpoint, refresh=True)
 
     def _ssl_context(self):
         """Create ssl context for httpx"""
-        return create_ssl_context(cert=self._cert, verify=self._verify, trust_env=True)
+        return _ssl_context(self._verify, self._cert)
 
     def extend_connection_pool(self, maxsize: int):
         """
@@ -129,7 +314,9 @@ class HttpxClient:
         This method is needed for compatibility with HttpClient
         """
 
-    @backoff.on_exception(backoff.fibo, UnexpectedResponse, max_tries=8, jitter=None)
+    @backoff.on_exception(
+        backoff.fibo, UnexpectedResponse, max_tries=8, jitter=None, on_backoff=[_refresh_base_url, latency.retry]
+    )
     def request(
         self,
         method,
@@ -162,6 +349,7 @@ class HttpxClient:
             follow_redirects=allow_redirects,
             timeout=timeout,
         )
+        latency.record(response.elapsed.total_seconds() * 1000, response.num_bytes_downloaded)
 
         if response.status_code in self._status_forcelist:
             raise UnexpectedResponse(f"Didn't expect '{response.status_code}' status code", response)
@@ -195,19 +383,13 @@ async def _async_log_request(request):
 
 async def _async_log_response(response):
     """log response details"""
+    if not _log_enabled():
+        return
+    if LOG_MODE == "compact":
+        _log_compact(response)
+        return
     await response.aread()
-
-    class Response:
-        """attr reason is needed"""
-
-        def __init__(self, response):
-            self.__response = response
-            self.reason = response.reason_phrase
-
-        def __getattr__(self, name):
-            return getattr(self.__response, name)
-
-    log.info("\n".join(["[CLIENT]:", response2str(Response(response))]))
+    log.info("\n".join(["[CLIENT]:", _response2str(response)]))
 
 
 class AsyncClient(httpx.AsyncClient):
@@ -226,18 +408,25 @@ class AsyncClient(httpx.AsyncClient):
         verify: bool = True,
         cert=None,
         disable_retry_status_list: Iterable = (),
+        limits: Optional[httpx.Limits] = None,
     ):
-        base_url = app.service.proxy.fetch()[endpoint]
-        ssl_context = create_ssl_context(cert=cert, verify=verify, trust_env=True)
-        super().__init__(base_url=base_url, verify=ssl_context, http2=http2)
+        base_url = resolve_base_url(app.service, endpoint)
+        kwargs = {} if limits is None else {"limits": limits}
+        super().__init__(base_url=base_url, verify=_ssl_context(verify, cert), http2=http2, **kwargs)
 
         self._app = app
+        self._endpoint = endpoint
         self._status_forcelist = {503, 404} - set(disable_retry_status_list)
         self.auth = app.authobj()
         self.event_hooks["request"] = [_async_log_request]
         self.event_hooks["response"] = [_async_log_response]
 
-    @backoff.on_exception(backoff.fibo, UnexpectedResponse, max_tries=8, jitter=None)
+    def _refresh_base_url(self):
+        self.base_url = resolve_base_url(self._app.service, self._endpoint, refresh=True)
+
+    @backoff.on_exception(
+        backoff.fibo, UnexpectedResponse, max_tries=8, jitter=None, on_backoff=[_refresh_base_url, latency.retry]
+    )
     async def request(
         self,
         method: str,
@@ -271,6 +460,7 @@ class AsyncClient(httpx.AsyncClient):
             timeout=timeout,
             extensions=extensions,
         )
+        latency.record(response.elapsed.total_seconds() * 1000, response.num_bytes_downloaded)
         if response.status_code in self._status_forcelist:
             raise UnexpectedResponse(f"Didn't expect '{response.status_code}' status code", response)
 
@@ -292,6 +482,12 @@ class AsyncClientHook(LifecycleHook):
         application.register_auth(Service.AUTH_USER_KEY, HttpxUserKeyAuth)
         application.register_auth(Service.AUTH_APP_ID_KEY, HttpxAppIdKeyAuth)
 
+    def on_proxy_promote(self, service: Service):
+        invalidate_base_url(service)
+
+    def on_service_delete(self, service: Service):
+        invalidate_base_url(service)
+
 
 # pylint: disable=too-few-public-methods
 class HttpxBaseClientAuth(Auth):
@@ -0,0 +1,142 @@
+"""Opt-in recording of latency of requests sent by api clients of applications
+
+When enabled (`reporting.latency` setting), every request of HttpxClient,
+AsyncClient and threescale_api HttpClient is recorded into statistics of the
+running test: latency histogram, number of retries and received bytes.
+The summary of each test is attached to junit properties and html report and
+percentile table of whole session is printed at the end and stored in resultsdir.
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+from threescale_api.resources import Application
+from weakget import weakget
+
+from testsuite.config import settings
+from testsuite.histogram import Histogram
+
+ENABLED = weakget(settings)["reporting"]["latency"] % False
+
+_lock = threading.Lock()
+_current: Optional["Stats"] = None  # pylint: disable=invalid-name
+
+
+class Stats:
+    """Latencies (ms), retries and bytes of requests"""
+
+    def __init__(self, latency: Optional[Histogram] = None, retries: int = 0, size: int = 0):
+        self.latency = latency or Histogram()
+        self.retries = retries
+        self.size = size
+
+    def merge(self, other: "Stats") -> "Stats":
+        """Adds all requests of other statistics to these"""
+        self.latency.merge(other.latency)
+        self.retries += other.retries
+        self.size += other.size
+        return self
+
+    def summary(self) -> dict:
+        """Percentiles of the latency, retries and bytes"""
+        return {**self.latency.summary(), "retries": self.retries, "bytes": self.size}
+
+    def to_dict(self) -> dict:
+        """Serializable form, it is passed from xdist workers in the test report"""
+        return {"latency": self.latency.to_dict(), "retries": self.retries, "size": self.size}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Stats":
+        """Restores statistics serialized by to_dict"""
+        return cls(Histogram.from_dict(data["latency"]), data["retries"], data["size"])
+
+
+def start():
+    """Starts recording of requests of a test"""
+    global _current  # pylint: disable=global-statement
+    _current = Stats()
+
+
+def stop() -> Optional[Stats]:
+    """Stops recording and returns recorded requests, None if nothing was recorded"""
+    global _current  # pylint: disable=global-statement
+    stats, _current = _current, None
+    return stats if stats is not None and stats.latency.count else None
+
+
+def record(latency: float, size: int = 0, retries: int = 0):
+    """Records single request, it does nothing if the recording isn't started
+
+    Args:
+        :param latency: Duration of the request in ms
+        :param size: Number of received bytes
+        :param retries: Number of retries done as part of this request
+    """
+    stats = _current
+    if stats is None:
+        return
+    stats.latency.record(latency)
+    with _lock:
+        stats.size += size
+        stats.retries += retries
+
+
+def retry(_details=None):
+    """Records retry of a request, usable as on_backoff handler"""
+    stats = _current
+    if stats is not None:
+        with _lock:
+            stats.retries += 1
+
+
+def _response_hook(response, *_args, **_kwargs):
+    """Records response of requests session, retries done by urllib3 are taken from the raw response"""
+    retries = getattr(getattr(response.raw, "retries", None), "history", ())
+    record(
+        response.elapsed.total_seconds() * 1000,
+        int(response.headers.get("content-length", 0)),
+        len(retries),
+    )
+    return response
+
+
+def instrument(application: Application):
+    """Makes api clients of the application record their requests
+
+    Httpx based clients always record, requests based clients get the recording hook into their session.
+    """
+    # pylint: disable=protected-access
+    factory = application._client_factory
+
+    def _instrumented(*args, **kwargs):
+        client = factory(*args, **kwargs)
+        session = getattr(client, "session", None)
+        if session is not None and _response_hook not in session.hooks["response"]:
+            session.hooks["response"].append(_response_hook)
+        return client
+
+    application._client_factory = _instrumented
+
+
+class SessionReport:
+    """Statistics of all the tests of the session"""
+
+    def __init__(self):
+        self.tests: Dict[str, Stats] = {}
+
+    def add(self, nodeid: str, stats: Stats):
+        """Adds statistics of the test"""
+        self.tests.setdefault(nodeid, Stats()).merge(stats)
+
+    def table(self, limit: Optional[int] = None) -> List[str]:
+        """Lines of table with percentiles of whole session and tests with the highest p99"""
+        total = Stats()
+        for stats in self.tests.values():
+            total.merge(stats)
+        columns = ["count", "p50", "p90", "p99", "max", "retries"]
+        lines = [" ".join(f"{i:>9}" for i in columns) + "  test"]
+        tests = sorted(self.tests.items(), key=lambda x: -(x[1].latency.percentile(99) or 0))
+        for name, stats in [("TOTAL", total)] + tests[:limit]:
+            summary = stats.summary()
+            lines.append(" ".join(f"{summary[i]:>9}" for i in columns) + f"  {name}")
+        return lines
@@ -0,0 +1,204 @@
+"""In-process load generator for exercising gateway policies under concurrency
+
+Built on top of testsuite.httpx.AsyncClient, so the requests are authenticated
+by the application the same way as with its api_client. Two workload models are
+supported:
+
+- closed: fixed number of virtual users, each sends next request as soon as it
+  gets the response of the previous one (throughput depends on the latency)
+- open: requests are started at given rate regardless of the responses
+  (latency doesn't slow down the arrival of requests)
+
+Usage:
+
+    async with LoadDriver(application, http2=True) as driver:
+        result = await driver.closed(users=50, duration=10, path="/anything")
+    assert result.statuses[429] > 0
+
+The application has to use httpx authentication, e.g. created with AsyncClientHook.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import httpx
+from threescale_api.resources import Application
+
+from testsuite.histogram import Histogram
+from testsuite.httpx import AsyncClient
+
+log = logging.getLogger(__name__)
+
+# max number of connections, with HTTP/2 the requests are multiplexed over them
+DEFAULT_CONNECTIONS = 100
+# requests in flight above this are dropped in open model to keep memory bounded
+MAX_IN_FLIGHT = 1000
+
+
+@dataclass
+class LoadResult:
+    """Outcome of the load, latency is in ms, errors are counted by exception name"""
+
+    latency: Histogram = field(default_factory=Histogram)
+    statuses: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    duration: float = 0.0
+    dropped: int = 0
+
+    @property
+    def requests(self) -> int:
+        """Number of finished requests including failed ones"""
+        return sum(self.statuses.values()) + sum(self.errors.values())
+
+    @property
+    def rps(self) -> float:
+        """Achieved throughput"""
+        return self.requests / self.duration if self.duration else 0.0
+
+    def summary(self) -> Dict:
+        """Everything in a form suitable for logging or reports"""
+        return {
+            "requests": self.requests,
+            "rps": round(self.rps, 1),
+            "latency": self.latency.summary(),
+            "statuses": dict(self.statuses),
+            "errors": dict(self.errors),
+            "dropped": self.dropped,
+        }
+
+
+class LoadDriver:
+    """Sends many concurrent requests to the application's endpoint"""
+
+    def __init__(
+        self,
+        application: Application,
+        http2: bool = False,
+        endpoint: str = "sandbox_endpoint",
+        verify: Optional[bool] = None,
+        connections: int = DEFAULT_CONNECTIONS,
+    ):
+        """
+        Args:
+            :param application: Application whose credentials are used
+            :param http2: Use HTTP/2, concurrent requests are multiplexed
+            :param endpoint: Either sandbox_endpoint or endpoint
+            :param verify: ssl verification, default is api_client_verify of the application
+            :param connections: Max number of opened connections
+        """
+        if verify is None:
+            verify = application.api_client_verify
+        # every status has to be counted, retrying 404/503 would hide them
+        self.client = AsyncClient(
+            http2,
+            application,
+            endpoint,
+            verify,
+            disable_retry_status_list=(404, 503),
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+        )
+        # logging of every request would be the bottleneck
+        self.client.event_hooks = {"request": [], "response": []}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """Closes all the connections"""
+        await self.client.aclose()
+
+    async def _send(self, result: LoadResult, method: str, path: str, kwargs: dict):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except httpx.HTTPError as err:
+            result.errors[type(err).__name__] += 1
+            return
+        result.latency.record((time.perf_counter() - start) * 1000)
+        result.statuses[response.status_code] += 1
+
+    async def closed(
+        self,
+        users: int,
+        duration: Optional[float] = None,
+        requests: Optional[int] = None,
+        method: str = "GET",
+        path: str = "/",
+        **kwargs,
+    ) -> LoadResult:
+        """Closed workload model, runs until the duration passes or given number of requests is sent
+
+        Args:
+            :param users: Number of concurrent virtual users
+            :param duration: Length of the load in seconds
+            :param requests: Total number of requests of all the users
+            :param method: HTTP method
+            :param path: Path of the requests
+            :param kwargs: Passed to each request, e.g. headers or params
+        """
+        if duration is None and requests is None:
+            raise ValueError("Either duration or number of requests has to be given")
+        result = LoadResult()
+        remaining = [requests]
+        start = time.perf_counter()
+        deadline = start + duration if duration is not None else None
+
+        async def user():
+            while deadline is None or time.perf_counter() < deadline:
+                if remaining[0] is not None:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                await self._send(result, method, path, kwargs)
+
+        await asyncio.gather(*(user() for _ in range(users)))
+        result.duration = time.perf_counter() - start
+        log.info("Closed load with %s users: %s", users, result.summary())
+        return result
+
+    async def open(
+        self,
+        rps: float,
+        duration: float,
+        method: str = "GET",
+        path: str = "/",
+        max_in_flight: int = MAX_IN_FLIGHT,
+        **kwargs,
+    ) -> LoadResult:
+        """Open workload model, requests are started at constant rate
+
+        Args:
+            :param rps: Target number of requests per second
+            :param duration: Length of the load in seconds
+            :param method: HTTP method
+            :param path: Path of the requests
+            :param max_in_flight: Requests that would exceed this number of unfinished requests are dropped
+            :param kwargs: Passed to each request, e.g. headers or params
+        """
+        result = LoadResult()
+        in_flight = set()
+        start = time.perf_counter()
+        for i in range(int(rps * duration)):
+            delay = start + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(in_flight) >= max_in_flight:
+                result.dropped += 1
+                continue
+            task = asyncio.ensure_future(self._send(result, method, path, kwargs))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        result.duration = time.perf_counter() - start
+        if result.dropped:
+            log.warning("Open load dropped %s requests, the target can't keep up with %s rps", result.dropped, rps)
+        log.info("Open load with %s rps: %s", rps, result.summary())
+        return result
@@ -2,22 +2,46 @@
 This module contains wrapper for the Mailhog API
 """
 
-from typing import Optional, Set
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import backoff
 import pytest
 import requests
 from openshift_client import OpenShiftPythonException
+from requests.adapters import HTTPAdapter
 
 from testsuite.openshift.client import OpenShiftClient
 from testsuite.utils import warn_and_skip
 
+# max number of concurrent requests to mailhog
+WORKERS = 8
+# messages may be stored slightly out of order of their creation time, fetch re-reads this period before cursor
+CURSOR_SLACK = timedelta(seconds=1)
 
+
+def _created(message: dict) -> datetime:
+    """Creation time of the message, mailhog uses RFC3339 with up to nanoseconds, python parses microseconds"""
+    match = re.match(r"^(.*T\d\d:\d\d:\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d)$", message["Created"])
+    if match is None:
+        raise ValueError(f"Unexpected creation time of message {message['ID']}: {message['Created']}")
+    time, fraction, zone = match.groups()
+    return datetime.fromisoformat(f"{time}.{(fraction or '').ljust(6, '0')[:6]}{zone.replace('Z', '+00:00')}")
+
+
+# pylint: disable=too-many-instance-attributes
 class MailhogClient:
     """Wrapper for the mailhog API"""
 
     def __init__(
-        self, openshift: OpenShiftClient, mailhog_service_name: str = "mailhog", fallback: Optional[str] = None
+        self,
+        openshift: OpenShiftClient,
+        mailhog_service_name: str = "mailhog",
+        fallback: Optional[str] = None,
+        workers: int = WORKERS,
     ):
         """Initializes the client, the mailhog app has to be running in the
         same openshift as 3scale, and has to be named 'mailhog'"""
@@ -38,19 +62,35 @@ class MailhogClient:
 
         self._searched_messages_ids: Set[str] = set()
         self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_maxsize=workers))
+        self._session.mount("https://", HTTPAdapter(pool_maxsize=workers))
+        self.workers = workers
+        # messages seen so far by ID, mailhog messages are immutable
+        self._index: Dict[str, dict] = {}
+        self._by_subject: Dict[str, Set[str]] = {}
+        self._by_recipient: Dict[str, Set[str]] = {}
+        # index contains all the messages created after the first fetch up to the cursor (newest fetched message)
+        self._cursor: Optional[datetime] = None
+        self._cursor_set = False
+        # index contains all the messages matching these server-side searches
+        self._searches: Set[Tuple[str, str]] = set()
 
     @property
     def url(self) -> str:
         """Url of the mailhog app"""
         return self._url
 
-    def request(self, method: str = "GET", params: dict = None, endpoint: str = None):
+    def request(
+        self, method: str = "GET", params: dict = None, endpoint: str = None, expected_statuses: Iterable[int] = (200,)
+    ):
         """Requests the mailhog API"""
         params = params or {}
 
         full_url = f"{self._url}/{endpoint}"
         response = self._session.request(method=method, url=full_url, params=params)
-        assert response.status_code == 200, f"The request to mailhog failed: {response.status_code} {response.text}"
+        assert (
+            response.status_code in expected_statuses
+        ), f"The request to mailhog failed: {response.status_code} {response.text}"
         return response
 
     def append_to_searched_messages(self, message):
@@ -67,51 +107,217 @@ class MailhogClient:
             all_messages.extend(messages)
         return all_messages
 
+    def _get_chunk(self, start: int, chunk_size: int) -> List[dict]:
+        params = {"start": start, "limit": chunk_size}
+        return self.request(params=params, endpoint="api/v2/messages").json()["items"]
+
     def get_messages_by_chunk(self, chunk_size: int = 250, limit: Optional[int] = None):
         """
         A generator function that retrieves all MailHog messages in chunks.
+        Up to `workers` chunks are fetched concurrently ahead, they are yielded in order.
         @param chunk_size: The number of messages to retrieve in each chunk (default 100).
         @param limit: limits number of returned messages
         :yield: A list of MailHog messages.
         """
         # Retrieve the total number of messages
         response = self.request(endpoint="/api/v2/messages?count=0")
-        total_messages = limit or int(response.json()["total"])
+        total_messages = int(response.json()["total"])
+        if limit is not None:
+            total_messages = min(limit, total_messages)
+        if total_messages <= chunk_size:
+            if total_messages > 0:
+                yield self._get_chunk(0, total_messages)
+            return
+
+        # Retrieve messages in chunks, the last one is cut to honor the limit
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending: Deque = deque()
+        try:
+            for i in range(0, total_messages, chunk_size):
+                pending.append(executor.submit(self._get_chunk, i, min(chunk_size, total_messages - i)))
+                if len(pending) >= self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # consumer may stop early, chunks fetched ahead are not waited for
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def search(self, kind: str, query: str, chunk_size: int = 250) -> Iterator[List[dict]]:
+        """
+        A generator function that retrieves messages found by mailhog search in chunks.
+        @param kind: One of from, to, containing
+        @param query: Searched text, mailhog matches it as a substring
+        @param chunk_size: The number of messages to retrieve in each chunk
+        :yield: A list of MailHog messages.
+        """
+        start = 0
+        while True:
+            params = {"kind": kind, "query": query, "start": start, "limit": chunk_size}
+            response = self.request(params=params, endpoint="api/v2/search").json()
+            if response["items"]:
+                yield response["items"]
+            start += len(response["items"])
+            if not response["items"] or start >= int(response["total"]):
+                return
+
+    def _add_to_index(self, message: dict):
+        if message["ID"] in self._index:
+            return
+        self._index[message["ID"]] = message
+        headers = message["Content"]["Headers"]
+        for subject in headers.get("Subject", []):
+            self._by_subject.setdefault(subject, set()).add(message["ID"])
+        for recipient in headers.get("To", []):
+            self._by_recipient.setdefault(recipient, set()).add(message["ID"])
+
+    def _remove_from_index(self, mail_id: str):
+        message = self._index.pop(mail_id, None)
+        if message is None:
+            return
+        headers = message["Content"]["Headers"]
+        for subject in headers.get("Subject", []):
+            self._by_subject.get(subject, set()).discard(mail_id)
+        for recipient in headers.get("To", []):
+            self._by_recipient.get(recipient, set()).discard(mail_id)
+
+    def _reset_index(self):
+        self._index.clear()
+        self._by_subject.clear()
+        self._by_recipient.clear()
+        self._searches.clear()
+        self._cursor = None
+        self._cursor_set = False
+
+    def _fetch_new_messages(self, chunk_size: int = 250):
+        """Indexes messages received since the previous fetch
+
+        Mailhog returns the newest messages first, so the paging stops at the first message created before
+        the cursor (creation time of the newest message seen by the previous fetch). Messages indexed by
+        searches meanwhile don't stop it, neither deletion of the cursor message does.
+        The first fetch only sets the cursor, older messages are indexed by searches.
+        """
+        start = 0
+        newest = self._cursor
+        while True:
+            params = {"start": start, "limit": 1 if not self._cursor_set else chunk_size}
+            messages = self.request(params=params, endpoint="api/v2/messages").json()["items"]
+            for message in messages:
+                created = _created(message)
+                if self._cursor is not None and created < self._cursor - CURSOR_SLACK:
+                    self._cursor = newest
+                    return
+                self._add_to_index(message)
+                newest = created if newest is None else max(newest, created)
+            start += len(messages)
+            if not messages or not self._cursor_set:
+                self._cursor, self._cursor_set = newest, True
+                return
+
+    @staticmethod
+    def _search_criterion(subject=None, content=None, sender=None, receiver=None) -> Optional[Tuple[str, str]]:
+        """The most selective criterion mailhog can search by, the search finds superset of the matching messages
+
+        Kinds to and from match only the address, not whole header value, therefore kind containing is used.
+        """
+        for value in (receiver, subject, sender, content):
+            if value is not None:
+                return "containing", value
+        return None
+
+    @staticmethod
+    def _matches(message: dict, subject=None, content=None, sender=None, receiver=None) -> bool:
+        headers = message["Content"]["Headers"]
+        return not (
+            (content is not None and content not in message["Content"]["Body"])
+            or (subject is not None and subject not in headers.get("Subject", []))
+            or (sender is not None and sender not in headers.get("From", []))
+            or (receiver is not None and receiver not in headers.get("To", []))
+        )
+
+    def _candidates(self, subject=None, receiver=None) -> List[dict]:
+        """Indexed messages possibly matching, narrowed down by subject or recipient"""
+        if subject is not None:
+            return [self._index[i] for i in self._by_subject.get(subject, ())]
+        if receiver is not None:
+            return [self._index[i] for i in self._by_recipient.get(receiver, ())]
+        return list(self._index.values())
+
+    def _matching(self, subject=None, content=None, sender=None, receiver=None) -> List[dict]:
+        return [
+            message
+            for message in self._candidates(subject, receiver)
+            if self._matches(message, subject, content, sender, receiver)
+        ]
 
-        # Retrieve messages in chunks
-        for i in range(0, total_messages, chunk_size):
-            params = {"start": i, "limit": chunk_size}
-            response = self.request(params=params, endpoint="api/v2/messages")
-            messages = response.json()["items"]
-            yield messages
+    def _stored_ids(self, criterion: Optional[Tuple[str, str]]) -> Set[str]:
+        """IDs of messages currently stored by mailhog matching the criterion, found messages are indexed"""
+        found = self.search(*criterion) if criterion is not None else self.get_messages_by_chunk()
+        stored = set()
+        for messages in found:
+            for message in messages:
+                self._add_to_index(message)
+                stored.add(message["ID"])
+        return stored
 
-    # pylint: disable=too-many-arguments, too-many-boolean-expressions
     def find_messages(self, subject=None, content=None, sender=None, receiver=None):
         """Searches for messages by content, subject, sender, receiver
-        CHeck presence of all provided values"""
-        matching_messages = []
-        for messages in self.get_messages_by_chunk():
-            for message in messages:
-                if (
-                    (content is not None and content not in message["Content"]["Body"])
-                    or (subject is not None and subject not in message["Content"]["Headers"]["Subject"])
-                    or (sender is not None and sender not in message["Content"]["Headers"]["From"])
-                    or (receiver is not None and receiver not in message["Content"]["Headers"]["To"])
-                ):
-                    continue
-                matching_messages.append(message)
-                self.append_to_searched_messages(message)
+        CHeck presence of all provided values
+
+        Only messages received since the previous call are fetched, older messages are searched
+        by mailhog the first time given criteria are used and then kept in the index.
+        Without any criterion all the messages are fetched once.
+
+        Messages may be deleted by other clients (e.g. another xdist worker), therefore hits are
+        confirmed by mailhog search and the ones not stored anymore are dropped from the index.
+        """
+        self._fetch_new_messages()
+        criterion = self._search_criterion(subject, content, sender, receiver)
+        if criterion is None:
+            if ("", "") not in self._searches:
+                for messages in self.get_messages_by_chunk():
+                    for message in messages:
+                        self._add_to_index(message)
+                self._searches.add(("", ""))
+        elif criterion not in self._searches and ("", "") not in self._searches:
+            for messages in self.search(*criterion):
+                for message in messages:
+                    self._add_to_index(message)
+            self._searches.add(criterion)
+
+        matching_messages = self._matching(subject, content, sender, receiver)
+        if matching_messages:
+            stored = self._stored_ids(criterion)
+            for message in matching_messages:
+                if message["ID"] not in stored:
+                    self._remove_from_index(message["ID"])
+            matching_messages = self._matching(subject, content, sender, receiver)
+        matching_messages.sort(key=lambda x: x["Created"], reverse=True)
+        for message in matching_messages:
+            self.append_to_searched_messages(message)
         return {"count": len(matching_messages), "items": matching_messages}
 
+    def _delete_message(self, mail_id: str):
+        """Message already deleted (e.g. by another xdist worker) is not an error"""
+        self.request(method="DELETE", endpoint=f"api/v1/messages/{mail_id}", expected_statuses=(200, 404))
+
     def delete(self, mail_id=None):
         """Deletes emails from the mailhog. If id is None all emails are deleted"""
         if mail_id is None:
             self.request(method="DELETE", endpoint="api/v1/messages")
+            self._reset_index()
         elif isinstance(mail_id, str):
-            self.request(method="DELETE", endpoint=f"api/v1/messages/{mail_id}")
+            self._delete_message(mail_id)
+            self._remove_from_index(mail_id)
         else:
-            for mail in mail_id:
-                self.request(method="DELETE", endpoint=f"api/v1/messages/{mail}")
+            # mailhog API can delete either all or single message, many messages are deleted concurrently
+            mail_ids = list(mail_id)
+            with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(mail_ids)))) as executor:
+                list(executor.map(self._delete_message, mail_ids))
+            for mail in mail_ids:
+                self._remove_from_index(mail)
 
     def delete_searched_messages(self):
         """Deletes all searched messages"""
@@ -1,15 +1,20 @@
 """Represents mockserver calls used in tests"""
 
 import json
+import xml.etree.ElementTree as Et
+from typing import Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urljoin
 
-import backoff
 import requests
 from requests import HTTPError
 from weakget import weakget
 
+from testsuite import resilient
 from testsuite.utils import generate_tail
 
+# time to wait for webhooks, the same as total wait of former get_webhook backoff (fibo, 5 tries)
+WEBHOOK_DEADLINE = 7
+
 
 class Mockserver:
     """mockserver interface
@@ -25,6 +30,16 @@ class Mockserver:
         self.verify = verify
         self._webhook = f"/webhook/{generate_tail()}"
         self.url = urljoin(self._url, self._webhook)
+        self._session = requests.Session()
+        self._session.verify = verify
+        # (action, entity id) of already parsed webhook bodies
+        self._parsed: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    def expect_many(self, expectations: List[dict]):
+        """Creates all the expectations in single request"""
+        response = self._session.put(urljoin(self._url, "/mockserver/expectation"), data=json.dumps(expectations))
+        response.raise_for_status()
+        return response
 
     def temporary_fail_request(self, num, status=500, suffix=""):
         """Create failing call for num occurences
@@ -36,59 +51,78 @@ class Mockserver:
         """
         path = f"/fail-request{suffix}/{num}/{status}"
 
-        response = requests.put(
-            urljoin(self._url, "/mockserver/expectation"),
-            verify=self.verify,
-            data=json.dumps(
+        return self.expect_many(
+            [
                 {
                     "httpRequest": {"path": path},
                     "times": {"remainingTimes": num, "unlimited": False},
                     "httpResponse": {"statusCode": status},
                 }
-            ),
+            ]
         )
-        response.raise_for_status()
-        return response
 
-    @backoff.on_predicate(backoff.fibo, lambda x: x is None, max_tries=5, jitter=None)
     def get_webhook(self, action: str, entity_id: str):
         """
         Reimplementation of interface from RequestBinClient
-        :return webhook for given action and entity_id
+        :return the last webhook for given action and entity_id, None if it doesn't arrive in time
         """
+        return self.wait_for_webhooks([(action, entity_id)])[0]
+
+    def _parse(self, body: str) -> Tuple[Optional[str], Optional[str]]:
+        """Returns action and entity id of the webhook, the same as the xpath of get_webhook matches"""
+        if body not in self._parsed:
+            try:
+                event = Et.fromstring(body)
+                webhook_type = event.findtext("type")
+                self._parsed[body] = event.findtext("action"), event.findtext(f"object/{webhook_type}/id")
+            except Et.ParseError:
+                self._parsed[body] = None, None
+        return self._parsed[body]
+
+    def _collect_webhooks(self, found: Dict[Tuple[str, str], str], webhooks: Iterable[Tuple[str, str]]) -> bool:
+        """Retrieves all the webhooks once and adds the expected ones to found, returns True if all were found"""
         try:
-            matcher = {
-                "method": "POST",
-                "path": self._webhook,
-                "body": {
-                    "type": "XPATH",
-                    # this is xpath, it's long
-                    # pylint: disable=line-too-long
-                    "xpath": f'/event[action/text() = "{action}"]/object/*[local-name() = /event/type/text()]/id[text() = "{entity_id}"]',  # noqa
-                },
-            }
-            response = self._retrieve(matcher)
+            response = self._retrieve({"method": "POST", "path": self._webhook})
         except requests.exceptions.HTTPError:
-            return None
-        return weakget(response.json())[-1]["httpRequest"]["body"]["xml"] % None
+            return False
+        for recorded in response.json():
+            body = weakget(recorded)["httpRequest"]["body"] % None
+            body = body.get("xml", body.get("string")) if isinstance(body, dict) else body
+            if body:
+                found[self._parse(body)] = body
+        return all(i in found for i in webhooks)
+
+    def wait_for_webhooks(
+        self, webhooks: Iterable[Tuple[str, str]], deadline: float = WEBHOOK_DEADLINE
+    ) -> List[Optional[str]]:
+        """
+        Waits for webhooks of many entities at once, all received requests are retrieved once per poll
+        :param webhooks: Pairs of action and entity_id
+        :param deadline: Max time in seconds to wait
+        :return webhooks in the order of the pairs, None for the ones which didn't arrive
+        """
+        webhooks = [(action, str(entity_id)) for action, entity_id in webhooks]
+        found: Dict[Tuple[str, str], str] = {}
+        resilient.poll(
+            "mockserver_webhooks", self._collect_webhooks, found, webhooks, until=lambda x: x, deadline=deadline
+        )
+        return [found.get(i) for i in webhooks]
 
     def _retrieve(self, matcher):
         """Do mockserver/retrieve"""
-        response = requests.put(
+        response = self._session.put(
             urljoin(self._url, "/mockserver/retrieve"),
             params={"type": "REQUEST_RESPONSES"},
             data=json.dumps(matcher),
-            verify=self.verify,
         )
         response.raise_for_status()
         return response
 
     def verify_sequence(self, expected_requests) -> bool:
         """Verifies that a sequence of requests was received on a Mockserver"""
-        response = requests.put(
+        response = self._session.put(
             urljoin(self._url, "/mockserver/verifySequence"),
             data=json.dumps({"httpRequests": expected_requests}),
-            verify=self.verify,
         )
         if response.status_code == 400:
             raise HTTPError("Invalid matcher format", response=response)
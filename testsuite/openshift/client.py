@@ -19,6 +19,7 @@ from testsuite.openshift.deployments import (
 )
 from testsuite.openshift.objects import ConfigMaps, Routes, Secrets
 from testsuite.openshift.scaler import Scaler
+from testsuite.openshift.transport import RestTransport
 
 
 class ServiceTypes(enum.Enum):
@@ -74,6 +75,11 @@ class OpenShiftClient:
                 return oc.APIObject(string_to_model=result.out())
             return result
 
+    @cached_property
+    def transport(self):
+        """Transport for basic operations, talks directly to the API server with oc as a fallback"""
+        return RestTransport(self)
+
     @cached_property
     def project_exists(self):
         """Returns True if the project exists"""
@@ -154,12 +160,7 @@ class OpenShiftClient:
             :param patch: The patch to be applied to the resource
             :param patch_type: Optional. The type of patch being provided; one of [json merge strategic]
         """
-        cmd_args = []
-        if patch_type:
-            cmd_args.extend(["--type", patch_type])
-
-        patch_serialized = json.dumps(patch)
-        self.do_action("patch", [resource_type, resource_name, cmd_args, "-p", patch_serialized])
+        self.transport.patch(resource_type, resource_name, patch, patch_type)
 
     def apply(self, resource: Dict[str, Any]):
         """Apply the specified resource to the server.
@@ -169,6 +170,7 @@ class OpenShiftClient:
         with ExitStack() as stack:
             self.prepare_context(stack)
             oc.apply(resource)
+        self.transport.invalidate(resource.get("kind", ""))
 
     def delete(self, resource_type: str, name: str, force: bool = False, ignore_not_found=False):
         """Delete a resource.
@@ -178,10 +180,7 @@ class OpenShiftClient:
             :param force: Pass --force to oc delete
             :param ignore_not_found: If false, it will fail if the object doesn't exist
         """
-        args = [f"--ignore-not-found={ignore_not_found}"]
-        if force:
-            args.append("-f")
-        self.do_action("delete", [resource_type, name, args])
+        self.transport.delete(resource_type, name, force, ignore_not_found)
 
     def delete_app(self, app: str, resources: Optional[str] = None):
         """Removes resources belonging to certain application
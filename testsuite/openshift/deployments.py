@@ -9,6 +9,7 @@ from datetime import timezone
 import openshift_client as oc
 
 from testsuite.openshift.env import Environ
+from testsuite.openshift.transport import UnsupportedOperation
 
 if typing.TYPE_CHECKING:
     from testsuite.openshift.client import OpenShiftClient
@@ -185,6 +186,13 @@ class KubernetesDeployment(Deployment):
         self.wait_for()
 
     def wait_for(self, timeout: int = 90):
+        try:
+            self.openshift.transport.wait_for(
+                self.resource_type, self.name, lambda deployment: "readyReplicas" in deployment["status"], timeout
+            )
+            return
+        except UnsupportedOperation:
+            pass
         with ExitStack() as stack:
             self.openshift.prepare_context(stack)
             stack.enter_context(oc.timeout(timeout))
@@ -213,8 +221,25 @@ class DeploymentConfig(Deployment):
         self.openshift.do_action("rollout", ["status", self.resource])
 
     def wait_for(self, timeout: int = 90):
+        try:
+            self.openshift.transport.wait_for(self.resource_type, self.name, self._rolled_out, timeout)
+            return
+        except UnsupportedOperation:
+            pass
         self.openshift.do_action("rollout", ["status", f"--timeout={timeout}s", self.resource])
 
+    @staticmethod
+    def _rolled_out(config: dict) -> bool:
+        """Same condition as `oc rollout status` uses, latest version is available with all the replicas"""
+        status = config["status"]
+        progressing = [i for i in status.get("conditions", []) if i["type"] == "Progressing"]
+        return (
+            status.get("observedGeneration", 0) >= config["metadata"]["generation"]
+            and status.get("updatedReplicas", 0) == status.get("availableReplicas", 0) == config["spec"]["replicas"]
+            and status.get("unavailableReplicas", 0) == 0
+            and any(i["reason"] == "NewReplicationControllerAvailable" for i in progressing)
+        )
+
     def get_pods(self):
         def select_pod(apiobject):
             latest_version = apiobject.get_annotation("openshift.io/deployment-config.latest-version")
@@ -10,6 +10,8 @@ from typing import List, Union
 import yaml
 
 from testsuite.certificates import Certificate
+from testsuite.openshift.transport import UnsupportedOperation
+from testsuite.openshift.watch import Watch
 
 if typing.TYPE_CHECKING:
     # pylint: disable=cyclic-import
@@ -33,12 +35,36 @@ class SecretTypes(enum.Enum):
 
 
 class RemoteMapping:
-    """Dict-like interface to generic yaml object"""
+    """Dict-like interface to generic yaml object
+
+    Reads are served from local cache of the namespace kept fresh by a watch (if possible),
+    objects not found in the cache are fetched from the server to see also the newest ones.
+    """
 
     def __init__(self, client: "OpenShiftClient", resource_name: str):
         self._client = client
         self._resource_name = resource_name
 
+    def _store(self) -> typing.Optional[Watch]:
+        """Returns local cache of the objects, None if they can't be cached"""
+        try:
+            return self._client.transport.store(self._resource_name)
+        except UnsupportedOperation:
+            return None
+
+    def _refresh(self):
+        """Makes own changes visible in the cache"""
+        store = self._store()
+        if store is not None:
+            store.refresh()
+
+    def _get(self, name):
+        store = self._store()
+        res = store.get(name) if store is not None else None
+        if res is None:
+            res = self._client.transport.get(self._resource_name, name)
+        return res
+
     def do_action(self, verb: str, cmd_args: List[Union[str, List[str]]] = None, auto_raise: bool = True):
         """Executes command and returns output in yaml format"""
         cmd_args = cmd_args or []
@@ -47,25 +73,28 @@ class RemoteMapping:
 
     def __iter__(self):
         """Return iterator for requested resource"""
-        data = self.do_action("get", [self._resource_name])
+        store = self._store()
+        if store is not None:
+            return iter(store.objects())
+        data = self._client.transport.get(self._resource_name)
         return iter(data["items"])
 
     def __getitem__(self, name):
         """Return requested resource in yaml format"""
 
-        res = self.do_action("get", [self._resource_name, name, "--ignore-not-found=true"])
+        res = self._get(name)
         if res is None:
             raise KeyError()
         return res
 
     def __contains__(self, name):
-        res = self.do_action("get", [self._resource_name, name, "--ignore-not-found=true"])
-        return res is not None
+        return self._get(name) is not None
 
     def __delitem__(self, name):
         if name not in self:
             raise KeyError()
-        self._client.do_action("delete", [self._resource_name, name])
+        self._client.delete(self._resource_name, name)
+        self._refresh()
 
 
 class Routes(RemoteMapping):
@@ -88,7 +117,9 @@ class Routes(RemoteMapping):
         """Expose containers internally as services or externally via routes.
         Returns requested route in yaml format.
         """
-        return self._client.do_action("expose", ["service", service, f"--hostname={hostname}", f"--name={name}"])
+        result = self._client.do_action("expose", ["service", service, f"--hostname={hostname}", f"--name={name}"])
+        self._refresh()
+        return result
 
     def create(self, name: str, route_type: "Types" = Types.EDGE, **kwargs):
         """Expose containers externally via secured routes
@@ -99,7 +130,9 @@ class Routes(RemoteMapping):
         """
         cmd_args = [f"--{k}={v}" for k, v in kwargs.items()]
         cmd_args.append("--output=json")
-        return self._client.do_action("create", ["route", route_type.value, name, cmd_args], parse_output=True)
+        route = self._client.do_action("create", ["route", route_type.value, name, cmd_args], parse_output=True)
+        self._refresh()
+        return route
 
     def for_service(self, service) -> list:
         """
@@ -109,7 +142,12 @@ class Routes(RemoteMapping):
         :param service: service name in OpenShift
         :return: list of routes
         """
-        routes = [r for r in self if r["spec"]["to"]["name"] == service]
+        store = self._store()
+        if store is not None:
+            store.add_index("service", lambda route: route["spec"]["to"]["name"])
+            routes = store.by_index("service", service)
+        else:
+            routes = [r for r in self if r["spec"]["to"]["name"] == service]
         routes = list(
             sorted(routes, key=lambda x: float(x["metadata"]["labels"].get("3scale.net/tenant_id", math.inf)))
         )
@@ -183,6 +221,7 @@ class Secrets(RemoteMapping):
         if labels:
             for key, val in labels.items():
                 self.do_action("label", ["secret/" + name, f"{key}={val}"])
+        self._refresh()
 
 
 class ConfigMaps(RemoteMapping):
@@ -210,3 +249,4 @@ class ConfigMaps(RemoteMapping):
             cmd_args.extend([f"--from-literal={n}={v}" for n, v in literals.items()])
 
         self.do_action("create", [self._resource_name, name, *cmd_args])
+        self._refresh()
@@ -0,0 +1,379 @@
+"""Transports executing basic operations (get, patch, delete) with OpenShift resources
+
+OcTransport forks `oc` binary for every operation, which costs hundreds of ms per call.
+RestTransport talks to the API server directly over pooled https connections and
+falls back to `oc` whenever it can't handle the operation itself (unknown resource
+type, missing credentials, unreachable API or any unexpected response). Therefore
+the behavior including raised exceptions stays the same as with `oc`. The only
+exception is a patch which may have reached the server, it is never repeated.
+"""
+
+import atexit
+import base64
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import Counter
+from contextlib import ExitStack
+from io import StringIO
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+import openshift_client as oc
+import requests
+import urllib3
+import yaml
+from requests.adapters import HTTPAdapter
+
+from testsuite.openshift.watch import Watch, WatchFailed
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from testsuite.openshift.client import OpenShiftClient
+
+log = logging.getLogger(__name__)
+
+# resource type (as used with oc) -> (api path, plural, namespaced)
+RESOURCES: Dict[str, Tuple[str, str, bool]] = {
+    "route": ("/apis/route.openshift.io/v1", "routes", True),
+    "secret": ("/api/v1", "secrets", True),
+    "cm": ("/api/v1", "configmaps", True),
+    "configmap": ("/api/v1", "configmaps", True),
+    "service": ("/api/v1", "services", True),
+    "svc": ("/api/v1", "services", True),
+    "pod": ("/api/v1", "pods", True),
+    "deployment": ("/apis/apps/v1", "deployments", True),
+    "dc": ("/apis/apps.openshift.io/v1", "deploymentconfigs", True),
+    "deploymentconfig": ("/apis/apps.openshift.io/v1", "deploymentconfigs", True),
+    "apimanager": ("/apis/apps.3scale.net/v1alpha1", "apimanagers", True),
+    "project": ("/apis/project.openshift.io/v1", "projects", False),
+}
+
+PATCH_CONTENT_TYPES = {
+    "json": "application/json-patch+json",
+    "merge": "application/merge-patch+json",
+    "strategic": "application/strategic-merge-patch+json",
+}
+
+POOL_SIZE = 16
+# resources of a type in a namespace are cached once they are read this many times,
+# namespaces only probed (e.g. during discovery) don't start the watch
+STORE_AFTER = 3
+
+_store_lock = threading.Lock()
+_store_reads: Counter = Counter()
+
+
+class UnsupportedOperation(Exception):
+    """Operation can't be done over REST and has to be done with oc"""
+
+
+class RequestInterrupted(UnsupportedOperation):
+    """Request failed after it may have reached the server, only idempotent operations can be repeated with oc"""
+
+
+def _singular(resource: str) -> str:
+    """Normalizes resource type, e.g. routes -> route"""
+    resource = resource.lower()
+    if resource not in RESOURCES and resource.endswith("s"):
+        return resource[:-1]
+    return resource
+
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def _ca_file(data: str) -> str:
+    """Stores base64 encoded CA certificate from kubeconfig to a file and returns its path
+
+    The file is the same for the same certificate and it is removed when the process exits.
+    """
+    # pylint: disable=consider-using-with
+    ca_file = tempfile.NamedTemporaryFile("wb", prefix="kube-ca-", suffix=".crt", delete=False)
+    with ca_file:
+        ca_file.write(base64.b64decode(data))
+    atexit.register(_remove, ca_file.name)
+    return ca_file.name
+
+
+def _connect_failure(err: requests.RequestException) -> bool:
+    """True if the request failed before it was sent, i.e. the server can't have received it"""
+    if isinstance(err, (requests.ConnectTimeout, requests.exceptions.SSLError)):
+        return True
+    reason = getattr(err.args[0], "reason", None) if err.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+class OcTransport:
+    """Executes operations with `oc` binary"""
+
+    def __init__(self, client: "OpenShiftClient"):
+        self._client = client
+
+    def get(self, resource: str, name: Optional[str] = None) -> Optional[dict]:
+        """Returns the resource or list of all resources of the type if name is not given
+
+        Returns None if named resource doesn't exist
+        """
+        cmd_args = [resource]
+        if name is not None:
+            cmd_args.extend([name, "--ignore-not-found=true"])
+        cmd_args.extend(["-o", "yaml"])
+        return yaml.load(StringIO(self._client.do_action("get", cmd_args).out()), Loader=yaml.FullLoader)
+
+    def patch(self, resource: str, name: str, patch, patch_type: Optional[str] = None):
+        """Patches the resource, patch_type is one of [json merge strategic]"""
+        cmd_args = []
+        if patch_type:
+            cmd_args.extend(["--type", patch_type])
+        self._client.do_action("patch", [resource, name, cmd_args, "-p", json.dumps(patch)])
+
+    def delete(self, resource: str, name: str, force: bool = False, ignore_not_found: bool = False):
+        """Deletes the resource"""
+        args = [f"--ignore-not-found={ignore_not_found}"]
+        if force:
+            args.append("-f")
+        self._client.do_action("delete", [resource, name, args])
+
+    # pylint: disable=no-self-use
+    def wait_for(self, resource: str, name: Optional[str], condition: Callable[[dict], bool], timeout: float):
+        """Waits until the resource satisfies the condition, raises UnsupportedOperation if it can't wait
+
+        Args:
+            :param resource: The resource type
+            :param name: The resource name, None for any resource of the type
+            :param condition: Function getting the resource as a dict
+            :param timeout: Max time to wait in seconds
+        """
+        raise UnsupportedOperation()
+
+    # pylint: disable=no-self-use
+    def store(self, resource: str) -> Watch:
+        """Returns local cache of all the resources of the type, raises UnsupportedOperation if it can't be cached"""
+        raise UnsupportedOperation()
+
+    def invalidate(self, resource: str):
+        """Makes changes of the resources of the type done by other means visible in the cache"""
+
+
+class _Session:
+    """Pooled https session to single API server authenticated by single token"""
+
+    _lock = threading.Lock()
+    _sessions: Dict[Tuple[str, str], "_Session"] = {}
+
+    def __init__(self, server_url: str, token: str, verify):
+        self.server_url = server_url.rstrip("/")
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        self.session.headers["Accept"] = "application/json"
+        self.session.verify = verify
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+        self.broken = False
+
+    @classmethod
+    def get(cls, server_url: str, token: str, verify) -> "_Session":
+        """Returns session shared by all clients with the same server and token"""
+        with cls._lock:
+            key = (server_url, token)
+            if key not in cls._sessions:
+                cls._sessions[key] = cls(server_url, token, verify)
+            return cls._sessions[key]
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Sends request to the API server, failure to connect disables the session
+
+        Raises UnsupportedOperation if the request can't have reached the server
+        and RequestInterrupted if it failed after it may have been received.
+        Streamed (watch) requests raise the original exception, the watch reconnects itself.
+        """
+        try:
+            kwargs.setdefault("timeout", 30)
+            return self.session.request(method, self.server_url + path, **kwargs)
+        except requests.RequestException as err:
+            if kwargs.get("stream"):
+                raise
+            log.warning("Kubernetes API %s request failed: %s", self.server_url, err)
+            if _connect_failure(err):
+                self.broken = True
+                raise UnsupportedOperation() from err
+            raise RequestInterrupted() from err
+
+
+class RestTransport(OcTransport):
+    """Executes operations over REST API of the server, uses `oc` as a fallback
+
+    The server url and token are taken from the client, if the client doesn't have
+    them, they are resolved (once per client) from current oc login.
+    """
+
+    def __init__(self, client: "OpenShiftClient"):
+        super().__init__(client)
+        self._lock = threading.Lock()
+        self._session: Optional[_Session] = None
+        self._resolved = False
+
+    def _resolve(self) -> Optional[_Session]:
+        """Finds the credentials, None if they are not available"""
+        with self._lock:
+            if not self._resolved:
+                self._resolved = True
+                try:
+                    server_url = self._client.server_url or self._client.api_url
+                    token = self._client.token or self._oc("whoami", "-t")
+                    self._session = _Session.get(server_url, token, self._verify(server_url))
+                except oc.OpenShiftPythonException as err:
+                    log.debug("Using oc transport, credentials not available: %s", err)
+            if self._session is None or self._session.broken:
+                return None
+            return self._session
+
+    def _oc(self, *args) -> str:
+        """Runs oc command in the context of the client"""
+        with ExitStack() as stack:
+            self._client.prepare_context(stack)
+            return oc.invoke(args[0], list(args[1:])).out().strip()
+
+    def _verify(self, server_url: str):
+        """Returns value of `verify` for the session according to the kubeconfig, same way as oc does"""
+        if os.environ.get("OPENSHIFT_CLIENT_PYTHON_DEFAULT_SKIP_TLS_VERIFY") == "true":
+            return False
+        try:
+            config = json.loads(self._oc("config", "view", "--minify", "--raw", "-o", "json"))
+            cluster = config["clusters"][0]["cluster"]
+        except (oc.OpenShiftPythonException, ValueError, KeyError, IndexError):
+            return True
+        if cluster.get("server", "").rstrip("/") != server_url.rstrip("/"):
+            return True
+        if cluster.get("insecure-skip-tls-verify"):
+            return False
+        if "certificate-authority-data" in cluster:
+            return _ca_file(cluster["certificate-authority-data"])
+        return cluster.get("certificate-authority", True)
+
+    def _path(self, resource: str, name: Optional[str] = None) -> str:
+        """Returns API path of the resource"""
+        try:
+            prefix, plural, namespaced = RESOURCES[_singular(resource)]
+        except KeyError as err:
+            raise UnsupportedOperation() from err
+        path = prefix
+        if namespaced:
+            path += f"/namespaces/{self._client.project_name}"
+        path += f"/{plural}"
+        if name is not None:
+            path += f"/{name}"
+        return path
+
+    def _request(self, method: str, resource: str, name: Optional[str] = None, **kwargs) -> requests.Response:
+        session = self._resolve()
+        if session is None:
+            raise UnsupportedOperation()
+        return session.request(method, self._path(resource, name), **kwargs)
+
+    def get(self, resource: str, name: Optional[str] = None) -> Optional[dict]:
+        try:
+            response = self._request("GET", resource, name)
+            if response.status_code == 404 and name is not None:
+                return None
+            if response.ok:
+                return response.json()
+        except UnsupportedOperation:
+            pass
+        return super().get(resource, name)
+
+    def patch(self, resource: str, name: str, patch, patch_type: Optional[str] = None):
+        try:
+            headers = {"Content-Type": PATCH_CONTENT_TYPES[patch_type or "strategic"]}
+            response = self._request("PATCH", resource, name, data=json.dumps(patch), headers=headers)
+        except RequestInterrupted as err:
+            self.invalidate(resource)
+            # patch isn't idempotent (e.g. json patch adding to a list), it must not be applied twice
+            raise oc.OpenShiftPythonException(
+                f"Patch of {resource}/{name} was interrupted, it may have been applied"
+            ) from err
+        except (UnsupportedOperation, KeyError):
+            super().patch(resource, name, patch, patch_type)
+            self.invalidate(resource)
+            return
+        if response.ok:
+            store = self._existing_store(resource)
+            if store is not None:
+                store.written(response.json())
+            return
+        if response.status_code >= 500:
+            self.invalidate(resource)
+            raise oc.OpenShiftPythonException(
+                f"Patch of {resource}/{name} failed, it may have been applied: {response.status_code} {response.text}"
+            )
+        # rejected by the server, oc raises the same error as without the REST transport
+        super().patch(resource, name, patch, patch_type)
+        self.invalidate(resource)
+
+    def wait_for(self, resource: str, name: Optional[str], condition: Callable[[dict], bool], timeout: float):
+        session = self._resolve()
+        if session is None:
+            raise UnsupportedOperation()
+        try:
+            satisfied = Watch.for_path(session, self._path(resource)).wait(name, condition, timeout)
+        except WatchFailed as err:
+            raise UnsupportedOperation() from err
+        if not satisfied:
+            raise oc.OpenShiftPythonException(f"Timeout while waiting for {resource}/{name or '*'}")
+
+    def store(self, resource: str) -> Watch:
+        session = self._resolve()
+        if session is None:
+            raise UnsupportedOperation()
+        path = self._path(resource)
+        if Watch.existing(session, path) is None:
+            with _store_lock:
+                _store_reads[(id(session), path)] += 1
+                if _store_reads[(id(session), path)] < STORE_AFTER:
+                    raise UnsupportedOperation()
+        try:
+            return Watch.for_path(session, path).cache()
+        except WatchFailed as err:
+            raise UnsupportedOperation() from err
+
+    def _existing_store(self, resource: str) -> Optional[Watch]:
+        """Returns the cache of the resources if there is one"""
+        session = self._resolve()
+        if session is None:
+            return None
+        try:
+            return Watch.existing(session, self._path(resource))
+        except UnsupportedOperation:
+            return None
+
+    def invalidate(self, resource: str):
+        store = self._existing_store(resource)
+        if store is not None:
+            try:
+                store.refresh()
+            except (UnsupportedOperation, WatchFailed):
+                pass
+
+    def delete(self, resource: str, name: str, force: bool = False, ignore_not_found: bool = False):
+        if not force:
+            try:
+                response = self._request("DELETE", resource, name)
+                if response.ok or (response.status_code == 404 and ignore_not_found):
+                    store = self._existing_store(resource)
+                    if store is not None:
+                        store.forget(name)
+                    return
+            except RequestInterrupted:
+                # the object may have been already deleted by the interrupted request
+                ignore_not_found = True
+            except UnsupportedOperation:
+                pass
+        super().delete(resource, name, force, ignore_not_found)
+        self.invalidate(resource)
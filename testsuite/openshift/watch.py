@@ -0,0 +1,321 @@
+"""Event driven waiting for state of OpenShift resources and local cache of them
+
+Instead of polling, the resources are watched with Kubernetes watch API and the
+waiting ends as soon as the event satisfying the condition arrives. There is at
+most one watch per resource type and namespace in the process, it is shared by
+all the concurrent waiters and it is closed once nobody waits.
+
+The watch can also serve as an informer, i.e. a local cache of the resources
+populated once by a list and kept fresh by the watch. Such watch is closed once
+the cache isn't read for STORE_IDLE seconds, the next read starts it again.
+"""
+
+import copy
+import json
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from testsuite.openshift.transport import _Session
+
+log = logging.getLogger(__name__)
+
+# how long single watch request lasts before it is reopened
+WATCH_TIMEOUT = 60
+# how many times in a row dropped watch request is reopened before the watch fails
+RECONNECT_TRIES = 5
+# cache not read for this many seconds is dropped and its watch closed
+STORE_IDLE = 300
+
+
+class WatchFailed(Exception):
+    """Resources can't be watched, waiting has to be done some other way"""
+
+
+# pylint: disable=too-few-public-methods
+class _Waiter:
+    """Single waiter for condition on named object"""
+
+    def __init__(self, name: Optional[str], condition: Callable[[dict], bool]):
+        self.name = name
+        self.condition = condition
+        self.event = threading.Event()
+        self.failed = False
+
+    def check(self, obj: dict) -> bool:
+        """Returns True if the object is the awaited one and satisfies the condition"""
+        if self.name is not None and obj["metadata"]["name"] != self.name:
+            return False
+        try:
+            return bool(self.condition(obj))
+        except (KeyError, TypeError, IndexError):
+            return False
+
+
+def _newer(obj: dict, other: Optional[dict]) -> bool:
+    """True if obj is newer version than other, resourceVersion is opaque but in practice it is a number"""
+    if other is None:
+        return True
+    try:
+        return int(obj["metadata"]["resourceVersion"]) >= int(other["metadata"]["resourceVersion"])
+    except (KeyError, ValueError):
+        return True
+
+
+class Watch:
+    """Watch on all resources of one type in one namespace multiplexed to many waiters"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    _lock = threading.Lock()
+    _watches: Dict[Tuple[int, str], "Watch"] = {}
+
+    def __init__(self, session: "_Session", path: str):
+        self.session = session
+        self.path = path
+        self._lock = threading.Lock()
+        self._waiters: List[_Waiter] = []
+        self._objects: Optional[Dict[str, dict]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._cached = False
+        self._synced = threading.Event()
+        self._indexes: Dict[str, Callable[[dict], str]] = {}
+        self._index: Dict[str, Dict[str, Dict[str, dict]]] = {}
+        self._last_used = time.monotonic()
+        self.failed = False
+
+    @classmethod
+    def for_path(cls, session: "_Session", path: str) -> "Watch":
+        """Returns watch shared by all waiters on the same path"""
+        with cls._lock:
+            key = (id(session), path)
+            if key not in cls._watches:
+                cls._watches[key] = cls(session, path)
+            return cls._watches[key]
+
+    @classmethod
+    def existing(cls, session: "_Session", path: str) -> Optional["Watch"]:
+        """Returns the watch on the path if it is used as a populated cache, it doesn't start any watch"""
+        with cls._lock:
+            watch = cls._watches.get((id(session), path))
+        return watch if watch is not None and watch.populated else None
+
+    @property
+    def populated(self) -> bool:
+        """True if the watch is used as a cache and it is populated"""
+        return self._cached and self._synced.is_set() and not self.failed
+
+    def wait(self, name: Optional[str], condition: Callable[[dict], bool], timeout: float) -> bool:
+        """Waits until the object satisfies the condition
+
+        Args:
+            :param name: Name of the object, None for any object of the type
+            :param condition: Function getting the object as a dict
+            :param timeout: Max time to wait in seconds
+        Returns:
+            :returns: False if the time run out
+        """
+        waiter = _Waiter(name, condition)
+        with self._lock:
+            if self.failed:
+                raise WatchFailed(self.path)
+            if self._objects is not None and any(waiter.check(i) for i in self._objects.values()):
+                return True
+            self._waiters.append(waiter)
+            self._start()
+
+        done = waiter.event.wait(timeout)
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        if waiter.failed:
+            raise WatchFailed(self.path)
+        return done
+
+    def cache(self, timeout: float = 30) -> "Watch":
+        """Turns the watch into permanent local cache of the objects and waits until it is populated"""
+        with self._lock:
+            if self.failed:
+                raise WatchFailed(self.path)
+            self._cached = True
+            self._last_used = time.monotonic()
+            self._start()
+        if not self._synced.wait(timeout) or self.failed:
+            raise WatchFailed(self.path)
+        return self
+
+    def add_index(self, name: str, key: Callable[[dict], str]):
+        """Adds index of the cached objects, key function returns index key for an object"""
+        with self._lock:
+            if name not in self._indexes:
+                self._indexes[name] = key
+                self._reindex()
+
+    def get(self, name: str) -> Optional[dict]:
+        """Returns cached object with given name, None if it doesn't exist"""
+        with self._lock:
+            self._last_used = time.monotonic()
+            return copy.deepcopy((self._objects or {}).get(name))
+
+    def objects(self) -> List[dict]:
+        """Returns all the cached objects"""
+        with self._lock:
+            self._last_used = time.monotonic()
+            return copy.deepcopy(list((self._objects or {}).values()))
+
+    def by_index(self, name: str, key: str) -> List[dict]:
+        """Returns all the cached objects with the key in the index"""
+        with self._lock:
+            self._last_used = time.monotonic()
+            return copy.deepcopy(list(self._index[name].get(key, {}).values()))
+
+    def refresh(self):
+        """Re-lists the objects, use it to see own changes immediately without waiting for the watch event"""
+        if self._synced.is_set():
+            self._list()
+
+    def written(self, obj: dict):
+        """Stores object returned by own write, it is visible before the watch event arrives"""
+        self._update(obj)
+
+    def forget(self, name: str):
+        """Removes object deleted by own write, it is visible before the watch event arrives"""
+        with self._lock:
+            obj = (self._objects or {}).pop(name, None)
+            if obj is not None:
+                self._remove_from_index(obj)
+
+    def _start(self):
+        """Starts the watch thread if not running, has to be called with the lock"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"watch-{self.path}", daemon=True)
+            self._thread.start()
+
+    def _reindex(self):
+        """Builds all the indexes from scratch, has to be called with the lock"""
+        self._index = {name: {} for name in self._indexes}
+        for obj in (self._objects or {}).values():
+            self._add_to_index(obj)
+
+    def _add_to_index(self, obj: dict):
+        for name, key in self._indexes.items():
+            try:
+                self._index[name].setdefault(key(obj), {})[obj["metadata"]["name"]] = obj
+            except (KeyError, TypeError):
+                pass
+
+    def _remove_from_index(self, obj: dict):
+        for index in self._index.values():
+            for objects in index.values():
+                objects.pop(obj["metadata"]["name"], None)
+
+    def _notify(self, obj: dict):
+        """Wakes up waiters satisfied by the object, has to be called with the lock"""
+        for waiter in [i for i in self._waiters if i.check(obj)]:
+            self._waiters.remove(waiter)
+            waiter.event.set()
+
+    def _update(self, obj: dict, deleted: bool = False):
+        """Stores new state of the object and wakes up satisfied waiters"""
+        name = obj["metadata"]["name"]
+        with self._lock:
+            if self._objects is None or not _newer(obj, self._objects.get(name)):
+                return
+            self._remove_from_index(obj)
+            if deleted:
+                self._objects.pop(name, None)
+                return
+            self._objects[name] = obj
+            self._add_to_index(obj)
+            self._notify(obj)
+
+    def _fail(self):
+        """Stops the watch and wakes up all waiters to let them fall back to other way of waiting"""
+        with self._lock:
+            self.failed = True
+            for waiter in self._waiters:
+                waiter.failed = True
+                waiter.event.set()
+            self._waiters.clear()
+            self._thread = None
+            self._objects = None
+            self._synced.set()
+
+    def _list(self) -> str:
+        """Fetches current state of all the objects, returns their resourceVersion"""
+        response = self.session.request("GET", self.path)
+        if not response.ok:
+            raise WatchFailed(f"{self.path}: {response.status_code}")
+        data = response.json()
+        with self._lock:
+            self._objects = {i["metadata"]["name"]: i for i in data["items"]}
+            self._reindex()
+            for obj in data["items"]:
+                self._notify(obj)
+        self._synced.set()
+        return data["metadata"]["resourceVersion"]
+
+    def _watch(self, resource_version: str) -> Optional[str]:
+        """Processes events of single watch request, returns None if the watch has to be restarted from scratch"""
+        params = {"watch": "true", "resourceVersion": resource_version, "timeoutSeconds": WATCH_TIMEOUT}
+        with self.session.request("GET", self.path, params=params, stream=True, timeout=WATCH_TIMEOUT + 10) as response:
+            if response.status_code == 410:
+                return None
+            if not response.ok:
+                raise WatchFailed(f"{self.path}: {response.status_code}")
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "ERROR":
+                    if event["object"].get("code") == 410:
+                        # resourceVersion is too old
+                        return None
+                    raise WatchFailed(f"{self.path}: {event['object'].get('message')}")
+                resource_version = event["object"]["metadata"]["resourceVersion"]
+                if event["type"] != "BOOKMARK":
+                    self._update(event["object"], deleted=event["type"] == "DELETED")
+        return resource_version
+
+    def _finished(self) -> bool:
+        """Stops the watch if there are no waiters and it is not used as a cache (or the cache is idle)"""
+        with self._lock:
+            if self._cached and time.monotonic() - self._last_used > STORE_IDLE:
+                log.debug("Cache of %s is idle, closing its watch", self.path)
+                self._cached = False
+            if not self._waiters and not self._cached:
+                self._thread = None
+                self._objects = None
+                self._synced.clear()
+                return True
+            return False
+
+    def _run(self):
+        resource_version = None
+        failures = 0
+        try:
+            while not self._finished():
+                if resource_version is None:
+                    resource_version = self._list()
+                    continue
+                start = time.monotonic()
+                try:
+                    resource_version = self._watch(resource_version)
+                    failures = 0
+                except requests.RequestException as err:
+                    # long-lived connections get dropped, the watch continues from the last seen version
+                    failures += 1
+                    if failures > RECONNECT_TRIES:
+                        raise
+                    log.debug("Watch on %s dropped, reconnecting: %s", self.path, err)
+                    time.sleep(0.25 * 2**failures)
+                    continue
+                log.debug("Watch on %s reopened after %.1fs", self.path, time.monotonic() - start)
+        except Exception as err:  # pylint: disable=broad-except
+            log.warning("Watch on %s failed: %s", self.path, err)
+            self._fail()
@@ -1,14 +1,18 @@
 """Provide a small client for interacting with Prometheus REST API."""
 
+import json
 import logging
+import re
+import threading
 import time
 from datetime import datetime, timedelta, timezone
 from math import ceil
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 from urllib.parse import urljoin
 
 import backoff
 import requests
+from requests.adapters import HTTPAdapter
 
 from testsuite import settings
 
@@ -19,6 +23,8 @@ log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 # 3scale-scrape-configs.yml file
 PROMETHEUS_REFRESH = 30
 
+POOL_SIZE = 8
+
 
 # pylint: disable=too-few-public-methods
 def _params(key: str = "", labels: Optional[Dict[str, str]] = None) -> Dict[str, str]:
@@ -40,27 +46,98 @@ def get_metrics_keys(metrics: list):
     return {m["metric"]["__name__"] for m in metrics}
 
 
+def _last_scrape(target: dict) -> datetime:
+    return datetime.fromisoformat(target["lastScrape"][:19]).replace(tzinfo=timezone.utc)
+
+
+def _scrape_interval(target: dict) -> int:
+    """Scrape interval of the target in seconds, e.g. 30s or 1m"""
+    interval = target["discoveredLabels"].get("__scrape_interval__", f"{PROMETHEUS_REFRESH}s")
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    seconds = sum(int(value) * units[unit] for value, unit in re.findall(r"(\d+)(ms|s|m|h)", interval))
+    return max(ceil(seconds), 1)
+
+
+def counter_increase(values: list, start: Optional[float] = None) -> float:
+    """Increase of a counter over the values of one series returned by query_range.
+
+    Unlike increase() of prometheus it is not extrapolated to the edges of the window,
+    counter resets (e.g. restart of the container) are handled. Series which appeared
+    within the window (first sample is after start) are counted from zero, otherwise
+    from their first sample.
+    Args:
+      :param values: List of [timestamp, value] pairs
+      :param start: Timestamp of the beginning of the window
+    """
+    increase = 0.0
+    if values and start is not None and float(values[0][0]) > start + 1:
+        increase = float(values[0][1])
+    for (_, previous), (_, current) in zip(values, values[1:]):
+        previous, current = float(previous), float(current)
+        # value lower than previous one means that the counter was reset
+        increase += current - previous if current >= previous else current
+    return increase
+
+
+def counter_deltas(series: list, label: Optional[str] = None, start: Optional[datetime] = None) -> Dict:
+    """Increase of the counters of all the series returned by query_range.
+
+    Returns dict of label value (or tuple of all labels if label is not given) -> increase
+    Args:
+      :param series: Result of query_range
+      :param label: Name of the label identifying the series, e.g. status
+      :param start: Beginning of the range, series appearing later are counted from zero
+    """
+    deltas: Dict = {}
+    timestamp = start.timestamp() if start else None
+    for metric in series:
+        key = metric["metric"].get(label) if label else tuple(sorted(metric["metric"].items()))
+        deltas[key] = deltas.get(key, 0.0) + counter_increase(metric["values"], timestamp)
+    return deltas
+
+
 class PrometheusClient:
     """Prometheus REST API Client.
 
     Note: Contains only methods being used by actual tests.
     """
 
-    def __init__(self, endpoint: str, operator_based: bool = None, token: str = None, namespace: str = None):
+    # pylint: disable=too-many-instance-attributes
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        endpoint: str,
+        operator_based: bool = None,
+        token: str = None,
+        namespace: str = None,
+        record: Optional[str] = None,
+    ):
         """
         Args:
             :param endpoint: url where prometheus is deployed
             :param operator_based: if prometheus is expected to gather new info based on PodMonitor or other CRD
             :param token: Bearer token if such auth is required
             :param namespace: namespace of 3scale in case of prometheus gathering multiple 3scale instances
+            :param record: path of a file where all the responses are recorded, see testsuite.prometheus_standin
         """
         self.endpoint = endpoint
+        self.record = record
         self.token = token
         self.namespace = namespace
         self.operator_based = operator_based
         self.headers = None
         if self.token:
             self.headers = {"Authorization": f"Bearer {self.token}"}
+        self.session = requests.Session()
+        self.session.verify = settings["ssl_verify"]
+        self.session.headers.update(self.headers or {})
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=POOL_SIZE))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=POOL_SIZE))
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple, Tuple[float, Dict[str, list]]] = {}
+        # container -> scrape pool of its target
+        self._scrape_pools: Dict[str, Optional[str]] = {}
 
     def _do_request(self, path: str, **kwargs):
         """Make a request to prometheus api.
@@ -70,9 +147,22 @@ class PrometheusClient:
             :param **kwargs: arguments passed to be passed to requests (e.g. params)
         """
         url = urljoin(self.endpoint, path)
-        ssl_verify = settings["ssl_verify"]
 
-        return requests.get(url, verify=ssl_verify, headers=self.headers, **kwargs)
+        response = self.session.get(url, **kwargs)
+        if self.record:
+            self._record(path, kwargs.get("params") or {}, response)
+        return response
+
+    def _record(self, path: str, params: dict, response: requests.Response):
+        """Appends the response to the recording"""
+        try:
+            body = response.json()
+        except ValueError:
+            return
+        record = {"path": path, "params": {k: str(v) for k, v in params.items()}, "status": response.status_code}
+        line = json.dumps({**record, "body": body}) + "\n"
+        with self._lock, open(self.record, "a", encoding="utf-8") as recording:
+            recording.write(line)
 
     def get_metrics(self, key: str = "", labels: Optional[Dict[str, str]] = None) -> list:
         """Get a metric by metric key or labels.
@@ -91,10 +181,125 @@ class PrometheusClient:
         response.raise_for_status()
         return response.json()["data"]["result"]
 
-    def get_targets(self) -> dict:
-        """Get active targets information"""
+    def get_many_metrics(self, keys: Iterable[str], labels: Optional[Dict[str, str]] = None) -> Dict[str, List]:
+        """Get metrics of many keys by single query.
+
+        The result is cached for the scrape interval (or until wait_on_next_scrape),
+        as the values don't change in between.
+
+        Returns dict of key -> list of series same as returned by get_metrics, the list is empty for missing key.
+        Args:
+          :param keys: Key names to be queried in prometheus
+          :param labels: Labels to be put inside {} of prometheus query
+        """
+        keys = sorted(set(keys))
+        labels = dict(labels or {})
+        if self.namespace:
+            labels.setdefault("namespace", self.namespace)
+        cache_key = (tuple(keys), tuple(sorted(labels.items())))
+
+        with self._lock:
+            created, cached = self._cache.get(cache_key, (0.0, {}))
+        if time.monotonic() - created < PROMETHEUS_REFRESH:
+            return {k: list(v) for k, v in cached.items()}
+
+        selector = [f"__name__=~'{'|'.join(keys)}'"] + [f"{k}='{v}'" for k, v in labels.items()]
+        response = self._do_request("/api/v1/query", params={"query": "{%s}" % ",".join(selector)})
+        response.raise_for_status()
+
+        metrics: Dict[str, List] = {key: [] for key in keys}
+        for metric in response.json()["data"]["result"]:
+            metrics.setdefault(metric["metric"]["__name__"], []).append(metric)
+        with self._lock:
+            self._cache[cache_key] = (time.monotonic(), metrics)
+        return {k: list(v) for k, v in metrics.items()}
+
+    def _labels(self, labels: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        if self.namespace:
+            labels = dict(labels or {})
+            labels.setdefault("namespace", self.namespace)
+        return labels
+
+    def query_range(
+        self, query: str, start: datetime, end: Optional[datetime] = None, step: float = PROMETHEUS_REFRESH
+    ) -> list:
+        """Evaluate the query over a time range.
+
+        The end is moved to the next step, so the query is evaluated also at the end (or later)
+        and the last sample isn't missed.
+        Returns list of series, each with list of [timestamp, value] pairs in "values"
+        Args:
+          :param query: PromQL query
+          :param start: Beginning of the range
+          :param end: End of the range, now by default
+          :param step: Resolution in seconds, scrape interval by default
+        """
+        end = end or datetime.now(timezone.utc)
+        end = start + timedelta(seconds=step * ceil((end - start).total_seconds() / step))
+        params = {"query": query, "start": start.timestamp(), "end": end.timestamp(), "step": step}
+        response = self._do_request("/api/v1/query_range", params=params)
+        response.raise_for_status()
+        return response.json()["data"]["result"]
+
+    def get_metrics_range(
+        self, key: str, labels: Optional[Dict[str, str]], start: datetime, end: Optional[datetime] = None
+    ) -> list:
+        """Get series of a metric over a time range, use counter_deltas to compute their increase.
+
+        Args:
+          :param key: Key name to be queried in prometheus
+          :param labels: Labels to be put inside {} of prometheus query
+          :param start: Beginning of the range, e.g. start of the test
+          :param end: End of the range, now by default
+        """
+        return self.query_range(_params(key, self._labels(labels))["query"], start, end)
+
+    def _over_window(
+        self, function: str, key: str, labels: Optional[Dict[str, str]], start: datetime, end: Optional[datetime]
+    ) -> list:
+        """Evaluate range function (increase, rate) of the metric over the window at its end"""
+        end = end or datetime.now(timezone.utc)
+        window = max(ceil((end - start).total_seconds()), 1)
+        query = "%s(%s[%ss])" % (function, _params(key, self._labels(labels))["query"], window)
+        response = self._do_request("/api/v1/query", params={"query": query, "time": end.timestamp()})
+        response.raise_for_status()
+        return response.json()["data"]["result"]
+
+    def increase(
+        self, key: str, labels: Optional[Dict[str, str]], start: datetime, end: Optional[datetime] = None
+    ) -> list:
+        """Get increase of a counter between start and end computed by prometheus (it is extrapolated).
+
+        Returns list of series same as get_metrics, the increase is in "value"
+        Args:
+          :param key: Key name to be queried in prometheus
+          :param labels: Labels to be put inside {} of prometheus query
+          :param start: Beginning of the window, e.g. start of the test
+          :param end: End of the window, now by default
+        """
+        return self._over_window("increase", key, labels, start, end)
+
+    def rate(self, key: str, labels: Optional[Dict[str, str]], start: datetime, end: Optional[datetime] = None) -> list:
+        """Get per-second rate of a counter between start and end computed by prometheus.
+
+        Args:
+          :param key: Key name to be queried in prometheus
+          :param labels: Labels to be put inside {} of prometheus query
+          :param start: Beginning of the window, e.g. start of the test
+          :param end: End of the window, now by default
+        """
+        return self._over_window("rate", key, labels, start, end)
+
+    def get_targets(self, scrape_pool: Optional[str] = None) -> list:
+        """Get active targets information
+
+        Args:
+          :param scrape_pool: Return only targets of the scrape pool (filtered by prometheus)
+        """
 
         params = {"state": "active"}
+        if scrape_pool:
+            params["scrapePool"] = scrape_pool
 
         response = self._do_request("/api/v1/targets", params=params)
         response.raise_for_status()
@@ -135,42 +340,61 @@ class PrometheusClient:
 
         return has_metric
 
+    def _container_targets(self, containers: Set[str]) -> Dict[str, dict]:
+        """Returns active target of each container.
+
+        Once the scrape pool of the container is known, only targets of the pool are requested.
+        """
+        with self._lock:
+            pools = {self._scrape_pools.get(i) for i in containers}
+        if None in pools:
+            targets = self.get_targets()
+        else:
+            targets = [i for pool in sorted(pools) for i in self.get_targets(scrape_pool=pool)]
+
+        found = {}
+        for target in targets:
+            container = target["labels"].get("container")
+            if container in containers and container not in found:
+                found[container] = target
+                with self._lock:
+                    self._scrape_pools[container] = target.get("scrapePool")
+        return found
+
     def wait_on_next_scrape(self, target_container: str, after: Optional[datetime] = None):
         """Block until next scrape for a container is finished"""
+        self.wait_on_next_scrapes([target_container], after)
+
+    def wait_on_next_scrapes(self, containers: Iterable[str], after: Optional[datetime] = None):
+        """Block until next scrape of all the containers is finished, the waiting is concurrent"""
+        containers = set(containers)
+        with self._lock:
+            self._cache.clear()
         if after is None:
             after = datetime.now(timezone.utc)
 
-        def _time_of_scrape():
-            for target in self.get_targets():
-                if "container" in target["labels"].keys() and target["labels"]["container"] == target_container:
-                    last_scrape = datetime.fromisoformat(target["lastScrape"][:19])
-                    return (
-                        last_scrape.replace(tzinfo=timezone.utc),
-                        datetime.strptime(target["discoveredLabels"]["__scrape_interval__"], "%Ss").second,
-                    )
-            return None, PROMETHEUS_REFRESH
-
-        last_scrape, scrape_interval = _time_of_scrape()
-
-        till = after + timedelta(seconds=scrape_interval + 2)
-
-        if last_scrape:
+        targets = self._container_targets(containers)
+        till = []
+        for container in containers:
+            target = targets.get(container)
+            if target is None:
+                till.append(after + timedelta(seconds=PROMETHEUS_REFRESH + 2))
+                continue
+            last_scrape, scrape_interval = _last_scrape(target), _scrape_interval(target)
             if after < last_scrape:
-                return
+                continue
             num = ceil((after - last_scrape).total_seconds() / scrape_interval)
+            till.append(last_scrape + timedelta(seconds=scrape_interval * num + 2))
 
-            till = last_scrape + timedelta(seconds=scrape_interval * num + 2)
-
-        wait_time = (till - datetime.now(timezone.utc)).seconds
-        log.info("Waiting %ss for prometheus scrape", wait_time)
-        time.sleep(wait_time)
+        if till:
+            wait_time = max(0, ceil((max(till) - datetime.now(timezone.utc)).total_seconds()))
+            log.info("Waiting %ss for prometheus scrape of %s", wait_time, ", ".join(sorted(containers)))
+            time.sleep(wait_time)
 
         @backoff.on_predicate(backoff.fibo, lambda x: not x, max_tries=10, jitter=None)
         def _wait_on_next_scrape():
-            _last_scrape, _ = _time_of_scrape()
-            if _last_scrape is not None:
-                return after < _last_scrape
-            return False
+            targets = self._container_targets(containers)
+            return all(i in targets and after < _last_scrape(targets[i]) for i in containers)
 
         _wait_on_next_scrape()
 
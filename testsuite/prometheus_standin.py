@@ -0,0 +1,279 @@
+"""Local stand-in for Prometheus HTTP API to run prometheus related code without a cluster
+
+It implements the part of the API used by PrometheusClient: instant and range
+queries, active targets and runtime info. The data are either synthetic (series
+with constant value or value computed from time, targets scraped periodically)
+or loaded from a recording made by PrometheusClient in recording mode
+(`prometheus.record` setting). Recorded responses are replayed for identical
+requests, recorded vectors and targets are also turned into series and targets,
+so other queries work too.
+
+Only simple queries are supported: selectors with label matchers and
+increase()/rate() of a selector over a range, e.g. `rate(foo{container='x'}[60s])`.
+
+Usage:
+
+    with PrometheusStandin() as standin:
+        standin.add_series("apicast_status", {"container": "apicast-staging", "status": "200"}, lambda t: t // 10)
+        standin.add_target("apicast-staging", scrape_interval=5)
+        client = PrometheusClient(standin.url)
+"""
+
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlparse
+
+from testsuite.prometheus import PROMETHEUS_REFRESH
+
+Value = Union[float, Callable[[float], float]]
+
+# request params which change with time and are ignored when matching recorded responses
+_VOLATILE_PARAMS = {"time", "start", "end"}
+
+_FUNCTION = re.compile(r"^(increase|rate)\((.*)\[(\d+)([smh])\]\)$")
+_SELECTOR = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)?(?:\{(.*)\})?$")
+_MATCHER = re.compile(r"\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*(=~|!~|!=|=)\s*(?:'([^']*)'|\"([^\"]*)\")\s*,?")
+_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+class UnsupportedQuery(Exception):
+    """The query can't be evaluated by the stand-in"""
+
+
+def _recording_key(path: str, params: dict) -> Tuple[str, str]:
+    return path, json.dumps({k: v for k, v in params.items() if k not in _VOLATILE_PARAMS}, sort_keys=True)
+
+
+def _matchers(selector: str) -> List[Callable[[dict], bool]]:
+    """Parses selector into list of predicates on labels of the series"""
+    match = _SELECTOR.match(selector.strip())
+    if match is None:
+        raise UnsupportedQuery(selector)
+    name, labels = match.groups()
+    matchers = []
+    if name:
+        matchers.append(lambda x: x.get("__name__") == name)
+    position = 0
+    while labels and position < len(labels):
+        matcher = _MATCHER.match(labels, position)
+        if matcher is None:
+            raise UnsupportedQuery(selector)
+        position = matcher.end()
+        label, operator, value = matcher.group(1), matcher.group(2), matcher.group(3) or matcher.group(4) or ""
+        matchers.append(_matcher(label, operator, value))
+    return matchers
+
+
+def _matcher(label: str, operator: str, value: str) -> Callable[[dict], bool]:
+    if operator == "=":
+        return lambda x: x.get(label, "") == value
+    if operator == "!=":
+        return lambda x: x.get(label, "") != value
+    regex = re.compile(f"^(?:{value})$")
+    if operator == "=~":
+        return lambda x: bool(regex.match(x.get(label, "")))
+    return lambda x: not regex.match(x.get(label, ""))
+
+
+class PrometheusStandin:
+    """Prometheus API served from memory on a local port"""
+
+    def __init__(self, recording: Optional[str] = None):
+        """
+        Args:
+            :param recording: Path of a recording made by PrometheusClient
+        """
+        self._lock = threading.Lock()
+        self._series: List[Tuple[Dict[str, str], Value]] = []
+        self._targets: Dict[str, dict] = {}
+        self._recorded: Dict[Tuple[str, str], Tuple[int, dict]] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.requests: List[Tuple[str, dict]] = []
+        if recording:
+            self.load(recording)
+
+    def add_series(self, name: str, labels: Optional[Dict[str, str]] = None, value: Value = 0.0):
+        """Adds series, value is either a number or function getting unix time"""
+        with self._lock:
+            self._series.append(({**(labels or {}), "__name__": name}, value))
+
+    def add_target(
+        self,
+        container: str,
+        scrape_interval: int = PROMETHEUS_REFRESH,
+        scrape_pool: Optional[str] = None,
+        labels: Optional[Dict[str, str]] = None,
+    ):
+        """Adds target of the container, it is scraped every scrape_interval seconds"""
+        with self._lock:
+            self._targets[container] = {
+                "labels": {**(labels or {}), "container": container},
+                "scrapePool": scrape_pool or f"podMonitor/{container}",
+                "scrapeInterval": scrape_interval,
+            }
+
+    def load(self, path: str):
+        """Loads responses recorded by PrometheusClient"""
+        with open(path, encoding="utf-8") as recording:
+            records = [json.loads(line) for line in recording if line.strip()]
+        for record in records:
+            self._recorded[_recording_key(record["path"], record["params"])] = (record["status"], record["body"])
+            data = record["body"].get("data") or {}
+            if record["path"].endswith("/query") and data.get("resultType") == "vector":
+                for metric in data["result"]:
+                    labels = dict(metric["metric"])
+                    name = labels.pop("__name__", None)
+                    if name and not any(i[0] == {**labels, "__name__": name} for i in self._series):
+                        self.add_series(name, labels, float(metric["value"][1]))
+            for target in data.get("activeTargets", []) if isinstance(data, dict) else []:
+                interval = target.get("discoveredLabels", {}).get("__scrape_interval__", f"{PROMETHEUS_REFRESH}s")
+                if "container" in target.get("labels", {}):
+                    self.add_target(
+                        target["labels"]["container"],
+                        int(re.sub(r"\D", "", interval) or PROMETHEUS_REFRESH),
+                        target.get("scrapePool"),
+                        target["labels"],
+                    )
+
+    def select(self, selector: str) -> List[Tuple[Dict[str, str], Value]]:
+        """Returns series matching the selector"""
+        matchers = _matchers(selector)
+        with self._lock:
+            return [i for i in self._series if all(m(i[0]) for m in matchers)]
+
+    @staticmethod
+    def _value(value: Value, at: float) -> float:
+        return float(value(at)) if callable(value) else float(value)
+
+    def evaluate(self, query: str, at: float) -> List[Tuple[Dict[str, str], float]]:
+        """Evaluates the query at given unix time"""
+        query = query.strip()
+        function = _FUNCTION.match(query)
+        if function is None:
+            return [(labels, self._value(value, at)) for labels, value in self.select(query)]
+
+        name, selector, window, unit = function.groups()
+        window = int(window) * _UNITS[unit]
+        result = []
+        for labels, value in self.select(selector):
+            increase = max(self._value(value, at) - self._value(value, at - window), 0.0)
+            labels = {k: v for k, v in labels.items() if k != "__name__"}
+            result.append((labels, increase / window if name == "rate" else increase))
+        return result
+
+    def targets(self, scrape_pool: Optional[str] = None) -> List[dict]:
+        """Active targets, the last scrape is at the last multiple of the scrape interval"""
+        now = time.time()
+        with self._lock:
+            targets = list(self._targets.values())
+        result = []
+        for target in targets:
+            if scrape_pool and target["scrapePool"] != scrape_pool:
+                continue
+            interval = target["scrapeInterval"]
+            last_scrape = math.floor(now / interval) * interval
+            result.append(
+                {
+                    "labels": target["labels"],
+                    "scrapePool": target["scrapePool"],
+                    "discoveredLabels": {"__scrape_interval__": f"{interval}s"},
+                    "lastScrape": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(last_scrape)),
+                    "health": "up",
+                }
+            )
+        return result
+
+    def handle(self, path: str, params: dict) -> Tuple[int, dict]:
+        """Returns status and body of the response to API request"""
+        self.requests.append((path, params))
+        # recorded targets would have stale time of last scrape, they are served as added targets
+        recorded = None if path == "/api/v1/targets" else self._recorded.get(_recording_key(path, params))
+        if recorded is not None:
+            return recorded
+        handler = {
+            "/api/v1/query": self._api_query,
+            "/api/v1/query_range": self._api_query_range,
+            "/api/v1/targets": self._api_targets,
+            "/api/v1/status/runtimeinfo": self._api_runtimeinfo,
+        }.get(path)
+        if handler is None:
+            return 404, {"status": "error", "errorType": "not_found", "error": path}
+        try:
+            return 200, {"status": "success", "data": handler(params)}
+        except (UnsupportedQuery, KeyError, ValueError) as err:
+            return 400, {"status": "error", "errorType": "bad_data", "error": f"unsupported: {err}"}
+
+    def _api_query(self, params: dict) -> dict:
+        at = float(params.get("time", time.time()))
+        result = [{"metric": labels, "value": [at, str(value)]} for labels, value in self.evaluate(params["query"], at)]
+        return {"resultType": "vector", "result": result}
+
+    def _api_query_range(self, params: dict) -> dict:
+        start, end, step = float(params["start"]), float(params["end"]), float(params["step"])
+        series: Dict[str, dict] = {}
+        at = start
+        while at <= end:
+            for labels, value in self.evaluate(params["query"], at):
+                key = json.dumps(labels, sort_keys=True)
+                series.setdefault(key, {"metric": labels, "values": []})["values"].append([at, str(value)])
+            at += step
+        return {"resultType": "matrix", "result": list(series.values())}
+
+    def _api_targets(self, params: dict) -> dict:
+        return {"activeTargets": self.targets(params.get("scrapePool")), "droppedTargets": []}
+
+    # pylint: disable=no-self-use,unused-argument
+    def _api_runtimeinfo(self, params: dict) -> dict:
+        return {"startTime": "1970-01-01T00:00:00Z", "storageRetention": "1d"}
+
+    @property
+    def url(self) -> str:
+        """Url of the API"""
+        if self._server is None:
+            raise RuntimeError("Prometheus stand-in is not started")
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "PrometheusStandin":
+        """Starts serving on random local port in background thread"""
+        standin = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            # pylint: disable=invalid-name
+            def do_GET(self):
+                """Serves API request"""
+                url = urlparse(self.path)
+                status, body = standin.handle(url.path, dict(parse_qsl(url.query)))
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *_):  # pylint: disable=arguments-differ
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="prometheus-standin", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stops the server"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -1,15 +1,193 @@
 """Helpers for reliable 3scale API calls (usually with retry)"""
 
+import functools
+import itertools
 import logging
+import threading
 import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Type
 
 import backoff
 from threescale_api.errors import ApiClientError
 
+from testsuite import backoff_telemetry
+
 log = logging.getLogger(__name__)
 
+# same total wait as backoff.fibo with max_tries=8
+DEADLINE = 33
+# number of remembered convergence times per operation
+HISTORY = 20
+# the shortest delay between tries
+MIN_INTERVAL = 0.25
+
+_lock = threading.Lock()
+# operation -> how long it took to succeed (seconds since the first try)
+_convergence: Dict[str, List[float]] = {}
+# operation -> convergence times learned by this process (not loaded)
+_learned: Dict[str, List[float]] = {}
+
+
+def convergence() -> Dict[str, List[float]]:
+    """Returns learned convergence times, to be persisted between sessions"""
+    with _lock:
+        return {k: list(v) for k, v in _convergence.items()}
+
+
+def learned() -> Dict[str, List[float]]:
+    """Returns convergence times learned by this process, xdist worker passes them to the controller"""
+    with _lock:
+        return {k: list(v) for k, v in _learned.items()}
+
+
+def load_convergence(data: Dict[str, List[float]]):
+    """Loads convergence times learned by previous sessions"""
+    with _lock:
+        for operation, times in data.items():
+            _convergence[operation] = (list(times) + _convergence.get(operation, []))[-HISTORY:]
+
+
+def merge_convergence(data: Dict[str, List[float]]):
+    """Adds convergence times learned meanwhile by other process (xdist worker)"""
+    with _lock:
+        for operation, times in data.items():
+            _append(operation, times)
+
+
+def _append(operation: str, times: List[float]):
+    for learned_times in (_convergence.setdefault(operation, []), _learned.setdefault(operation, [])):
+        learned_times.extend(times)
+        del learned_times[:-HISTORY]
+
+
+def _learn(operation: str, duration: float):
+    with _lock:
+        _append(operation, [round(duration, 2)])
+
+
+def _fibo(deadline: float) -> Iterator[float]:
+    """Offsets of the tries same as backoff.fibo, used until something is learned"""
+    offset, wait, following = 0.0, 1, 1
+    while offset + wait < deadline:
+        offset += wait
+        yield offset
+        wait, following = following, wait + following
+    yield deadline
+
+
+def _schedule(operation: str, deadline: float) -> Iterator[float]:
+    """Offsets (from the first try) of following tries
 
-@backoff.on_exception(backoff.fibo, AssertionError, max_tries=8, jitter=None)
+    Tries are dense from shortly before the median convergence time to 90th percentile, but
+    at most half of the tries is spent there. The rest keeps fibo spacing from the last dense
+    try, stretched so the last try is at the deadline. There is never more tries than fibo
+    schedule does, they are just moved to where they are likely to succeed.
+    """
+    with _lock:
+        times = sorted(_convergence.get(operation, []))
+    if not times:
+        yield from _fibo(deadline)
+        return
+    budget = len(list(_fibo(deadline))) - 1
+    dense = budget // 2
+    expected, high = times[len(times) // 2], times[int(len(times) * 0.9)]
+    step = max(MIN_INTERVAL, expected / 10)
+    offset, last = max(MIN_INTERVAL, expected - step), 0.0
+    while offset < deadline and dense > 0:
+        yield offset
+        last = offset
+        budget -= 1
+        dense -= 1
+        if offset >= high:
+            break
+        offset += step
+    yield from _stretched_fibo(last, deadline, budget)
+
+
+def _stretched_fibo(start: float, deadline: float, tries: int) -> Iterator[float]:
+    """At most `tries` + 1 offsets after start with fibo spacing, the last one at the deadline"""
+    offsets = list(_fibo(deadline - start))
+    if len(offsets) > tries + 1:
+        waits = [1, 1]
+        while len(waits) < tries + 1:
+            waits.append(waits[-1] + waits[-2])
+        waits = waits[: tries + 1]
+        offsets = list(itertools.accumulate(wait * (deadline - start) / sum(waits) for wait in waits))
+    for offset in offsets[:-1]:
+        yield start + offset
+    yield deadline
+
+
+# pylint: disable=too-many-locals
+def poll(
+    operation: str,
+    func: Callable,
+    *args,
+    until: Optional[Callable] = None,
+    exceptions: Tuple[Type[Exception], ...] = (),
+    deadline: float = DEADLINE,
+    **kwargs,
+):
+    """Calls the function until it succeeds or the deadline passes, delays between tries are adapted
+    to the convergence times of the operation learned from previous calls
+
+    Args:
+        :param operation: Name of the operation, the convergence times are learned per operation
+        :param func: Function to call
+        :param until: Predicate on the return value, func is retried until it is true
+        :param exceptions: func is retried if it raises any of these
+        :param deadline: Max time in seconds since the first try, the last try is done at the deadline
+    Returns:
+        :returns: The value of successful try, value of the last try if the predicate isn't satisfied
+    """
+    start = time.monotonic()
+    schedule = _schedule(operation, deadline)
+    tries, wait = 0, 0.0
+    while True:
+        tries += 1
+        failure: Optional[Exception] = None
+        result = None
+        try:
+            result = func(*args, **kwargs)
+        except exceptions as err:
+            failure = err
+        if failure is None and (until is None or until(result)):
+            # success of the first try says nothing about when to retry
+            if tries > 1:
+                _learn(operation, time.monotonic() - start)
+            backoff_telemetry.record(f"{__name__}.{operation}", tries, wait, "success")
+            return result
+
+        offset = next(schedule, None)
+        if offset is None or time.monotonic() - start >= deadline:
+            backoff_telemetry.record(f"{__name__}.{operation}", tries, wait, "giveup")
+            if failure is not None:
+                raise failure
+            return result
+        delay = max(0.0, start + offset - time.monotonic())
+        log.debug("Retrying %s in %.2fs (try %s)", operation, delay, tries)
+        wait += delay
+        time.sleep(delay)
+
+
+def adaptive(
+    exceptions: Tuple[Type[Exception], ...] = (),
+    until: Optional[Callable] = None,
+    deadline: float = DEADLINE,
+):
+    """Decorator retrying the function with poll, the function name is the operation"""
+
+    def _decorator(func):
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            return poll(func.__name__, func, *args, until=until, exceptions=exceptions, deadline=deadline, **kwargs)
+
+        return _wrapper
+
+    return _decorator
+
+
+@adaptive(exceptions=(AssertionError,))
 def analytics_list_by_service(threescale, service_id, metric_name, key, threshold=0):
     """Get usage stats for service"""
     value = threescale.analytics.list_by_service(service_id, metric_name=metric_name)[key]
@@ -17,7 +195,7 @@ def analytics_list_by_service(threescale, service_id, metric_name, key, threshol
     return value
 
 
-@backoff.on_exception(backoff.fibo, AssertionError, max_tries=8, jitter=None)
+@adaptive(exceptions=(AssertionError,))
 def analytics_list_by_backend(threescale, backend_id, metric_name, key, threshold=0):
     """Get usage stats for service"""
     value = threescale.analytics.list_by_backend(backend_id, metric_name=metric_name)[key]
@@ -25,7 +203,7 @@ def analytics_list_by_backend(threescale, backend_id, metric_name, key, threshol
     return value
 
 
-@backoff.on_predicate(backoff.fibo, lambda x: x is None, max_tries=7, jitter=None)
+@adaptive(until=lambda x: x is not None, deadline=20)
 def resource_read_by_name(object_instance, name: str):
     """
     Method add backoff function to read_by_name function of specified resource
@@ -38,7 +216,7 @@ def resource_read_by_name(object_instance, name: str):
     return object_instance.read_by_name(name)
 
 
-@backoff.on_exception(backoff.fibo, ApiClientError, max_tries=8, jitter=None)
+@adaptive(exceptions=(ApiClientError,))
 def accounts_create(client, params):
     """
     Shortly after 3scale deployment or new tenant creation accounts.create can
@@ -55,7 +233,16 @@ def accounts_create(client, params):
         raise err
 
 
-@backoff.on_exception(backoff.fibo, ApiClientError, max_tries=8, jitter=None)
+@backoff.on_exception(backoff.fibo, ApiClientError, max_tries=14, jitter=None)
+def backend_delete(backend):
+    """Backend can't be deleted while it is used by a service, delete usages first and retry if needed"""
+
+    for usage in backend.usages():
+        usage.delete()
+    backend.delete()
+
+
+@adaptive(exceptions=(ApiClientError,))
 def proxy_update(svc, params):
     """Proxy update right after service create seems failing sometimes, let's give it bit more tries"""
     return svc.proxy.update(params=params)
@@ -0,0 +1,81 @@
+"""Values discovered once per session and shared by xdist controller and its workers
+
+Without sharing, every xdist worker repeats the same discovery (capabilities,
+tools, prometheus, ...). The controller creates a directory and passes it to the
+workers in workerinput. The first process asking for a value computes it and
+stores it there as json, other processes wait for it (file lock) and read it.
+Without the directory (no xdist) the values are just remembered in memory.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+
+_directory: Optional[str] = None  # pylint: disable=invalid-name
+_values: Dict[str, Any] = {}
+_lock = threading.Lock()
+_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+
+def create() -> str:
+    """Creates directory for shared values, it is done by the controller"""
+    init(tempfile.mkdtemp(prefix="3scale-tests-shared-"))
+    return _directory
+
+
+def init(directory: Optional[str]):
+    """Uses the directory created by the controller"""
+    global _directory  # pylint: disable=global-statement
+    _directory = directory
+
+
+def directory() -> Optional[str]:
+    """Returns the directory for shared values"""
+    return _directory
+
+
+def remove():
+    """Deletes the directory with shared values"""
+    if _directory is not None:
+        shutil.rmtree(_directory, ignore_errors=True)
+        init(None)
+
+
+def _load_or_compute(key: str, func: Callable[[], Any]) -> Any:
+    """Reads the value from the shared directory, computes and stores it if it isn't there yet"""
+    path = os.path.join(_directory, hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+    with open(f"{path}.lock", "a", encoding="utf-8") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as stored:
+                    return json.load(stored)["value"]
+            value = func()
+            with open(f"{path}.tmp", "w", encoding="utf-8") as stored:
+                json.dump({"key": key, "value": value}, stored)
+            os.replace(f"{path}.tmp", path)
+            return value
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def remember(key: str, func: Callable[[], Any]) -> Any:
+    """Returns the value computed by whichever process of the session asked for it first
+
+    Args:
+        :param key: Unique identification of the value
+        :param func: Computes the value, the value has to be json serializable.
+            If it raises, nothing is stored and next call will compute the value again.
+    """
+    with _lock:
+        key_lock = _locks[key]
+    with key_lock:
+        if key not in _values:
+            _values[key] = func() if _directory is None else _load_or_compute(key, func)
+        return _values[key]
@@ -1,38 +1,15 @@
 """Test for apicast pagination"""
 
-import asyncio
-
 import pytest
 
 from testsuite.capabilities import Capability
-from testsuite.utils import blame
 
 
-# pylint: disable=too-many-arguments
 @pytest.fixture(autouse=True)
-async def many_services(request, custom_service, service_proxy_settings, lifecycle_hooks, custom_backend, testconfig):
-    """Creation of 500+ services"""
+def many_services(custom_service, service_proxy_settings, lifecycle_hooks, custom_backend):
+    """Creation of 500+ services, they are deleted concurrently by cleanup_registry"""
     backend_mapping = {"/": custom_backend("backend")}
-
-    def _create_services():
-        params = {"name": blame(request, "svc")}
-        custom_service(params, service_proxy_settings, backend_mapping, autoclean=False, hooks=lifecycle_hooks)
-
-    if not testconfig["skip_cleanup"]:
-
-        def _cleanup():
-            loop = asyncio.new_event_loop()
-            try:
-                loop.run_until_complete(
-                    asyncio.gather(*(loop.run_in_executor(None, f) for f in custom_service.orphan_finalizers))
-                )
-            finally:
-                loop.run_until_complete(loop.shutdown_default_executor())
-                loop.close()
-
-        request.addfinalizer(_cleanup)
-
-    return await asyncio.gather(*(asyncio.to_thread(_create_services) for _ in range(505)))
+    return custom_service.bulk(505, service_proxy_settings, backend_mapping, hooks=lifecycle_hooks)
 
 
 @pytest.fixture(scope="module")
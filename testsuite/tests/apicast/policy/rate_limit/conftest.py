@@ -9,6 +9,7 @@ import pytest_cases
 import threescale_api.errors
 
 from testsuite import rawobj
+from testsuite.httpx import shared_transport
 from testsuite.utils import blame
 
 
@@ -54,7 +55,8 @@ def prod_client(production_gateway, application, request, testconfig):
         app (Application): Application for which create the client.
         promote (bool): If true, then this method also promotes proxy configuration to production.
         version (int): Proxy configuration version of service to promote.
-        redeploy (bool): If true, then the production gateway will be reloaded
+        redeploy (bool): If true, then the production gateway will be reloaded,
+            the client doesn't share connections with others then
 
     Returns:
         api_client (HttpClient): Api client for application
@@ -73,7 +75,8 @@ def prod_client(production_gateway, application, request, testconfig):
         if redeploy:
             production_gateway.reload()
 
-        client = app.api_client(endpoint="endpoint")
+        with shared_transport(not redeploy):
+            client = app.api_client(endpoint="endpoint")
         if hasattr(client, "close"):
             if not testconfig["skip_cleanup"]:
                 request.addfinalizer(client.close)
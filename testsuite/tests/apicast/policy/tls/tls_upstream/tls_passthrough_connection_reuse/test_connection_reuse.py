@@ -42,7 +42,7 @@ def test_connection_reuse(api_client, mapping_rules):
        the first backend)
 
     """
-    client = api_client()
+    client = api_client(shared=False)
 
     response_orig = client.get("/orig/info")
     response_new = client.get("/new/info")
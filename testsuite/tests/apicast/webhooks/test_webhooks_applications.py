@@ -39,21 +39,23 @@ def custom_app(custom_application, custom_app_plan, service, lifecycle_hooks, re
     )
 
 
-def test_application_created(application, requestbin):
+def test_application_created(application, custom_app, requestbin):
     """
     Test:
-        - Create application
-        - Get webhook response for created
-        - Assert that webhook response is not None
-        - Assert that response xml body contains right account id
+        - Create applications
+        - Get webhook responses for created of both at once
+        - Assert that webhook responses are not None
+        - Assert that response xml bodies contain right account id
     """
 
-    webhook = requestbin.get_webhook("created", str(application.entity_id))
-    assert webhook is not None
+    apps = [application, custom_app]
+    webhooks = requestbin.wait_for_webhooks([("created", app.entity_id) for app in apps])
 
-    xml = Et.fromstring(webhook)
-    acc_id = xml.find(".//user_account_id").text
-    assert acc_id == str(application.parent.entity_id)
+    for app, webhook in zip(apps, webhooks):
+        assert webhook is not None, f"created webhook of application {app.entity_id} didn't arrive"
+        xml = Et.fromstring(webhook)
+        acc_id = xml.find(".//user_account_id").text
+        assert acc_id == str(app.parent.entity_id)
 
 
 def test_application_updated(application, requestbin):
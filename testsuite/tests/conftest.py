@@ -2,39 +2,65 @@
 
 # pylint: disable=too-many-lines
 
+import hashlib
+import json
 import logging
 import os
 import secrets
 import signal
-import threading
+import time
 import warnings
 from itertools import chain
-from typing import List
+from typing import List, Optional
 
-import backoff
 import importlib_resources as resources
 import openshift_client as oc
 import pytest
 from dynaconf.vendor.box.exceptions import BoxKeyError
 from pytest_metadata.plugin import metadata_key
-from threescale_api import client, errors
+from threescale_api import client
 from weakget import weakget
 
 # to actually initialize all the providers
 # pylint: disable=unused-import
 import testsuite.capabilities.providers  # noqa
-from testsuite import HTTP2, TESTED_VERSION, configuration, gateways, rawobj, resilient
+from testsuite import (
+    HTTP2,
+    TESTED_VERSION,
+    backoff_telemetry,
+    configuration,
+    gateways,
+    latency,
+    rawobj,
+    resilient,
+    shared,
+)
+from testsuite.bulk import BulkFactory
 from testsuite.capabilities import Capability, CapabilityRegistry
+from testsuite.cleanup import (
+    CleanupRegistry,
+    DeferredDeleter,
+    Deleter,
+    Journal,
+    journal_path,
+)
 from testsuite.config import settings
-from testsuite.httpx import HttpxHook
+from testsuite.httpx import (
+    HttpxHook,
+    close_shared_transports,
+    shared_transport,
+    track_proxy_changes,
+)
 from testsuite.mailhog import MailhogClient
 from testsuite.mockserver import Mockserver
 from testsuite.openshift.client import OpenShiftClient
 from testsuite.prometheus import PrometheusClient
+from testsuite.prometheus_standin import PrometheusStandin
 from testsuite.rhsso import RHSSO, RHSSOServiceConfiguration
 from testsuite.toolbox import toolbox
 from testsuite.tools import Tools
-from testsuite.utils import blame, blame_desc, warn_and_skip
+from testsuite.utils import blame, blame_desc, get_results_dir_path, warn_and_skip
+from testsuite.webhook_receiver import WebhookReceiver
 
 if weakget(settings)["reporting"]["print_app_logs"] % True:
     pytest_plugins = ("testsuite.gateway_logs",)
@@ -99,19 +125,81 @@ def pytest_addoption(parser):
     parser.addoption("--sso-only", action="store_true", default=False, help="Run only tests that uses RHSSO/RHBK")
 
 
+def _capabilities_cache_key():
+    """Key of capabilities in pytest cache, capabilities differ per environment"""
+    _settings = weakget(settings)
+    environment = [
+        _settings["openshift"]["servers"]["default"]["server_url"] % None,
+        _settings["openshift"]["projects"]["threescale"]["name"] % None,
+        _settings["threescale"]["admin"]["url"] % None,
+        _settings["threescale"]["gateway"]["default"]["kind"] % None,
+    ]
+    digest = hashlib.sha256(json.dumps(environment).encode("utf-8")).hexdigest()[:16]
+    return f"3scale/capabilities/{digest}"
+
+
+def _cached_capabilities(config: pytest.Config) -> Optional[dict]:
+    """Returns capabilities persisted in pytest cache unless expired, None if persisting is disabled"""
+    options = weakget(settings)["capabilities"] % {}
+    cache = getattr(config, "cache", None)
+    if not options.get("persist", False) or cache is None:
+        return None
+    cached = cache.get(_capabilities_cache_key(), None)
+    if cached and time.time() - cached["created"] < options.get("ttl", 3600):
+        return cached
+    return {"created": time.time(), "results": {}, "timings": {}}
+
+
+def _persist_capabilities(config: pytest.Config):
+    """Adds newly evaluated capabilities to pytest cache.
+
+    Entry keeps the time of its creation, so the ttl counts since the first evaluation
+    and results are written only when some provider was actually evaluated."""
+    cached = _cached_capabilities(config)
+    registry = CapabilityRegistry()
+    if cached is None or not set(registry.results) - set(cached["results"]):
+        return
+    config.cache.set(
+        _capabilities_cache_key(),
+        {
+            "created": cached["created"],
+            "results": {**registry.results, **cached["results"]},
+            "timings": {**registry.timings, **cached["timings"]},
+        },
+    )
+
+
+def _discover_capabilities(config: pytest.Config):
+    """Evaluates capabilities in advance and/or loads them from pytest cache as configured"""
+    options = weakget(settings)["capabilities"] % {}
+    registry = CapabilityRegistry()
+
+    cached = _cached_capabilities(config)
+    if cached:
+        registry.load(cached["results"], cached["timings"])
+
+    if options.get("eager", False):
+        registry.evaluate_all(options.get("workers", 8))
+        for provider, duration in sorted(registry.timings.items(), key=lambda x: -x[1]):
+            logging.getLogger(__name__).info("Capability provider %s took %.2fs", provider, duration)
+        _persist_capabilities(config)
+
+
 def pytest_sessionstart(session: pytest.Session) -> None:
     """Fail fast if zync configuration doesn't match the actual 3scale deployment.
     Only runs on the controller process, not on xdist workers."""
     if hasattr(session.config, "workerinput"):
         return
+    _discover_capabilities(session.config)
     try:
         _ = Capability.ZYNC_ROUTES in CapabilityRegistry()
     except RuntimeError as e:
         pytest.exit(f"Zync configuration mismatch: {e}", returncode=3)
 
 
+@pytest.hookimpl(tryfirst=True)
 def pytest_configure(config: pytest.Config) -> None:
-    """Ensure mutually exclusive options"""
+    """Ensure mutually exclusive options, set up sharing of discovered values and load learned convergence times"""
     fuzz = config.getoption("--fuzz")
     drop_fuzz = config.getoption("--drop-fuzz")
     if fuzz and drop_fuzz:
@@ -123,6 +211,33 @@ def pytest_configure(config: pytest.Config) -> None:
     if (sandbag or sandbag_only) and drop_sandbag:
         raise pytest.UsageError("--sandbag/--sandbag-only and --drop-sandbag are mutually exclusive")
 
+    if hasattr(config, "workerinput"):
+        shared.init(config.workerinput.get("shared_dir"))
+    elif getattr(config.option, "numprocesses", None):
+        shared.create()
+
+    cache = getattr(config, "cache", None)
+    if cache is not None:
+        resilient.load_convergence(cache.get("3scale/resilient/convergence", {}))
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    """Pass directory with shared values to xdist worker"""
+    node.workerinput["shared_dir"] = shared.directory()
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    """Remove shared values when controller finishes, persist learned convergence times and capabilities"""
+    _persist_capabilities(config)
+    if hasattr(config, "workerinput"):
+        return
+    # xdist workers pass their convergence times to the controller, it is the only one writing them
+    cache = getattr(config, "cache", None)
+    if cache is not None and resilient.learned():
+        cache.set("3scale/resilient/convergence", resilient.convergence())
+    shared.remove()
+
 
 # there are many branches as there are many options to influence test selection
 # pylint: disable=too-many-branches
@@ -163,10 +278,22 @@ def pytest_runtest_setup(item):
             pytest.skip(f"Skipping test because current gateway doesn't have implicit capability {Capability.APICAST}")
 
 
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):  # pylint: disable=unused-argument
+    """Record latency of requests done by the test, including its setup"""
+    if latency.ENABLED:
+        latency.start()
+    yield
+
+
 @pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item, call):  # pylint: disable=unused-argument
-    """Add jira link to html report"""
+    """Add jira link and latency of requests to html report, pass telemetry to xdist controller"""
     pytest_html = item.config.pluginmanager.getplugin("html")
+    stats = latency.stop() if latency.ENABLED and call.when == "call" else None
+    if stats is not None:
+        for name, value in stats.summary().items():
+            item.user_properties.append((f"latency-{name}", value))
     outcome = yield
     report = outcome.get_result()
     extra = getattr(report, "extra", [])
@@ -176,6 +303,71 @@ def pytest_runtest_makereport(item, call):  # pylint: disable=unused-argument
             issue_id = issue.rstrip("/").split("/")[-1]
             extra.append(pytest_html.extras.url(issue, name=issue_id))
         report.extra = extra
+    if stats is not None:
+        # passed to xdist controller together with the report
+        report.latency = stats.to_dict()
+        if pytest_html is not None:
+            summary = ", ".join(f"{k}={v}" for k, v in stats.summary().items())
+            extra.append(pytest_html.extras.html(f"<div>Latency (ms): {summary}</div>"))
+            report.extra = extra
+    if report.when == "teardown":
+        report.backoff = backoff_telemetry.take()
+
+
+_latency_report = latency.SessionReport()
+_backoff_report = backoff_telemetry.SessionReport()
+
+
+def pytest_runtest_logreport(report):
+    """Collect latency of requests and backoff telemetry of all the tests, also from xdist workers"""
+    data = getattr(report, "latency", None)
+    if data is not None:
+        _latency_report.add(report.nodeid, latency.Stats.from_dict(data))
+    data = getattr(report, "backoff", None)
+    if data is not None:
+        _backoff_report.add(data, report.nodeid)
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session):
+    """Collect backoff telemetry of session scoped teardown,
+    xdist worker passes it to the controller together with learned convergence times"""
+    data = backoff_telemetry.take()
+    if hasattr(session.config, "workerinput"):
+        session.config.workeroutput["backoff"] = data
+        session.config.workeroutput["convergence"] = resilient.learned()
+    else:
+        _backoff_report.add(data, "session teardown")
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):  # pylint: disable=unused-argument
+    """Collect backoff telemetry of session scoped teardown and learned convergence times of xdist worker"""
+    output = getattr(node, "workeroutput", {})
+    if output.get("backoff") is not None:
+        _backoff_report.add(output["backoff"], f"session teardown ({node.gateway.id})")
+    resilient.merge_convergence(output.get("convergence", {}))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    """Print and store percentiles of latency of requests and the most expensive backoffs"""
+    if hasattr(config, "workerinput"):
+        return
+    if _backoff_report.wait > 0:
+        terminalreporter.write_sep("-", f"backoff waits (s), total {_backoff_report.wait:.1f}s")
+        for line in _backoff_report.table(limit=10):
+            terminalreporter.write_line(line)
+        path = get_results_dir_path() / "backoff.txt"
+        path.write_text("\n".join(_backoff_report.table()) + "\n", encoding="utf-8")
+        terminalreporter.write_line(f"whole report: {path}")
+    if not _latency_report.tests:
+        return
+    terminalreporter.write_sep("-", "latency of requests (ms), slowest tests by p99")
+    for line in _latency_report.table(limit=20):
+        terminalreporter.write_line(line)
+    path = get_results_dir_path() / "latency.txt"
+    path.write_text("\n".join(_latency_report.table()) + "\n", encoding="utf-8")
+    terminalreporter.write_line(f"whole table: {path}")
 
 
 @pytest.hookimpl(optionalhook=True)
@@ -421,7 +613,8 @@ def prod_client(production_gateway, application, request, lifecycle_hooks):
         app (Application): Application for which create the client.
         promote (bool): If true, then this method also promotes proxy configuration to production.
         version (int): Proxy configuration version of service to promote.
-        redeploy (bool): If true, then the production gateway will be reloaded
+        redeploy (bool): If true, then the production gateway will be reloaded,
+            the client doesn't share connections with others then
 
     Returns:
         api_client (HttpClient): Api client for application
@@ -438,7 +631,8 @@ def prod_client(production_gateway, application, request, lifecycle_hooks):
         if redeploy:
             production_gateway.reload()
 
-        client = app.api_client(endpoint="endpoint")
+        with shared_transport(not redeploy):
+            client = app.api_client(endpoint="endpoint")
         request.addfinalizer(client.close)
         return client
 
@@ -468,6 +662,7 @@ def threescale(testconfig, request):
         )
 
         admin.rest._token = token["value"]
+        track_proxy_changes(admin)
         testconfig.setdefault("threescale", {}).setdefault("admin", {}).update(
             username="admin",
             password=password,
@@ -477,11 +672,13 @@ def threescale(testconfig, request):
 
         return admin
 
-    return client.ThreeScaleClient(
-        testconfig["threescale"]["admin"]["url"],
-        testconfig["threescale"]["admin"]["token"],
-        ssl_verify=testconfig["ssl_verify"],
-        wait=0,
+    return track_proxy_changes(
+        client.ThreeScaleClient(
+            testconfig["threescale"]["admin"]["url"],
+            testconfig["threescale"]["admin"]["token"],
+            ssl_verify=testconfig["ssl_verify"],
+            wait=0,
+        )
     )
 
 
@@ -496,6 +693,43 @@ def master_threescale(testconfig):
     )
 
 
+@pytest.fixture(scope="session")
+def deleter(request, testconfig):
+    """Deletes 3scale objects either immediately or in background thread
+
+    Background deletion is enabled by fixtures.cleanup.background, the session
+    waits at its end for all the deletions to finish. Deletions unfinished due
+    to crash can be resumed by `make clean-orphans`"""
+    if testconfig["skip_cleanup"] or not weakget(testconfig)["fixtures"]["cleanup"]["background"] % False:
+        return Deleter()
+    deferred = DeferredDeleter(Journal(journal_path()))
+    request.addfinalizer(deferred.drain)
+    return deferred
+
+
+@pytest.fixture(scope="session")
+def session_cleanup_registry(request, testconfig, deleter):  # pylint: disable=unused-argument
+    """Deletes session-wide objects (accounts, ...) concurrently at the end of the session
+
+    Use `session_cleanup_registry.add(kind, finalizer)` where kind is one of testsuite.cleanup.LEVELS"""
+    registry = CleanupRegistry()
+    if not testconfig["skip_cleanup"]:
+        request.addfinalizer(registry.run)
+    return registry
+
+
+# deleter dependency is needed to wait for deferred deletions after the registry is finished
+@pytest.fixture(scope="module")
+def cleanup_registry(request, testconfig, deleter):  # pylint: disable=unused-argument
+    """Deletes objects created within module concurrently, level by level (applications, plans, services, ...)
+
+    Use `cleanup_registry.add(kind, finalizer)` where kind is one of testsuite.cleanup.LEVELS"""
+    registry = CleanupRegistry()
+    if not testconfig["skip_cleanup"]:
+        request.addfinalizer(registry.run)
+    return registry
+
+
 @pytest.fixture(scope="session")
 def account_password():
     """Default password for Accounts"""
@@ -521,7 +755,7 @@ def account(custom_account, request, testconfig, account_password):
 
 
 @pytest.fixture(scope="session")
-def custom_account(threescale, request, testconfig):
+def custom_account(threescale, testconfig, session_cleanup_registry, deleter):
     """Parametrized custom Account
 
     Args:
@@ -531,7 +765,7 @@ def custom_account(threescale, request, testconfig):
     def _custom_account(params, autoclean=True, threescale_client=threescale):
         acc = resilient.accounts_create(threescale_client, params=params)
         if autoclean and not testconfig["skip_cleanup"]:
-            request.addfinalizer(acc.delete)
+            session_cleanup_registry.add("accounts", lambda: deleter.delete("accounts", acc.delete, id=acc.entity_id))
         return acc
 
     return _custom_account
@@ -782,6 +1016,12 @@ def httpx():
     return HttpxHook(HTTP2)
 
 
+@pytest.fixture(scope="session", autouse=True)
+def httpx_shared_transports(request):
+    """Connection pools shared by httpx clients are closed at the end of the session"""
+    request.addfinalizer(close_shared_transports)
+
+
 @pytest.fixture(scope="module")
 def service(backends_mapping, custom_service, service_settings, service_proxy_settings, lifecycle_hooks):
     "Preconfigured service with backend defined existing over whole testsing session"
@@ -803,12 +1043,14 @@ def api_client(application, request):
     Fixture that returns api_client
     Parameters:
         app (Application): Application for which create the client.
+        shared (bool): If false, httpx client gets its own connection pool
     Returns:
         api_client (HttpClient): Api client for application
     """
 
-    def _api_client(app=application, **kwargs):
-        client = app.api_client(**kwargs)
+    def _api_client(app=application, shared: bool = True, **kwargs):
+        with shared_transport(shared):
+            client = app.api_client(**kwargs)
         request.addfinalizer(client.close)
         return client
 
@@ -816,26 +1058,26 @@ def api_client(application, request):
 
 
 @pytest.fixture(scope="module")
-def custom_app_plan(custom_service, service_proxy_settings, request, testconfig):
+# pylint: disable=too-many-arguments
+def custom_app_plan(custom_service, service_proxy_settings, request, testconfig, cleanup_registry, deleter):
     """Parametrized custom Application Plan
 
     Args:
         :param params: dict for remote call, rawobj.ApplicationPlan should be used
-        :param service: Service object for which plan should be created"""
-    plans = []
+        :param service: Service object for which plan should be created
+
+    Plans of many services at once:
+        plans = custom_app_plan.bulk(plans_params, item_kwargs=[{"service": svc} for svc in services])"""
 
-    def _custom_app_plan(params, service=None, autoclean=True):
+    def _custom_app_plan(params, service=None, autoclean=True, addfinalizer=cleanup_registry.addfinalizer("plans")):
         if service is None:
             service = custom_service({"name": blame(request, "svc")}, service_proxy_settings)
         plan = service.app_plans.create(params=params)
-        if autoclean:
-            plans.append(plan)
+        if autoclean and not testconfig["skip_cleanup"]:
+            addfinalizer(lambda: deleter.delete("plans", plan.delete, id=plan.entity_id, service_id=service.entity_id))
         return plan
 
-    if not testconfig["skip_cleanup"]:
-        request.addfinalizer(lambda: [item.delete() for item in plans])
-
-    return _custom_app_plan
+    return BulkFactory(_custom_app_plan, "plans", cleanup_registry.addfinalizer("plans"))
 
 
 @pytest.fixture(scope="module")
@@ -883,7 +1125,8 @@ def _select_hooks(hook, hooks):
 
 # custom_app_plan dependency is needed to ensure cleanup in correct order
 @pytest.fixture(scope="module")
-def custom_application(account, custom_app_plan, request, testconfig):  # pylint: disable=unused-argument
+# pylint: disable=unused-argument
+def custom_application(account, custom_app_plan, request, testconfig, cleanup_registry, deleter):
     """Parametrized custom Application
 
     Args:
@@ -893,9 +1136,20 @@ def custom_application(account, custom_app_plan, request, testconfig):  # pylint
     (Typical) Usage:
         plan = custom_app_plan(rawobj.ApplicationPlan("CustomPlan"), service)
         app = custom_application(rawobj.Application("CustomApp", plan))
+
+    Many applications at once:
+        apps = custom_application.bulk([rawobj.Application(blame(request, "app"), plan) for _ in range(100)])
     """
 
-    def _custom_application(params, autoclean=True, hooks=None, annotate=True, account=account):
+    # pylint: disable=too-many-arguments
+    def _custom_application(
+        params,
+        autoclean=True,
+        hooks=None,
+        annotate=True,
+        account=account,
+        addfinalizer=cleanup_registry.addfinalizer("applications"),
+    ):
         params = params.copy()
         for hook in _select_hooks("before_application", hooks):
             params = hook(params)
@@ -913,18 +1167,21 @@ def custom_application(account, custom_app_plan, request, testconfig):  # pylint
                         hook(app)
                     except Exception:  # pylint: disable=broad-except
                         pass
-                app.delete()
+                deleter.delete("applications", app.delete, id=app.entity_id, account_id=account.entity_id)
 
-            request.addfinalizer(finalizer)
+            addfinalizer(finalizer)
 
         app.api_client_verify = testconfig["ssl_verify"]
 
         for hook in _select_hooks("on_application_create", hooks):
             hook(app)
 
+        if latency.ENABLED:
+            latency.instrument(app)
+
         return app
 
-    return _custom_application
+    return BulkFactory(_custom_application, "applications", cleanup_registry.addfinalizer("applications"))
 
 
 @pytest.fixture(scope="module")
@@ -950,104 +1207,95 @@ def backends_mapping(backend_default):
 
 
 @pytest.fixture(scope="module")
-def custom_service(threescale, request, testconfig, logger):
+def custom_service(threescale, request, testconfig, cleanup_registry, deleter):
     """Parametrized custom Service
 
     Args:
         :param params: dict for remote call
         :param proxy_params: dict of proxy options for remote call, rawobj.Proxy should be used
-        :param hooks: List of objects implementing necessary methods from testsuite.lifecycle_hook.LifecycleHook"""
-
-    # pylint: disable=too-few-public-methods
-    class _CustomService:
-        """Object representing original _create_service interface with access to finalizers that are not autocleaned"""
-
-        def __init__(self):
-            self.orphan_finalizers = []
-            self._autoclean = True
-            self._lock = threading.Lock()
-
-        # pylint: disable=too-many-arguments
-        def _custom_service(
-            self,
-            params,
-            proxy_params=None,
-            backends=None,
-            autoclean=True,
-            hooks=None,
-            annotate=True,
-            threescale_client=threescale,
-        ):
-            if not proxy_params:
-                proxy_params = {}
-            params = params.copy()
-            for hook in _select_hooks("before_service", hooks):
-                params = hook(params)
-
-            if annotate:
-                params["description"] = blame_desc(request, params.get("description"))
-
-            svc = threescale_client.services.create(params=params)
-
-            self._autoclean = autoclean
-            if not testconfig["skip_cleanup"]:
+        :param hooks: List of objects implementing necessary methods from testsuite.lifecycle_hook.LifecycleHook
 
-                def finalizer():
-                    for hook in _select_hooks("on_service_delete", hooks):
-                        try:
-                            hook(svc)
-                        except Exception:  # pylint: disable=broad-except
-                            pass
+    Many services at once:
+        services = custom_service.bulk(100, proxy_params, backends)"""
+
+    # pylint: disable=too-many-arguments
+    def _custom_service(
+        params,
+        proxy_params=None,
+        backends=None,
+        autoclean=True,
+        hooks=None,
+        annotate=True,
+        threescale_client=threescale,
+        addfinalizer=cleanup_registry.addfinalizer("services"),
+    ):
+        if not proxy_params:
+            proxy_params = {}
+        params = params.copy()
+        for hook in _select_hooks("before_service", hooks):
+            params = hook(params)
 
-                    svc.delete()
+        if annotate:
+            params["description"] = blame_desc(request, params.get("description"))
 
-                with self._lock:
-                    if autoclean:
-                        request.addfinalizer(finalizer)
-                    else:
-                        self.orphan_finalizers.append(finalizer)
-            if backends:
-                for path, backend in backends.items():
-                    svc.backend_usages.create({"path": path, "backend_api_id": backend["id"]})
-            for hook in _select_hooks("before_proxy", hooks):
-                proxy_params = hook(svc, proxy_params)
+        svc = threescale_client.services.create(params=params)
 
-            if proxy_params:
-                resilient.proxy_update(svc, params=proxy_params)
-            svc.proxy.deploy()
+        if autoclean and not testconfig["skip_cleanup"]:
 
-            for hook in _select_hooks("on_service_create", hooks):
-                hook(svc)
+            def finalizer():
+                for hook in _select_hooks("on_service_delete", hooks):
+                    try:
+                        hook(svc)
+                    except Exception:  # pylint: disable=broad-except
+                        pass
 
-            return svc
+                deleter.delete("services", svc.delete, id=svc.entity_id)
 
-        def __call__(self, *args, **kwargs):
-            return self._custom_service(*args, **kwargs)
+            addfinalizer(finalizer)
+        if backends:
+            for path, backend in backends.items():
+                svc.backend_usages.create({"path": path, "backend_api_id": backend["id"]})
+        for hook in _select_hooks("before_proxy", hooks):
+            proxy_params = hook(svc, proxy_params)
 
-    return _CustomService()
+        if proxy_params:
+            resilient.proxy_update(svc, params=proxy_params)
+        svc.proxy.deploy()
 
+        for hook in _select_hooks("on_service_create", hooks):
+            hook(svc)
 
-@backoff.on_exception(backoff.fibo, errors.ApiClientError, max_tries=14, jitter=None)
-def _backend_delete(backend):
-    """reliable backend delete"""
+        return svc
 
-    for usage in backend.usages():
-        usage.delete()
-    backend.delete()
+    return BulkFactory(
+        _custom_service,
+        "services",
+        cleanup_registry.addfinalizer("services"),
+        default=lambda: {"name": blame(request, "svc")},
+    )
 
 
 @pytest.fixture(scope="module")
 # pylint: disable=too-many-arguments
-def custom_backend(threescale, request, testconfig, private_base_url):
+def custom_backend(threescale, request, testconfig, private_base_url, cleanup_registry, deleter):
     """
     Parametrized custom Backend
     Args:
         :param name: name of backend
         :param endpoint: endpoint of backend
+
+    Many backends at once:
+        backends = custom_backend.bulk(10, endpoint=private_base_url("httpbin"))
     """
 
     def _custom_backend(
-        name="be", endpoint=None, autoclean=True, hooks=None, threescale_client=threescale, blame_name=True
+        name="be",
+        endpoint=None,
+        autoclean=True,
+        hooks=None,
+        threescale_client=threescale,
+        blame_name=True,
+        addfinalizer=cleanup_registry.addfinalizer("backends"),
     ):
         if endpoint is None:
             endpoint = private_base_url()
@@ -1070,28 +1318,50 @@ def custom_backend(threescale, request, testconfig, private_base_url):
                         hook(backend)
                     except Exception:  # pylint: disable=broad-except
                         pass
-                _backend_delete(backend)
+                deleter.delete("backends", lambda: resilient.backend_delete(backend), id=backend.entity_id)
 
-            request.addfinalizer(finalizer)
+            addfinalizer(finalizer)
 
         for hook in _select_hooks("on_backend_create", hooks):
             hook(backend)
 
         return backend
 
-    return _custom_backend
+    return BulkFactory(_custom_backend, "backends", cleanup_registry.addfinalizer("backends"))
+
+
+@pytest.fixture(scope="session")
+def webhook_receiver(testconfig, request):
+    """Webhook receiver running in the test process, None unless enabled by fixtures.webhooks.receiver
+
+    Each xdist worker runs its own receiver, fixed port is offset by the number of the worker (gw1 -> port + 1)."""
+    options = weakget(testconfig)["fixtures"]["webhooks"] % {}
+    if not options.get("receiver", False):
+        yield None
+        return
+    worker = getattr(request.config, "workerinput", {}).get("workerid", "gw0")
+    try:
+        receiver = WebhookReceiver(
+            options.get("url") or None, int(options.get("port", 0)), port_offset=int(worker.lstrip("gw") or 0)
+        ).start()
+    except RuntimeError as err:
+        pytest.fail(f"{err}, set free port by fixtures.webhooks.port (each xdist worker uses port + its number)")
+    yield receiver
+    receiver.stop()
 
 
 @pytest.fixture(scope="module")
-def requestbin(testconfig, tools):
+def requestbin(testconfig, tools, webhook_receiver):
     """
     Returns an instance of RequestBin.
     """
+    if webhook_receiver is not None:
+        return webhook_receiver.bin()
     return Mockserver(tools["mockserver"], testconfig["ssl_verify"])
 
 
 @pytest.fixture(scope="session")
-def custom_tenant(testconfig, master_threescale, request):
+def custom_tenant(testconfig, master_threescale, request, deleter):
     """
     Custom Tenant
     """
@@ -1105,7 +1375,7 @@ def custom_tenant(testconfig, master_threescale, request):
         tenant.wait_tenant_ready()
 
         if autoclean and not testconfig["skip_cleanup"]:
-            request.addfinalizer(tenant.delete)
+            request.addfinalizer(lambda: deleter.delete("tenants", tenant.delete, id=tenant.entity_id))
 
         tenant.account.users.read_by_name(username).activate()
 
@@ -1118,19 +1388,36 @@ def custom_tenant(testconfig, master_threescale, request):
     return _custom_tenant
 
 
-def _resolve_prometheus_client(testconfig, openshift):
+def _resolve_prometheus_client(testconfig, openshift, standin: Optional[PrometheusStandin] = None):
     """
     Returns an instance of Prometheus client if is present in the project, null otherwise .
+    In offline mode the client of the standin is returned, null if the standin isn't given.
     """
     threescale_namespace = weakget(settings)["openshift"]["projects"]["threescale"]["name"] % None
+    if weakget(testconfig)["prometheus"]["offline"] % None:
+        if standin is None:
+            return None
+        return PrometheusClient(standin.url, operator_based=True, namespace=threescale_namespace)
+
+    record = weakget(testconfig)["prometheus"]["record"] % None
     prometheus_url = weakget(testconfig)["prometheus"]["url"] % None
     if prometheus_url:
         token = weakget(testconfig)["prometheus"]["token"] % None
-        return PrometheusClient(prometheus_url, token=token, namespace=threescale_namespace)
+        return PrometheusClient(prometheus_url, token=token, namespace=threescale_namespace, record=record)
 
     if not weakget(testconfig)["openshift"]["servers"]["default"] % False:
         return None
 
+    # probing is done once per session, the result is shared with xdist workers
+    found = shared.remember("prometheus", lambda: _discover_prometheus(openshift, threescale_namespace))
+    if found is None:
+        return None
+    return PrometheusClient(**found, record=record)
+
+
+def _discover_prometheus(openshift, threescale_namespace):
+    """Probes known locations of prometheus, returns arguments for PrometheusClient or None"""
+
     def _prepare_prometheus_endpoint(routes):
         protocol = "https://" if "tls" in routes[0]["spec"] else "http://"
         return protocol + routes[0]["spec"]["host"]
@@ -1140,33 +1427,47 @@ def _resolve_prometheus_client(testconfig, openshift):
     if len(routes) > 0:
         token = oc.whoami(cmd_args="-t")
         prometheus_url = _prepare_prometheus_endpoint(routes)
-        prometheus_client = PrometheusClient(prometheus_url, True, token, threescale_namespace)
-        if prometheus_client.has_metric("rails_requests_total"):
-            return prometheus_client
+        found = {"endpoint": prometheus_url, "operator_based": True, "token": token, "namespace": threescale_namespace}
+        if PrometheusClient(**found).has_metric("rails_requests_total"):
+            return found
 
     routes = openshift().routes.for_service("prometheus-operated")
     if len(routes) > 0:
-        prometheus_url = _prepare_prometheus_endpoint(routes)
-        prometheus_client = PrometheusClient(prometheus_url, True)
-        if prometheus_client.has_metric("rails_requests_total"):
-            return prometheus_client
+        found = {"endpoint": _prepare_prometheus_endpoint(routes), "operator_based": True}
+        if PrometheusClient(**found).has_metric("rails_requests_total"):
+            return found
 
     routes = openshift().routes.for_service("prometheus")
     if len(routes) > 0:
-        prometheus_url = _prepare_prometheus_endpoint(routes)
-        prometheus_client = PrometheusClient(prometheus_url, False)
-        if prometheus_client.has_metric("rails_requests_total"):
-            return prometheus_client
+        found = {"endpoint": _prepare_prometheus_endpoint(routes), "operator_based": False}
+        if PrometheusClient(**found).has_metric("rails_requests_total"):
+            return found
+
+    return None
+
+
+@pytest.fixture(scope="session")
+def prometheus_standin(testconfig):
+    """
+    Returns running Prometheus standin serving recorded responses in offline mode, None otherwise.
+    """
+    offline = weakget(testconfig)["prometheus"]["offline"] % None
+    if not offline:
+        yield None
+        return
+    standin = PrometheusStandin(None if offline is True else offline).start()
+    yield standin
+    standin.stop()
 
 
 # pylint: disable=inconsistent-return-statements
 @pytest.fixture(scope="session")
-def prometheus(testconfig, openshift):
+def prometheus(testconfig, openshift, prometheus_standin):
     """
     Returns an instance of Prometheus client.
     Skips the tests when Prometheus is not present in the project.
     """
-    prometheus_client = _resolve_prometheus_client(testconfig, openshift)
+    prometheus_client = _resolve_prometheus_client(testconfig, openshift, prometheus_standin)
     if prometheus_client is None:
         warn_and_skip(
             "Project with Prometheus must be configured or Prometheus url must be set. "
@@ -2,7 +2,6 @@
 Conftest for performance tests
 """
 
-import asyncio
 import os
 from pathlib import Path
 
@@ -72,21 +71,18 @@ def shared_template(testconfig, number_of_agents):
 
 
 @pytest.fixture(scope="module")
-async def applications(services, custom_application, lifecycle_hooks, number_of_apps):
+def applications(services, custom_application, lifecycle_hooks, number_of_apps):
     """Create multiple application for each service"""
-
-    def _create_apps(svc):
-        plan = svc.app_plans.list()[0]
-        return custom_application(rawobj.Application(randomize("App"), plan), hooks=lifecycle_hooks)
-
-    return await asyncio.gather(
-        *(asyncio.to_thread(_create_apps, svc) for _ in range(number_of_apps) for svc in services)
+    plans = [svc.app_plans.list()[0] for svc in services]
+    return custom_application.bulk(
+        [rawobj.Application(randomize("App"), plan) for _ in range(number_of_apps) for plan in plans],
+        hooks=lifecycle_hooks,
     )
 
 
 # pylint: disable=too-many-arguments
 @pytest.fixture(scope="module")
-async def services(
+def services(
     request,
     custom_backend,
     custom_service,
@@ -99,17 +95,22 @@ async def services(
     lifecycle_hooks,
 ):
     """Create multiple services with multiple backends"""
-
-    def _create_services():
-        backends_mapping = {}
-        for j in range(number_of_backends):
-            backends_mapping[f"/{j}"] = custom_backend(endpoint=private_base_url("httpbin_go"))
-        service_settings.update({"name": blame(request, randomize("perf"))})
-        svc = custom_service(service_settings, service_proxy_settings, backends_mapping, hooks=lifecycle_hooks)
-        custom_app_plan(rawobj.ApplicationPlan(randomize("AppPlan")), svc)
-        return svc
-
-    return await asyncio.gather(*(asyncio.to_thread(_create_services) for _ in range(number_of_products)))
+    backends = custom_backend.bulk(number_of_products * number_of_backends, endpoint=private_base_url("httpbin_go"))
+    mappings = [
+        {f"/{j}": backends[i * number_of_backends + j] for j in range(number_of_backends)}
+        for i in range(number_of_products)
+    ]
+    services = custom_service.bulk(
+        [{**service_settings, "name": blame(request, randomize("perf"))} for _ in range(number_of_products)],
+        service_proxy_settings,
+        hooks=lifecycle_hooks,
+        item_kwargs=[{"backends": mapping} for mapping in mappings],
+    )
+    custom_app_plan.bulk(
+        [rawobj.ApplicationPlan(randomize("AppPlan")) for _ in services],
+        item_kwargs=[{"service": svc} for svc in services],
+    )
+    return services
 
 
 @pytest.fixture(scope="module")
@@ -7,7 +7,6 @@ import backoff
 import pytest
 
 from testsuite.capabilities import Capability
-from testsuite.prometheus import get_metrics_keys
 
 pytestmark = [
     pytest.mark.required_capabilities(Capability.PRODUCTION_GATEWAY),
@@ -37,39 +36,60 @@ METRICS_HISTOGRAM = ["total_response_time_seconds", "upstream_response_time_seco
 STATUSES = [300, 418, 507]
 
 
+def _selected_containers(request):
+    """Apicasts whose metrics are tested by the selected tests of the module"""
+    return sorted(
+        {
+            item.callspec.params["metrics"]
+            for item in request.session.items
+            if item.module is request.module and "metrics" in getattr(getattr(item, "callspec", None), "params", {})
+        }
+    )
+
+
 # pylint: disable=unused-argument
-@pytest.fixture(
-    scope="module", params=["apicast-staging", pytest.param("apicast-production", marks=pytest.mark.disruptive)]
-)
-def metrics(request, prometheus, application, api_client):
-    """Return all metrics from target defined of staging and also production apicast."""
-    # Check if any required metrics don't exist
-    existing_metrics = get_metrics_keys(prometheus.get_metrics(labels={"container": request.param}))
+@pytest.fixture(scope="module")
+def apicast_metrics(request, prometheus, application, api_client):
+    """Return tested metrics of all the apicasts used by the selected tests.
 
+    Missing metrics are triggered in all the apicasts first and then all of them
+    are waited for at once, so each apicast doesn't wait for its own scrape."""
+    keys = METRICS + [f"{metric}_{suffix}" for metric in METRICS_HISTOGRAM for suffix in ["bucket", "sum", "count"]]
     required_standard_metrics = ["threescale_backend_calls", "upstream_status", "apicast_status"]
     required_histogram_metrics = ["total_response_time_seconds", "upstream_response_time_seconds"]
+    required = required_standard_metrics + [
+        f"{metric}_{suffix}" for metric in required_histogram_metrics for suffix in ["bucket", "sum", "count"]
+    ]
+    containers = _selected_containers(request)
+
+    triggered = []
+    for container in containers:
+        # Check if any required metrics don't exist
+        existing_metrics = {k for k, v in prometheus.get_many_metrics(keys, {"container": container}).items() if v}
+        # If some metrics do not exist, trigger with explicit HTTP request
+        if any(metric not in existing_metrics for metric in required):
+            if container == "apicast-production":
+                client = request.getfixturevalue("prod_client")()
+            else:
+                client = api_client()
+            client.get("/get")
+            triggered.append(container)
+
+    if triggered:
+        prometheus.wait_on_next_scrapes(triggered)
+
+    return {
+        container: {k for k, v in prometheus.get_many_metrics(keys, {"container": container}).items() if v}
+        for container in containers
+    }
 
-    standard_missing = any(metric not in existing_metrics for metric in required_standard_metrics)
 
-    histogram_missing = any(
-        f"{metric}_{suffix}" not in existing_metrics
-        for metric in required_histogram_metrics
-        for suffix in ["_bucket", "_sum", "_count"]
-    )
-
-    # If some metrics do not exist, trigger with explicit HTTP request
-    if standard_missing or histogram_missing:
-        if request.param == "apicast-production":
-            prod_client = request.getfixturevalue("prod_client")
-            client = prod_client()
-        else:
-            client = api_client()
-
-        client.get("/get")
-        prometheus.wait_on_next_scrape(request.param)
-
-    metrics = get_metrics_keys(prometheus.get_metrics(labels={"container": request.param}))
-    return metrics
+@pytest.fixture(
+    scope="module", params=["apicast-staging", pytest.param("apicast-production", marks=pytest.mark.disruptive)]
+)
+def metrics(request, apicast_metrics):
+    """Return tested metrics from target defined of staging and also production apicast."""
+    return apicast_metrics[request.param]
 
 
 @pytest.mark.parametrize("expected_metric", METRICS)
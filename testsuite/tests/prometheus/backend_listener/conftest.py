@@ -5,6 +5,7 @@ Conftest for the backend listener prometheus tests
 import pytest
 import requests
 
+from testsuite.prometheus import counter_deltas
 from testsuite.utils import warn_and_skip
 
 
@@ -47,15 +48,11 @@ def service_token(application):
 @pytest.fixture(scope="module")
 def prometheus_response_codes_for_metric(prometheus):
     """
-    Given a prometheus query, returns dict with response
-    codes and counts associated with the response code
+    Given a prometheus query and start of the test, returns dict with response
+    codes and increase of the count of the response code since the start
     """
 
-    def response_codes_for_metric(key, labels):
-        metric_response_codes = prometheus.get_metrics(key, labels)
-        response_codes_count = {}
-        for response_code_metric in metric_response_codes:
-            response_codes_count[response_code_metric["metric"]["resp_code"]] = response_code_metric["value"][1]
-        return response_codes_count
+    def response_codes_for_metric(key, labels, start):
+        return counter_deltas(prometheus.get_metrics_range(key, labels, start), "resp_code", start)
 
     return response_codes_for_metric
@@ -5,6 +5,7 @@ the increase of the metric, respective to the endpoint and returned
 status code, is expected in prometheus.
 """
 
+from datetime import datetime, timezone
 from typing import Dict, Tuple
 
 import pytest
@@ -183,11 +184,9 @@ def test_authrep(data, prometheus_response_codes_for_metric, auth_request, prome
 
     # wait to update metrics triggered by previous tests
     prometheus.wait_on_next_scrape("backend-listener")
+    start = datetime.now(timezone.utc)
 
-    count_before = {}
     for request_type in data:
-        key, labels = authrep_backend_api_query(request_type)
-        count_before[request_type] = prometheus_response_codes_for_metric(key, labels)
         method, endpoint, params = data[request_type]
         for _ in range(NUM_OF_REQUESTS):
             response_2xx, response_403 = auth_request(method, endpoint, params)
@@ -197,21 +196,13 @@ def test_authrep(data, prometheus_response_codes_for_metric, auth_request, prome
     # wait for prometheus to collect the metrics
     prometheus.wait_on_next_scrape("backend-listener")
 
-    count_after = {}
     results = {}
 
     for request_type in data:
         key, labels = authrep_backend_api_query(request_type)
-        count_after[request_type] = prometheus_response_codes_for_metric(key, labels)
+        increase = prometheus_response_codes_for_metric(key, labels, start)
         for response_code in ["2xx", "403"]:
-            results[request_type + response_code] = response_code in count_after[request_type] and (
-                (
-                    response_code not in count_before[request_type]
-                    and int(count_after[request_type][response_code]) == NUM_OF_REQUESTS
-                )
-                or int(count_after[request_type][response_code]) - int(count_before[request_type][response_code])
-                == NUM_OF_REQUESTS
-            )
+            results[request_type + response_code] = increase.get(response_code) == NUM_OF_REQUESTS
 
     for request_type_response_code in results.values():
         assert request_type_response_code, f"{results}"
@@ -174,11 +174,9 @@ def test_internal_backend_listener(
     """
     # wait to update metrics triggered by previous tests
     prometheus.wait_on_next_scrape("backend-listener")
+    start = datetime.now(timezone.utc)
 
-    count_before = {}
     for request_type in data:
-        key, labels = internal_backend_api_query(request_type)
-        count_before[request_type] = prometheus_response_codes_for_metric(key, labels)
         for method, endpoint, response_code in data[request_type]:
             formatted_endpoint = backend_listener_internal_api_endpoint(endpoint)
 
@@ -194,22 +192,14 @@ def test_internal_backend_listener(
     # wait to update metrics in prometheus
     # for some reason change is not visible right away, wait a little bit more here
     prometheus.wait_on_next_scrape("backend-listener", datetime.now(timezone.utc) + timedelta(seconds=60))
-    count_after = {}
     results = {}
 
     for request_type in data:
         key, labels = internal_backend_api_query(request_type)
-        count_after[request_type] = prometheus_response_codes_for_metric(key, labels)
+        increase = prometheus_response_codes_for_metric(key, labels, start)
         for _, _, response_code in data[request_type]:
             # assertion is not used here to collect results for all metrics to better investigate potential errors
-            results[request_type + response_code] = response_code in count_after[request_type] and (
-                (
-                    response_code not in count_before[request_type]
-                    and int(count_after[request_type][response_code]) == NUM_OF_REQUESTS
-                )
-                or int(count_after[request_type][response_code]) - int(count_before[request_type][response_code])
-                == NUM_OF_REQUESTS
-            )
+            results[request_type + response_code] = increase.get(response_code) == NUM_OF_REQUESTS
 
     for request_type_response_code in results.values():
         assert request_type_response_code, f"{results}"
@@ -3,11 +3,14 @@ When report request is sent to backend, the report job starts and
 the report jobs metric in prometheus is increased.
 """
 
+from datetime import datetime, timezone
+
 import pytest
 import requests
 from packaging.version import Version
 
 from testsuite import TESTED_VERSION
+from testsuite.prometheus import counter_deltas
 
 NUM_OF_REQUESTS = 10
 
@@ -36,12 +39,13 @@ def auth_data(service, service_token, application):
 @pytest.fixture(scope="module")
 def prometheus_worker_job_count(prometheus):
     """
-    Given a type of worker job (ReportJob or NotifyJob), returns the value of that metric
+    Given a type of worker job (ReportJob or NotifyJob) and start of the test,
+    returns the increase of that metric since the start
     """
 
-    def _prometheus_worker_job_count(job_type):
-        metric_response_codes = prometheus.get_metrics("apisonator_worker_job_count", {"type": job_type})
-        return int(metric_response_codes[0]["value"][1]) if len(metric_response_codes) > 0 else 0
+    def _prometheus_worker_job_count(job_type, start):
+        series = prometheus.get_metrics_range("apisonator_worker_job_count", {"type": job_type}, start)
+        return sum(counter_deltas(series, start=start).values())
 
     return _prometheus_worker_job_count
 
@@ -55,8 +59,7 @@ def test_authrep(backend_listener_url, auth_data, prometheus_worker_job_count, p
     """
     # wait to update metrics triggered by previous tests
     prometheus.wait_on_next_scrape("backend-worker")
-
-    report_jobs_count_before = prometheus_worker_job_count("ReportJob")
+    start = datetime.now(timezone.utc)
 
     for _ in range(NUM_OF_REQUESTS):
         response = requests.post(backend_listener_url + "/transactions.xml", data=auth_data)
@@ -65,6 +68,4 @@ def test_authrep(backend_listener_url, auth_data, prometheus_worker_job_count, p
     # wait for prometheus to collect the metrics
     prometheus.wait_on_next_scrape("backend-worker")
 
-    report_jobs_count_after = prometheus_worker_job_count("ReportJob")
-
-    assert report_jobs_count_after - report_jobs_count_before == NUM_OF_REQUESTS
+    assert prometheus_worker_job_count("ReportJob", start) == NUM_OF_REQUESTS
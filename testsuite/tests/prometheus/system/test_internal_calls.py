@@ -3,6 +3,7 @@ Test Prometheus metric for content_caching.
 """
 
 import base64
+from datetime import datetime, timezone
 
 import pytest
 import requests
@@ -10,7 +11,7 @@ from packaging.version import Version
 
 from testsuite import TESTED_VERSION
 from testsuite.config import settings
-from testsuite.prometheus import get_metrics_keys
+from testsuite.prometheus import counter_deltas, get_metrics_keys
 
 pytestmark = [
     pytest.mark.disruptive,
@@ -70,13 +71,8 @@ def test_utilization(url, prometheus, application, backend_listener_url, auth_he
     """
 
     # Wait so we have the latest data
-    prometheus.wait_on_next_scrape("backend-worker")
-    counts_before = extract_call_metrics(
-        prometheus,
-        "rails_requests_total",
-        "system-provider",
-        lambda x: x["metric"]["controller"].startswith("admin/api"),
-    )
+    prometheus.wait_on_next_scrapes(["backend-worker", "system-provider"])
+    start = datetime.now(timezone.utc)
 
     service_id = application.service.entity_id
     app_plan_id = application.entity["plan_id"]
@@ -88,31 +84,12 @@ def test_utilization(url, prometheus, application, backend_listener_url, auth_he
         )
 
     # prometheus is downloading metrics periodicity, we need to wait for next fetch
-    prometheus.wait_on_next_scrape("backend-worker")
+    prometheus.wait_on_next_scrapes(["backend-worker", "system-provider"])
 
     metrics = get_metrics_keys(prometheus.get_metrics(labels={"container": "system-provider"}))
     assert "rails_requests_total" in metrics
 
-    counts_after = extract_call_metrics(
-        prometheus,
-        "rails_requests_total",
-        "system-provider",
-        lambda x: x["metric"]["controller"].startswith("admin/api"),
-    )
-
-    for key, count in counts_after.items():
-        if int(count) >= int(counts_before[key]) + REQUEST_NUM:
-            assert counts_after == counts_before, f"looks like {key} is increased by internal calls"
-
-
-def extract_call_metrics(prometheus, query, container, predicate=None):
-    """
-    Given a prometheus query, returns dict with response
-    codes and counts associated with the response code
-    """
-    metric_response_codes = prometheus.get_metrics(query, {"container": container})
-    key_value_map = {}
-    for response_code_metric in metric_response_codes:
-        if predicate is None or predicate(response_code_metric):
-            key_value_map[response_code_metric["metric"]["controller"]] = response_code_metric["value"][1]
-    return key_value_map
+    series = prometheus.get_metrics_range("rails_requests_total", {"container": "system-provider"}, start)
+    for controller, increase in counter_deltas(series, "controller", start).items():
+        if controller.startswith("admin/api"):
+            assert increase < REQUEST_NUM, f"looks like {controller} is increased by internal calls"
@@ -10,7 +10,8 @@ the number of requests send by the application.
 
 import pytest
 
-from testsuite import rawobj, resilient
+from testsuite import rawobj
+from testsuite.analytics import AnalyticsExpectations
 from testsuite.utils import blame
 
 pytestmark = pytest.mark.required_capabilities()
@@ -33,12 +34,12 @@ def test_hits_service(application, api_client, app2):
     - The number of hits to each app is equal to the number of requests made
       through that app
     """
-    analytics = app2.threescale_client.analytics
-    prev_service_hits = analytics.list_by_service(app2["service_id"], metric_name="hits")["total"]
-    prev_app_hits = analytics.list_by_application(application, metric_name="hits")["total"]
-    prev_app2_hits = analytics.list_by_application(app2, metric_name="hits")["total"]
     requests_app = 6
     requests_app2 = 4
+    expectations = AnalyticsExpectations(app2.threescale_client)
+    expectations.expect(app2["service_id"], requests_app + requests_app2, kind="service")
+    expectations.expect(application, requests_app).expect(app2, requests_app2)
+    expectations.snapshot()
 
     client = api_client()
     client2 = api_client(app2)
@@ -49,13 +50,7 @@ def test_hits_service(application, api_client, app2):
     for _ in range(requests_app2):
         assert client2.get("/get").status_code == 200
 
-    metrics_service = resilient.analytics_list_by_service(
-        app2.threescale_client, app2["service_id"], "hits", "total", requests_app + requests_app2
-    )
-    assert metrics_service == prev_service_hits + requests_app + requests_app2
-
-    metrics_app = analytics.list_by_application(application, metric_name="hits")["total"]
-    assert metrics_app == prev_app_hits + requests_app
-
-    metrics_app2 = analytics.list_by_application(app2, metric_name="hits")["total"]
-    assert metrics_app2 == prev_app2_hits + requests_app2
+    metrics_service, metrics_app, metrics_app2 = expectations.wait()
+    assert metrics_service == expectations[0].expected
+    assert metrics_app == expectations[1].expected
+    assert metrics_app2 == expectations[2].expected
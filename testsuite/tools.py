@@ -28,6 +28,7 @@ abstract, however that would cause huge disruption in usage of the testsuite.
 import inspect
 import sys
 
+from testsuite import shared
 from testsuite.config import settings
 from testsuite.configuration import openshift
 from testsuite.openshift.client import OpenShiftClient
@@ -54,7 +55,8 @@ def _url(openshift, key, namespace):
         port = 8080
         if ":" in option:
             _, port = option.split(":", 1)
-        openshift.do_action("get", ["svc", key])  # just check if the service exists
+        if openshift.transport.get("svc", key) is None:  # just check if the service exists
+            raise KeyError(key)
         return f"http://{key}.{namespace}.svc:{port}"
 
     hostname = openshift.routes[key]["spec"]["host"]
@@ -70,6 +72,7 @@ class OpenshiftProject:
     def __init__(self, namespace, server_url=None, token=None):
         self._cache = {}
         self._namespace = namespace
+        self._server_url = server_url
         if server_url and token:
             self._oc = OpenShiftClient(project_name=namespace, server_url=server_url, token=token)
         else:
@@ -82,13 +85,26 @@ class OpenshiftProject:
         if self._oc is None:
             raise KeyError(name)
         if name not in self._cache:
+            # resolved once per session, also missing tools are shared with xdist workers as None,
+            # other failures are not remembered and the next lookup tries again
             try:
-                self._cache[name] = _url(self._oc, name, self._namespace)
+                self._cache[name] = shared.remember(
+                    f"tools:{self._server_url}:{self._namespace}:{name}", lambda: self._url(name)
+                )
             except Exception as err:
                 raise KeyError(name) from err
+        if self._cache[name] is None:
+            raise KeyError(name)
 
         return self._cache[name]
 
+    def _url(self, name):
+        """Returns url of the tool, None if it doesn't exist in the namespace"""
+        try:
+            return _url(self._oc, name, self._namespace)
+        except KeyError:
+            return None
+
 
 class Settings:
     """Get testenv tools from testsuite settings"""
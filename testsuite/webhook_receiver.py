@@ -0,0 +1,245 @@
+"""Webhook receiver running in the test process as an alternative to Mockserver/RequestBin
+
+3scale sends the webhooks directly to the test runner, therefore it has to be
+reachable from 3scale. Each received webhook is parsed once, indexed by its
+type, action and entity id, and waiting get_webhook calls are woken
+immediately, there is no polling.
+
+Usage:
+
+    with WebhookReceiver("http://runner.example.com") as receiver:
+        requestbin = receiver.bin()
+        threescale.webhooks.setup("Accounts", requestbin.url)
+        ...
+        webhook = requestbin.get_webhook("created", str(account.entity_id))
+"""
+
+import asyncio
+import logging
+import socket
+import threading
+import time
+import xml.etree.ElementTree as Et
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlparse
+
+from testsuite.utils import generate_tail
+
+log = logging.getLogger(__name__)
+
+# time to wait for a webhook, the same as total wait of get_webhook backoff of RequestBinClient
+WEBHOOK_DEADLINE = 7
+
+# path, type, action, entity id
+Key = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+
+def _parse(body: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Returns type, action and entity id of the webhook"""
+    try:
+        event = Et.fromstring(body)
+    except Et.ParseError:
+        return None, None, None
+    webhook_type = event.findtext("type")
+    return webhook_type, event.findtext("action"), event.findtext(f"object/{webhook_type}/id")
+
+
+class WebhookBin:
+    """Webhooks sent to single path of the receiver, implements RequestBinClient interface"""
+
+    def __init__(self, receiver: "WebhookReceiver", path: str):
+        self.receiver = receiver
+        self.path = path
+
+    @property
+    def url(self) -> str:
+        """Url to set up as webhooks url in 3scale"""
+        return urljoin(self.receiver.url, self.path)
+
+    def get_webhook(
+        self, action: str, entity_id: str, webhook_type: Optional[str] = None, timeout: float = WEBHOOK_DEADLINE
+    ) -> Optional[str]:
+        """
+        :return the last webhook for given action and entity_id, None if it doesn't arrive in time
+        """
+        return self.receiver.wait(self.path, action, entity_id, webhook_type, timeout)
+
+    def wait_for_webhooks(
+        self, webhooks: Iterable[Tuple[str, Any]], deadline: float = WEBHOOK_DEADLINE
+    ) -> List[Optional[str]]:
+        """
+        Waits for webhooks of many entities at once, the deadline is shared by all of them
+        :param webhooks: Pairs of action and entity_id
+        :return webhooks in the order of the pairs, None for the ones which didn't arrive
+        """
+        end = time.monotonic() + deadline
+        return [
+            self.receiver.wait(self.path, action, str(entity_id), None, max(0.0, end - time.monotonic()))
+            for action, entity_id in webhooks
+        ]
+
+
+# pylint: disable=too-many-instance-attributes
+class WebhookReceiver:
+    """HTTP server receiving webhooks in a background thread with asyncio loop"""
+
+    def __init__(self, url: Optional[str] = None, port: int = 0, host: str = "0.0.0.0", port_offset: int = 0):
+        """
+        Args:
+            :param url: Url of the runner as reachable from 3scale, listening port is appended unless included
+            :param port: Port to listen on, 0 picks a free one
+            :param host: Interface to listen on
+            :param port_offset: Added to fixed port (and port in url), each xdist worker needs its own port
+        """
+        self._public_url = url or f"http://{socket.getfqdn()}"
+        parsed = urlparse(self._public_url)
+        if parsed.port and port_offset:
+            self._public_url = parsed._replace(netloc=f"{parsed.hostname}:{parsed.port + port_offset}").geturl()
+        self._port = port or parsed.port or 0
+        if self._port:
+            self._port += port_offset
+        self._host = host
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        # all the following is accessed only from the loop
+        self._webhooks: Dict[Key, List[str]] = {}
+        self._waiters: Dict[Tuple[str, str, str], List[Tuple[Optional[str], asyncio.Future]]] = {}
+        self._connections: Set[asyncio.StreamWriter] = set()
+
+    @property
+    def url(self) -> str:
+        """Url of the receiver as reachable from 3scale"""
+        if self._server is None:
+            raise RuntimeError("Webhook receiver is not started")
+        if urlparse(self._public_url).port:
+            return self._public_url
+        return f"{self._public_url.rstrip('/')}:{self._port}"
+
+    def bin(self) -> WebhookBin:
+        """Returns new bin with unique path, the same receiver can serve many modules"""
+        return WebhookBin(self, f"/webhook/{generate_tail()}")
+
+    def start(self) -> "WebhookReceiver":
+        """Starts serving in background thread"""
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="webhook-receiver", daemon=True).start()
+        try:
+            self._server = asyncio.run_coroutine_threadsafe(
+                asyncio.start_server(self._handle, self._host, self._port), self._loop
+            ).result()
+        except OSError as err:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+            raise RuntimeError(f"Webhook receiver can't listen on {self._host}:{self._port}: {err}") from err
+        self._port = self._server.sockets[0].getsockname()[1]
+        log.info("Webhook receiver listening on port %s, reachable at %s", self._port, self.url)
+        return self
+
+    def stop(self):
+        """Stops the server and the loop"""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    async def _shutdown(self):
+        """Closes the server and the open connections"""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.sleep(0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def wait(
+        self,
+        path: str,
+        action: str,
+        entity_id: str,
+        webhook_type: Optional[str] = None,
+        timeout: float = WEBHOOK_DEADLINE,
+    ) -> Optional[str]:
+        """Waits for webhook sent to the path, returns the last one received or None if none arrives in time"""
+        if self._loop is None:
+            raise RuntimeError("Webhook receiver is not started")
+        return asyncio.run_coroutine_threadsafe(
+            self._wait(path, action, str(entity_id), webhook_type, timeout), self._loop
+        ).result()
+
+    def _find(self, path: str, action: str, entity_id: str, webhook_type: Optional[str]) -> Optional[str]:
+        return (self._webhooks.get((path, webhook_type, action, entity_id)) or [None])[-1]
+
+    async def _wait(
+        self, path: str, action: str, entity_id: str, webhook_type: Optional[str], timeout: float
+    ) -> Optional[str]:
+        webhook = self._find(path, action, entity_id, webhook_type)
+        if webhook is not None:
+            return webhook
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault((path, action, entity_id), [])
+        waiters.append((webhook_type, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters.remove((webhook_type, future))
+
+    def _receive(self, path: str, body: str):
+        """Indexes the webhook and wakes its waiters"""
+        webhook_type, action, entity_id = _parse(body)
+        # indexed also without the type for lookups by action and entity id only
+        for key_type in dict.fromkeys((webhook_type, None)):
+            self._webhooks.setdefault((path, key_type, action, entity_id), []).append(body)
+        for expected_type, future in self._waiters.get((path, action, entity_id), []):
+            if expected_type in (None, webhook_type) and not future.done():
+                future.set_result(body)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves requests of single connection"""
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target = request_line.decode("latin-1").split()[:2]
+                headers = {}
+                line = await reader.readline()
+                while line not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                    line = await reader.readline()
+                body = await self._read_body(reader, headers)
+                path = urlparse(target).path
+                if method == "POST":
+                    self._receive(path, body.decode("utf-8", errors="replace"))
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as err:
+            log.debug("Webhook receiver connection failed: %s", err)
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    @staticmethod
+    async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            size = int((await reader.readline()).split(b";")[0], 16)
+            while size:
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+                size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readline()
+            return b"".join(chunks)
+        return await reader.readexactly(int(headers.get("content-length", 0)))